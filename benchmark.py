@@ -0,0 +1,891 @@
+"""Offline benchmark for sync.py.
+
+Runs the real `sync_customers` / `sync_routes` / `sync_users` against
+in-process stand-ins for PostgreSQL and MariaDB, fed with synthetic data
+shaped like neocortex_schema_v1. Every database round trip can be given an
+artificial latency, and the stand-ins count statements and round trips.
+
+    python benchmark.py                                   # 10k / 100k / 1M, tüm tablolar
+    python benchmark.py --sizes 10000 100000 --tables users --users-mode bulk
+    python benchmark.py --latency-ms 0.3 --customers-mode diff --json results.json
+    python benchmark.py --baseline results.json           # önceki sonuçla karşılaştır
+    python benchmark.py --engine async --json async.json  # asyncpg / aiomysql motoru
+    python benchmark.py --sizes 100000 --tables customers --profile  # profiles/ altına profil raporu
+
+Each case runs in its own process so peak RSS is per case. "sync MB" is the
+peak RSS growth during the sync itself, after the synthetic data was built.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import sync
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SOURCE_SCHEMA = "neocortex_schema_v1"
+TARGET_SCHEMA = "admin_efes1"
+
+
+# region Synthetic Data
+
+def _updated_at(i):
+    return datetime(2024, 1, 1) + timedelta(seconds=i * 7)
+
+
+def generate_customers(count, rng):
+    """customers_master rows: arrays (some empty), nullable booleans, a renamed phone column"""
+    columns = ['id', 'musteri_kodu', 'unvan', 'durum', 'telefon', 'adres', 'etiketler', 'updated_at']
+    types = {'id': 'integer', 'musteri_kodu': 'text', 'unvan': 'text', 'durum': 'boolean', 'telefon': 'text',
+             'adres': 'text', 'etiketler': 'ARRAY', 'updated_at': 'timestamp without time zone'}
+    tags = ['bayi', 'market', 'horeca', 'kiosk', 'toptan', 'zincir']
+    rows = [
+        (i, f"C{i:08d}", f"Müşteri {i} Gıda Ltd. Şti.", rng.choice((True, False, None)), f"0532{i % 10000000:07d}",
+         f"Atatürk Cad. No:{i % 500} Kat:{i % 9} İstanbul", rng.sample(tags, rng.randint(0, 3)), _updated_at(i))
+        for i in range(1, count + 1)
+    ]
+    target_columns = ['id', 'musteri_kodu', 'unvan', 'durum', 'telefon', 'telefon_1', 'adres', 'etiketler',
+                      'updated_at']
+    return columns, types, rows, target_columns
+
+
+def generate_routes(count, rng):
+    """routes rows: narrow, plain columns"""
+    columns = ['id', 'rota_kodu', 'rota_adi', 'gunler', 'aktif', 'updated_at']
+    types = {'id': 'integer', 'rota_kodu': 'text', 'rota_adi': 'text', 'gunler': 'text', 'aktif': 'boolean',
+             'updated_at': 'timestamp without time zone'}
+    rows = [
+        (i, f"R{i:06d}", f"Rota {i}", rng.choice(('Pzt,Çrş', 'Sal,Prş', 'Cum')), rng.random() < 0.9,
+         _updated_at(i))
+        for i in range(1, count + 1)
+    ]
+    return columns, types, rows, list(columns)
+
+
+def generate_users(count, rng):
+    """users rows with NULL, case/space variant and conflicting position codes.
+
+    Roughly 2% have a NULL position_code, 1% reuse another user's position
+    code and 5% of the ids have a second position.
+    """
+    columns = ['id', 'position_code', 'ad_soyad', 'email', 'account_active', 'roller', 'updated_at']
+    types = {'id': 'integer', 'position_code': 'character varying', 'ad_soyad': 'text', 'email': 'text',
+             'account_active': 'boolean', 'roller': 'ARRAY', 'updated_at': 'timestamp without time zone'}
+    roles = ['satis', 'saha', 'yonetici', 'depo']
+    rows = []
+    user_id = 0
+    while len(rows) < count:
+        user_id += 1
+        positions = 2 if rng.random() < 0.05 else 1
+        for n in range(positions):
+            roll = rng.random()
+            if roll < 0.02:
+                position_code = None
+            elif roll < 0.03 and rows:
+                position_code = rng.choice(rows)[1]  # başka bir kullanıcının pozisyonu
+            else:
+                position_code = f"P{user_id:07d}-{n}"
+            rows.append((user_id, position_code, f"Kullanıcı {user_id}", f"user{user_id}@example.com",
+                         rng.random() < 0.95, rng.sample(roles, rng.randint(1, 2)), _updated_at(user_id)))
+    rows = rows[:count]
+    # PostgreSQL sırası: ORDER BY id, position_code (NULL'lar sonda)
+    rows.sort(key=lambda row: (row[0], row[1] is None, row[1] or ''))
+    return columns, types, rows, list(columns)
+
+
+def existing_users(rows, columns, rng, share):
+    """MariaDB users content for a source table: a `share` of the rows, some stale or moved, plus orphans"""
+    to_user = sync.USERS_MAPPING.compile(columns, columns, {'account_active': 'boolean', 'roller': 'ARRAY'})
+    existing = []
+    keys = set()
+    positions = Counter(row[0] for row in rows)
+    for row in rows:
+        if rng.random() >= share:
+            continue
+        user = dict(zip(columns, to_user(row)))
+        roll = rng.random()
+        if roll < 0.10:
+            user['ad_soyad'] += ' (eski)'
+        elif roll < 0.12 and user['position_code'] is not None:
+            user['position_code'] = user['position_code'].lower() + ' '  # sadece harf/boşluk farkı
+        elif roll < 0.14 and positions[user['id']] == 1:
+            # Pozisyon değişmiş; iki pozisyonlu kullanıcıda ikisi de aynı koda taşınıp unique key'e takılırdı
+            user['position_code'] = f"ESKI-{user['id']}"
+        key = (user['id'], _collate(user['position_code']))
+        if user['position_code'] is not None and key in keys:
+            continue  # hedefteki unique key aynı satırı iki kez kabul etmez
+        keys.add(key)
+        existing.append(user)
+    orphans = max(1, len(rows) // 100)
+    for i in range(orphans):
+        existing.append(dict(zip(columns, (10 ** 9 + i, f"YOK-{i}", "Silinmiş", None, 0, '{}', _updated_at(i)))))
+    return existing
+
+
+GENERATORS = {
+    'customers': ('customers_master', generate_customers),
+    'routes': ('routes', generate_routes),
+    'users': ('users', generate_users),
+}
+
+
+# endregion
+
+# region Fake Connections
+
+class RoundTrips:
+    """Statement / round-trip counters shared by all connections of one side"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.counts = Counter()
+
+    def hit(self, kind, n=1):
+        self.counts[kind] += n
+        self.counts['round_trips'] += n
+        if self.latency:
+            time.sleep(self.latency * n)
+
+
+class FakeSourceCursor:
+    """psycopg2-like cursor over in-memory tables; serves rows in stored order"""
+
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.name = name
+        self.itersize = 2000
+        self.description = None
+        self.rowcount = -1
+        self._rows = iter(())
+
+    def execute(self, query, params=None):
+        db = self.connection.db
+        db.trips.hit('execute')
+        params = list(params or ())
+        if 'information_schema.columns' in query:
+            schema, table = params
+            self._set(['column_name', 'data_type'], list(db.tables[table]['types'].items()))
+            return
+
+        table = db.tables[re.search(r"FROM \w+\.(\w+)", query).group(1)]
+        columns, rows = table['columns'], table['rows']
+        where = re.search(r" WHERE (.*?)(?: ORDER BY|$)", query)
+        if where:
+            for (column, op), value in zip(re.findall(r"(\w+) (>=|<|>|=) %s", where.group(1)), params):
+                index = columns.index(column)
+                if isinstance(value, str) and rows and isinstance(rows[0][index], datetime):
+                    # Durum dosyasındaki watermark metin olarak gelir, PostgreSQL bunu cast eder
+                    value = datetime.fromisoformat(value)
+                compare = {'>=': lambda a, b: a >= b, '<': lambda a, b: a < b, '>': lambda a, b: a > b,
+                           '=': lambda a, b: a == b}[op]
+                rows = [row for row in rows if row[index] is not None and compare(row[index], value)]
+
+        if 'percentile_disc' in query:
+            keys = sorted(row[0] for row in rows)
+            fractions = params[0] if params else []
+            self._set(['percentile_disc'], [([keys[min(len(keys) - 1, int(f * len(keys)))] for f in fractions]
+                                             if keys else None,)])
+        elif re.search(r"SELECT min\(", query):
+            keys = [row[0] for row in rows]
+            self._set(['min', 'max'], [(min(keys, default=None), max(keys, default=None))])
+        elif query.startswith("SELECT COUNT(*)"):
+            self._set(['count'], [(len(rows),)])
+        else:
+            self._set(columns, rows)
+
+    def _set(self, columns, rows):
+        self.rowcount = len(rows)
+        self._pending_description = [(col,) for col in columns]
+        if not self.name:
+            self.description = self._pending_description
+        self._rows = iter(rows)
+
+    def _fetched(self, rows):
+        if self.name:
+            # Named cursor: her fetch bir round trip, description ilk fetch'te gelir
+            self.connection.db.trips.hit('fetch')
+            self.description = self._pending_description
+        return rows
+
+    def fetchmany(self, size=None):
+        return self._fetched([row for _, row in zip(range(size or self.itersize), self._rows)])
+
+    def fetchall(self):
+        return self._fetched(list(self._rows))
+
+    def fetchone(self):
+        return self._fetched(next(self._rows, None))
+
+    def copy_expert(self, sql, file):
+        """COPY (SELECT ...) TO STDOUT: writes the table's rows as CSV (expressions are not evaluated)"""
+        self.connection.db.trips.hit('copy')
+        table = self.connection.db.tables[re.search(r"FROM \w+\.(\w+)", sql).group(1)]
+        text = []
+        writer = csv.writer(_ListWriter(text))
+        for row in table['rows']:
+            writer.writerow(['NULL' if value is None else value for value in row])
+            if len(text) >= 10000:
+                file.write(''.join(text).encode('utf-8'))
+                text.clear()
+        file.write(''.join(text).encode('utf-8'))
+        self.rowcount = len(table['rows'])
+
+    def close(self):
+        pass
+
+
+class _ListWriter:
+    def __init__(self, chunks):
+        self.write = chunks.append
+
+
+class FakeSourceConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, name=None, **kwargs):
+        return FakeSourceCursor(self, name)
+
+    def commit(self):
+        self.db.trips.hit('commit')
+
+    def rollback(self):
+        self.db.trips.hit('rollback')
+
+    def close(self):
+        pass
+
+
+class FakeSource:
+    """In-memory PostgreSQL: {table: {'columns', 'types', 'rows'}}"""
+
+    def __init__(self, latency):
+        self.tables = {}
+        self.trips = RoundTrips(latency)
+
+    def connect(self):
+        return FakeSourceConnection(self)
+
+
+class FakeTargetTable:
+    """A MariaDB table keyed by `id`; `keep_rows=False` only counts rows"""
+
+    def __init__(self, columns, keep_rows=True):
+        self.columns = list(columns)
+        self.keep_rows = keep_rows
+        self.rows = {}
+        self.count = 0
+        self._sorted_keys = None
+
+    def insert(self, rows, upsert=False):
+        if not self.keep_rows:
+            self.count += len(rows)
+            return
+        for row in rows:
+            self.rows[row[0]] = tuple(row)
+        self.count = len(self.rows)
+        self._sorted_keys = None
+
+    def delete(self, keys):
+        for key in keys:
+            self.rows.pop(key, None)
+        self.count = len(self.rows)
+        self._sorted_keys = None
+
+    def page(self, after, limit):
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.rows)
+        keys = self._sorted_keys
+        start = 0
+        if after is not None:
+            low, high = 0, len(keys)
+            while low < high:
+                mid = (low + high) // 2
+                if keys[mid] <= after:
+                    low = mid + 1
+                else:
+                    high = mid
+            start = low
+        return [self.rows[key] for key in keys[start:start + limit]]
+
+
+def _collate(value):
+    """A value as utf8mb4_unicode_ci compares it: case-insensitive, trailing spaces ignored"""
+    if isinstance(value, str):
+        return value.rstrip(' ').casefold()
+    return value
+
+
+class DuplicateEntry(Exception):
+    """MariaDB error 1062: the statement would break the (id, position_code) unique key"""
+
+    errno = 1062
+
+
+class FakeUsersTable:
+    """admin_efes1.users: row dicts with a unique (id, position_code) key.
+
+    Kept apart from `sync.UsersIndex` so the benchmark checks the sync engines
+    against its own model of the table. As with a UNIQUE index, rows with a
+    NULL key column never conflict, and `col=%s` never matches NULL.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.keys = {}
+        self.ids = {}
+        self.positions = {}
+
+    @staticmethod
+    def _key(row):
+        user_id, position_code = _collate(row['id']), _collate(row['position_code'])
+        return None if user_id is None or position_code is None else (user_id, position_code)
+
+    def _index(self, row):
+        key = self._key(row)
+        if key is not None:
+            if key in self.keys:
+                raise DuplicateEntry(f"Duplicate entry '{row['id']}-{row['position_code']}' for key 'PRIMARY'")
+            self.keys[key] = row
+        if row['id'] is not None:
+            self.ids.setdefault(_collate(row['id']), []).append(row)
+        if row['position_code'] is not None:
+            self.positions.setdefault(_collate(row['position_code']), []).append(row)
+
+    def _unindex(self, row):
+        self.keys.pop(self._key(row), None)
+        if row['id'] is not None:
+            self.ids[_collate(row['id'])].remove(row)
+        if row['position_code'] is not None:
+            self.positions[_collate(row['position_code'])].remove(row)
+
+    def insert(self, row):
+        self._index(row)
+        self.rows.append(row)
+
+    def find(self, user_id, position_code):
+        if user_id is None or position_code is None:
+            return []
+        row = self.keys.get((_collate(user_id), _collate(position_code)))
+        return [row] if row is not None else []
+
+    def find_by_id(self, user_id):
+        return list(self.ids.get(_collate(user_id), [])) if user_id is not None else []
+
+    def find_by_position(self, position_code):
+        return list(self.positions.get(_collate(position_code), [])) if position_code is not None else []
+
+    def digest(self):
+        """md5 of the sorted table content, equal for engines that leave the same rows behind"""
+        lines = sorted(repr(sorted(row.items())) for row in self.rows)
+        return hashlib.md5('\n'.join(lines).encode('utf-8')).hexdigest()
+
+    def update(self, row, values):
+        """Apply `values` to `row`; on a key conflict the row is left unchanged"""
+        self._unindex(row)
+        old = dict(row)
+        row.update(values)
+        try:
+            self._index(row)
+        except DuplicateEntry:
+            row.update(old)
+            self._index(row)
+            raise
+
+
+class FakeTargetCursor:
+    """mysql.connector-like cursor understanding the statements sync.py sends"""
+
+    def __init__(self, connection, dictionary=False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self._result = []
+
+    def _table(self, name):
+        return self.connection.db.tables[name.split('.')[-1]]
+
+    def _set(self, columns, rows):
+        self.description = [(col,) for col in columns]
+        self._result = [dict(zip(columns, row)) for row in rows] if self.dictionary else list(rows)
+        self.rowcount = len(rows)
+
+    def execute(self, query, params=None):
+        self.connection.db.trips.hit('execute')
+        self._execute(query, list(params or ()))
+
+    def executemany(self, query, seq):
+        seq = list(seq)
+        if query.startswith("INSERT"):
+            # mysql.connector INSERT'leri tek çok satırlı sorguya çevirir
+            self.connection.db.trips.hit('executemany')
+            for params in seq:
+                self._execute(query, list(params))
+        else:
+            self.connection.db.trips.hit('executemany', len(seq))
+            for params in seq:
+                self._execute(query, list(params))
+
+    def _execute(self, query, params):
+        db = self.connection.db
+        self._result = []
+        if query.startswith("SELECT @@max_allowed_packet"):
+            self._set(['@@max_allowed_packet'], [(db.max_allowed_packet,)])
+        elif query.startswith("SHOW COLUMNS FROM"):
+            self._set(['Field'], [(col,) for col in self._table(query.split()[-1]).columns])
+        elif query.startswith("SHOW INDEX FROM"):
+            table = query.split()[-1]
+            rows = [(table, 0, 'PRIMARY', 1, 'id', 'A', None, None, None, '', 'BTREE')]
+            if table.endswith('users'):
+                rows.append((table, 0, 'PRIMARY', 2, 'position_code', 'A', None, None, None, '', 'BTREE'))
+            self._set(['Table', 'Non_unique', 'Key_name', 'Seq_in_index', 'Column_name', 'Collation',
+                       'Cardinality', 'Sub_part', 'Packed', 'Null', 'Index_type'], rows)
+        elif "information_schema" in query:
+            self._set(['count'], [(0,)])
+        elif query.startswith(("SET ", "ALTER TABLE", "DROP TABLE")):
+            if query.startswith("DROP TABLE"):
+                for name in re.findall(r"[\w.]+__\w+", query):
+                    db.tables.pop(name.split('.')[-1], None)
+        elif query.startswith("CREATE TABLE"):
+            new, old = re.match(r"CREATE TABLE (\S+) LIKE (\S+)", query).groups()
+            source = self._table(old)
+            db.tables[new.split('.')[-1]] = FakeTargetTable(source.columns, source.keep_rows)
+        elif query.startswith("RENAME TABLE"):
+            for old, new in re.findall(r"(\S+) TO ([^,\s]+)", query[len("RENAME TABLE "):]):
+                db.tables[new.split('.')[-1]] = db.tables.pop(old.split('.')[-1])
+        elif query.startswith("TRUNCATE TABLE"):
+            table = self._table(query.split()[-1])
+            table.rows.clear()
+            table.count = 0
+            table._sorted_keys = None
+        elif query.startswith("SELECT COUNT(*)"):
+            self._set(['COUNT(*)'], [(self._table(query.split()[-1]).count,)])
+        elif query.startswith("LOAD DATA LOCAL INFILE"):
+            path = re.search(r"INFILE '([^']+)'", query).group(1)
+            table = self._table(re.search(r"INTO TABLE (\S+)", query).group(1))
+            with open(path, 'rb') as f:
+                loaded = sum(1 for _ in f)
+            table.count += loaded
+            self.rowcount = loaded
+        elif " admin_efes1.users" in query or query.startswith("SELECT id, position_code"):
+            self._users(query, params)
+        elif query.startswith("INSERT INTO"):
+            table = self._table(re.match(r"INSERT INTO (\S+)", query).group(1))
+            width = len(table.columns)
+            rows = [params[i:i + width] for i in range(0, len(params), width)]
+            table.insert(rows, upsert="ON DUPLICATE KEY UPDATE" in query)
+            self.rowcount = len(rows)
+        elif query.startswith("DELETE FROM"):
+            table = self._table(query.split()[2])
+            if " IN (" in query:
+                table.delete(params)
+            else:
+                # Checkpoint'ten devam: WHERE id > %s veya bir id aralığı (anahtar kolonu id)
+                conditions = list(zip(re.findall(r"\w+ (>=|<|>) %s", query), params))
+                compare = {'>=': lambda a, b: a >= b, '<': lambda a, b: a < b, '>': lambda a, b: a > b}
+                table.delete([key for key in table.rows if all(compare[op](key, value) for op, value in conditions)])
+        elif query.startswith("SELECT "):
+            table = self._table(re.search(r"FROM (\S+)", query).group(1))
+            limit = int(re.search(r"LIMIT (\d+)", query).group(1))
+            self._set(table.columns, table.page(params[0] if params else None, limit))
+        else:
+            raise NotImplementedError(f"Benchmark hedefi bu sorguyu tanımıyor: {query[:80]}")
+
+    def _users(self, query, params):
+        users = self.connection.db.users
+        columns = self.connection.db.tables['users'].columns
+        if query.startswith("SELECT * FROM admin_efes1.users WHERE id=%s AND position_code=%s"):
+            rows = users.find(*params)
+        elif query.startswith("SELECT * FROM admin_efes1.users WHERE id=%s"):
+            rows = users.find_by_id(params[0])
+        elif query.startswith("SELECT * FROM admin_efes1.users WHERE position_code=%s"):
+            rows = users.find_by_position(params[0])
+        elif query.startswith("SELECT * FROM admin_efes1.users"):
+            rows = users.rows
+        elif query.startswith("SELECT id, position_code"):
+            self._set(['id', 'position_code'], [(row['id'], row['position_code']) for row in users.rows])
+            return
+        elif query.startswith("UPDATE admin_efes1.users SET"):
+            assignments = re.match(r"UPDATE admin_efes1.users SET (.*) WHERE id=%s AND position_code=%s",
+                                   query).group(1)
+            names = [part.split('=')[0].strip() for part in assignments.split(',')]
+            for row in users.find(params[-2], params[-1]):
+                users.update(row, dict(zip(names, params)))
+            return
+        elif query.startswith("INSERT INTO admin_efes1.users"):
+            user = dict(zip(columns, params))
+            existing = users.find(user['id'], user['position_code']) if "ON DUPLICATE" in query else []
+            if existing:
+                users.update(existing[0], {k: v for k, v in user.items() if k not in ('id', 'position_code')})
+            else:
+                users.insert(user)
+            return
+        else:
+            raise NotImplementedError(f"Benchmark hedefi bu sorguyu tanımıyor: {query[:80]}")
+        self._set(columns, [tuple(row[col] for col in columns) for row in rows])
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+    def close(self):
+        pass
+
+
+class FakeTargetConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False, **kwargs):
+        return FakeTargetCursor(self, dictionary)
+
+    def commit(self):
+        self.db.trips.hit('commit')
+
+    def rollback(self):
+        self.db.trips.hit('rollback')
+
+    def close(self):
+        pass
+
+
+class FakeTarget:
+    """In-memory MariaDB: copy tables by name plus admin_efes1.users as a `FakeUsersTable`"""
+
+    def __init__(self, latency, max_allowed_packet=16 * 1024 * 1024):
+        self.tables = {}
+        self.users = FakeUsersTable()
+        self.trips = RoundTrips(latency)
+        self.max_allowed_packet = max_allowed_packet
+
+    def connect(self):
+        return FakeTargetConnection(self)
+
+
+class AsyncFakeStatement:
+    """asyncpg-like prepared statement over a fake source connection"""
+
+    def __init__(self, connection, query):
+        self.connection = connection
+        self.query = re.sub(r"\$\d+", "%s", query)
+        table = connection.db.tables[re.search(r"FROM \w+\.(\w+)", query).group(1)]
+        self.columns = table['columns']
+
+    def get_attributes(self):
+        return [SimpleNamespace(name=column) for column in self.columns]
+
+    async def cursor(self, *args):
+        cursor = self.connection.cursor(name='async')
+        cursor.execute(self.query, args)
+        return AsyncFakeSourceCursor(cursor)
+
+    async def fetch(self, *args):
+        cursor = self.connection.cursor()
+        cursor.execute(self.query, args)
+        return cursor.fetchall()
+
+
+class AsyncFakeSourceCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def fetch(self, n):
+        return self.cursor.fetchmany(n)
+
+
+class AsyncFakeSourceConnection:
+    """asyncpg-like connection: `$n` placeholders, prepared statements, cursors inside a transaction"""
+
+    def __init__(self, db):
+        self.connection = FakeSourceConnection(db)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, **kwargs):
+        yield
+
+    async def prepare(self, query):
+        return AsyncFakeStatement(self.connection, query)
+
+
+class AsyncFakeTargetCursor:
+    """aiomysql-like cursor delegating to FakeTargetCursor"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    async def execute(self, query, params=None):
+        self.cursor.execute(query, params)
+
+    async def executemany(self, query, seq):
+        self.cursor.executemany(query, seq)
+
+    async def fetchone(self):
+        return self.cursor.fetchone()
+
+    async def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class AsyncFakeTargetConnection:
+    def __init__(self, db):
+        self.connection = FakeTargetConnection(db)
+
+    def cursor(self):
+        return AsyncFakeTargetCursor(self.connection.cursor())
+
+    async def commit(self):
+        self.connection.commit()
+
+    async def rollback(self):
+        self.connection.rollback()
+
+
+class AsyncFakePool:
+    """asyncpg / aiomysql-like pool handing out one new connection per acquire"""
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self.factory()
+
+
+# endregion
+
+# region Runner
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak if sys.platform == 'darwin' else peak * 1024) / 1024 / 1024
+
+
+def configure(options):
+    """Apply the strategy options to the sync module"""
+    sync.CUSTOMERS_MAPPING.strategy = options['customers_mode']
+    sync.ROUTES_MAPPING.strategy = options['routes_mode']
+    sync.CUSTOMERS_MAPPING.partitions = sync.ROUTES_MAPPING.partitions = options['partitions']
+    sync.USERS_SYNC_MODE = options['users_mode']
+    sync.PIPELINE_COPY = options['pipeline']
+    sync.SYNC_STATE_FILE = os.path.join(tempfile.mkdtemp(prefix="sync_bench_"), "sync_state.json")
+    # Bildirim gönderme
+    sync.send_teams_message = lambda *args, **kwargs: True
+
+
+def run_case(table, size, options):
+    """Build synthetic data for one table, run its sync once and return the measurements"""
+    configure(options)
+    rng = random.Random(options['seed'])
+    source_table, generate = GENERATORS[table]
+    columns, types, rows, target_columns = generate(size, rng)
+
+    source = FakeSource(options['latency_ms'] / 1000)
+    source.tables[source_table] = {'columns': columns, 'types': types, 'rows': rows}
+    target = FakeTarget(options['latency_ms'] / 1000)
+    mode = options['users_mode'] if table == 'users' else options[f'{table}_mode']
+    # Tam yüklemede hedef tablo geri okunmaz; satırları saklamak sadece sahte DB'nin belleğini ölçer
+    target.tables[source_table] = FakeTargetTable(target_columns, keep_rows=mode not in ('full', 'bulk'))
+    if table == 'users':
+        for user in existing_users(rows, columns, rng, options['users_existing']):
+            target.users.insert(user)
+    elif mode in ('diff', 'incremental'):
+        # Hedefte verinin çoğu zaten var: %90'ı aynı, bir kısmı eski
+        transform = getattr(sync, f"{table.upper()}_MAPPING").compile(columns, target_columns, types)
+        target.tables[source_table].insert(
+            [transform(row) for row in rows if rng.random() < 0.9])
+        if mode == 'incremental':
+            sync.update_sync_state(source_table, watermark=_updated_at(int(size * 0.95)),
+                                   watermark_column='updated_at', last_full_reload=datetime.now().isoformat())
+
+    sync.connect_source = source.connect
+    sync.connect_target = target.connect
+    pg_conn, maria_conn = source.connect(), target.connect()
+    sync_fn = {'customers': sync.sync_customers, 'routes': sync.sync_routes, 'users': sync.sync_users}[table]
+    job = None
+    if options['engine'] == 'async':
+        # Async motor şemayı SCHEMA'dan okur (gerçek çalıştırmada check_schema doldurur)
+        mapping = getattr(sync, f"{table.upper()}_MAPPING")
+        sync.SCHEMA.source[mapping.source] = types
+        sync.SCHEMA.target[mapping.target] = [(column, '') for column in target_columns]
+        job = sync.async_table_job(table, AsyncFakePool(lambda: AsyncFakeSourceConnection(source)),
+                                   AsyncFakePool(lambda: AsyncFakeTargetConnection(target)))
+        if job is not None and table == 'users':
+            mode = 'bulk'  # async motor users planını toplu uygular
+
+    if not sync.LOGGING.listener:
+        # Loglama ölçüme dahil, çıktısı atılır
+        sync.LOGGING.start(open(os.devnull, 'w', encoding='utf-8'))
+    sync.PROFILER.tables = {table} if options['profile'] else set()
+    # Profilde sahte bağlantıların süresi sürücü çağrısı sayılsın
+    sync.PROFILE_DRIVER_CLASSES.update(name for name in globals() if name.startswith(('Fake', 'AsyncFake')))
+    rss_before = peak_rss_mb()
+    sync.METRICS.reset()
+    started = time.perf_counter()
+    with sync.METRICS.scope(table), sync.PROFILER.profile(table):
+        stats = asyncio.run(job) if job is not None else sync_fn(pg_conn.cursor(), maria_conn.cursor(), maria_conn)
+    seconds = time.perf_counter() - started
+    rss_after = peak_rss_mb()
+
+    round_trips = source.trips.counts['round_trips'] + target.trips.counts['round_trips']
+    report = sync.METRICS.report({table: stats})['tables'][table]
+    return {
+        'table': table,
+        'size': size,
+        'mode': mode + ('+pipeline' if options['pipeline'] and table != 'users' and job is None else '')
+                + (f"+p{options['partitions']}" if options['partitions'] > 1 and table != 'users' else '')
+                + ('+async' if job is not None else ''),
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(size / seconds, 1) if seconds else None,
+        'round_trips': round_trips,
+        'round_trips_per_row': round(round_trips / size, 4) if size else None,
+        'source_statements': dict(source.trips.counts),
+        'target_statements': dict(target.trips.counts),
+        'peak_rss_mb': round(rss_after, 1) if rss_after is not None else None,
+        'sync_rss_mb': round(rss_after - rss_before, 1) if rss_after is not None else None,
+        'stages': report['stages'],
+        'stats': {key: value for key, value in stats.items() if isinstance(value, (int, float, str))},
+        'profile': sync.PROFILER.reports.get(table),
+        'users_md5': target.users.digest() if table == 'users' else None,
+    }
+
+
+def _run_case_child(queue, table, size, options):
+    try:
+        queue.put(run_case(table, size, options))
+    except BaseException as e:
+        queue.put({'table': table, 'size': size, 'error': f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(table, size, options):
+    """Run one case in a fresh process so its peak RSS is not mixed with other cases"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_case_child, args=(queue, table, size, options))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _format_number(value, pattern):
+    return format(value, pattern) if value is not None else '-'
+
+
+def print_results(results, baseline=None):
+    # Motorlar aynı mod adıyla karşılaştırılabilsin
+    previous = {(r['table'], r['size'], r.get('mode', '').replace('+async', '')): r
+                for r in baseline or [] if 'error' not in r}
+    header = (f"{'table':<10} {'rows':>9} {'mode':<20} {'sec':>8} {'rows/s':>10} {'rt/row':>8} "
+              f"{'peak MB':>8} {'sync MB':>8}")
+    print(header + ("  vs baseline" if previous else ""))
+    print('-' * (len(header) + (13 if previous else 0)))
+    for r in results:
+        if 'error' in r:
+            print(f"{r['table']:<10} {r['size']:>9,} HATA: {r['error']}")
+            continue
+        line = (f"{r['table']:<10} {r['size']:>9,} {r['mode']:<20} {r['seconds']:>8.2f} "
+                f"{_format_number(r['rows_per_second'], ',.0f'):>10} {r['round_trips_per_row']:>8.3f} "
+                f"{_format_number(r['peak_rss_mb'], '.0f'):>8} {_format_number(r['sync_rss_mb'], '.0f'):>8}")
+        old = previous.get((r['table'], r['size'], r['mode'].replace('+async', '')))
+        if old and old.get('rows_per_second') and r['rows_per_second']:
+            line += f"  {(r['rows_per_second'] / old['rows_per_second'] - 1) * 100:+.1f}%"
+        print(line)
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in
+                           sorted(r['stages'].items(), key=lambda item: -item[1]) if seconds >= 0.005)
+        if stages:
+            print(f"{'':<10} {'':>9} {stages}")
+        if r.get('profile'):
+            print(f"{'':<10} {'':>9} profil: {r['profile']}.txt")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sync.py offline benchmark (sentetik veri, sahte DB bağlantıları)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--tables', nargs='+', choices=sorted(GENERATORS), default=['customers', 'routes', 'users'])
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="her round trip için eklenen gecikme")
+    parser.add_argument('--customers-mode', choices=['full', 'incremental', 'diff', 'bulk'], default='full')
+    parser.add_argument('--routes-mode', choices=['full', 'incremental', 'diff', 'bulk'], default='full')
+    parser.add_argument('--users-mode', choices=['row', 'bulk'], default='row')
+    parser.add_argument('--users-existing', type=float, default=0.8,
+                        help="kaynak users satırlarının MariaDB'de önceden bulunan oranı")
+    parser.add_argument('--partitions', type=int, default=1)
+    parser.add_argument('--pipeline', action='store_true')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                        help="async: tablonun async motordaki karşılığını çalıştır (yoksa thread motoru)")
+    parser.add_argument('--profile', action='store_true',
+                        help="her vakayı profille (sync.py PROFILE_* ayarları; süreler profil yüküyle artar)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--in-process', action='store_true', help="alt süreç açmadan çalıştır (peak RSS birikir)")
+    parser.add_argument('--json', help="sonuçları bu dosyaya yaz")
+    parser.add_argument('--baseline', help="önceki --json çıktısıyla rows/s karşılaştır")
+    args = parser.parse_args(argv)
+
+    options = {
+        'latency_ms': args.latency_ms,
+        'customers_mode': args.customers_mode,
+        'routes_mode': args.routes_mode,
+        'users_mode': args.users_mode,
+        'users_existing': args.users_existing,
+        'partitions': args.partitions,
+        'pipeline': args.pipeline,
+        'engine': args.engine,
+        'profile': args.profile,
+        'seed': args.seed,
+    }
+    runner = run_case if args.in_process else run_isolated
+
+    results = []
+    for size in args.sizes:
+        for table in args.tables:
+            print(f"{table} x {size:,} ...", file=sys.stderr)
+            results.append(runner(table, size, options))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'options': options, 'results': results}, f, ensure_ascii=False, indent=2, default=str)
+    return 1 if any('error' in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# endregion
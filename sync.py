@@ -1,14 +1,45 @@
 import os
+import argparse
+import sys
+import atexit
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import logging.handlers
+import pstats
+import queue
+import hashlib
+import shutil
+import tempfile
+import threading
 import time
-import schedule
-import requests
+import tracemalloc
 import psycopg2
-import mysql.connector
-from datetime import datetime
-from threading import Thread
+import psycopg2.extras
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from itertools import islice
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Optional
 from dotenv import load_dotenv
 
+try:
+    import resource  # peak RSS; Windows'ta yok
+except ImportError:
+    resource = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 load_dotenv()
 
 # Database config from .env
@@ -28,49 +59,1368 @@ ORHAN_DB = {
     'password': os.getenv("ORHAN_DB_PASSWORD")
 }
 
+# Ek MariaDB hedefleri: kaynak bir kez okunur, her hedefe ayrıca yazılır
+# SYNC_TARGETS=REPORTING,IZMIR -> REPORTING_DB_HOST, REPORTING_DB_NAME, ... (boş olanlar ORHAN_DB'den, host hariç)
+SYNC_TARGETS = [name.strip().upper() for name in os.getenv("SYNC_TARGETS", "").split(",") if name.strip()]
+TARGET_DBS = {
+    name.lower(): {key: os.getenv(f"{name}_DB_{suffix}") or (None if key == 'host' else ORHAN_DB[key])
+                   for key, suffix in (('host', 'HOST'), ('port', 'PORT'), ('database', 'NAME'), ('user', 'USER'),
+                                       ('password', 'PASSWORD'))}
+    for name in SYNC_TARGETS
+}
+FANOUT_QUEUE_BATCHES = int(os.getenv("FANOUT_QUEUE_BATCHES", "8"))  # hedef başına bekleyen en fazla batch
+FANOUT_STALL_SECONDS = float(os.getenv("FANOUT_STALL_SECONDS", "300"))  # ek hedefi toplam bu kadar bekleyince bırak
+
 TEAMS_WEBHOOK_URL = os.getenv("TEAMS_WEBHOOK_URL")
 
+# Teams bildirimleri: tek arka plan worker'ı, sınırlı kuyruk
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))
+NOTIFY_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_TIMEOUT_SECONDS", "10"))
+NOTIFY_RETRIES = int(os.getenv("NOTIFY_RETRIES", "3"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "2"))  # 2, 4, 8 sn...
+NOTIFY_FLUSH_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_FLUSH_TIMEOUT_SECONDS", "30"))  # çıkışta bekleme süresi
+
+# Okuma/yazma ayarları
+PG_STREAM_READS = os.getenv("PG_STREAM_READS", "1") == "1"  # server-side cursor ile akış halinde oku
+PG_ITERSIZE = int(os.getenv("PG_ITERSIZE", "5000"))  # server-side cursor her seferde kaç satır çeksin
+MARIA_BATCH_SIZE = int(os.getenv("MARIA_BATCH_SIZE", "1000"))  # okuma parçası ve ilk INSERT batch boyutu (satır)
+MARIA_BATCH_MIN_ROWS = int(os.getenv("MARIA_BATCH_MIN_ROWS", "100"))
+MARIA_BATCH_MAX_ROWS = int(os.getenv("MARIA_BATCH_MAX_ROWS", "50000"))
+MARIA_BATCH_TARGET_SECONDS = float(os.getenv("MARIA_BATCH_TARGET_SECONDS", "0.5"))  # 0 = sabit batch boyutu
+MARIA_PACKET_FRACTION = float(os.getenv("MARIA_PACKET_FRACTION", "0.5"))  # max_allowed_packet'in kullanılacak kısmı
+MARIA_COMMIT_ROWS = int(os.getenv("MARIA_COMMIT_ROWS", "10000"))  # kaç satırda bir commit
+USERS_SYNC_MODE = os.getenv("USERS_SYNC_MODE", "row")  # row: satır satır sorgu, bulk: tek okuma + toplu yazma
+# PostgreSQL'de olmayan users kayıtları: client = tüm anahtarları indirip karşılaştır, server = geçici tablo + anti-join
+USERS_ORPHAN_CHECK = os.getenv("USERS_ORPHAN_CHECK", "client")
+USERS_ORPHAN_POLICY = os.getenv("USERS_ORPHAN_POLICY", "report")  # report | delete | archive (delete/archive server'da)
+USERS_ORPHAN_ARCHIVE_TABLE = os.getenv("USERS_ORPHAN_ARCHIVE_TABLE", "admin_efes1.users_orphans")
+
+# Tablo sync modları ve artımlı (watermark) ayarları
+CUSTOMERS_SYNC_MODE = os.getenv("CUSTOMERS_SYNC_MODE", "full")  # full | incremental | diff | bulk
+ROUTES_SYNC_MODE = os.getenv("ROUTES_SYNC_MODE", "full")  # full | incremental | diff | bulk
+CUSTOMERS_WATERMARK_COLUMN = os.getenv("CUSTOMERS_WATERMARK_COLUMN", "updated_at")
+ROUTES_WATERMARK_COLUMN = os.getenv("ROUTES_WATERMARK_COLUMN", "updated_at")
+FULL_RELOAD_INTERVAL_HOURS = float(os.getenv("FULL_RELOAD_INTERVAL_HOURS", "168"))  # haftada bir tam yükleme
+SYNC_FORCE_FULL = os.getenv("SYNC_FORCE_FULL", "0") == "1"
+SYNC_STATE_FILE = os.getenv("SYNC_STATE_FILE", "sync_state.json")
+BULK_TRANSFER_VIA = os.getenv("BULK_TRANSFER_VIA", "file")  # bulk mod: file (geçici dosya) | fifo (named pipe)
+
+# Paralel çalışma: aynı anda kaç tablo işi çalışsın (1 = sıralı)
+SYNC_PARALLEL_TABLES = int(os.getenv("SYNC_PARALLEL_TABLES", "1"))
+# Motor: thread = psycopg2 + mysql.connector (thread havuzu), async = asyncpg + aiomysql (asyncio)
+SYNC_ENGINE = os.getenv("SYNC_ENGINE", "thread")
+
+# Bağlantı dayanıklılığı: zaman aşımları, keepalive, geçici hatalarda yeniden bağlanma ve tekrar deneme
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))  # bağlantı kurma zaman aşımı (sn)
+MARIA_READ_TIMEOUT = int(os.getenv("MARIA_READ_TIMEOUT", "600"))  # MariaDB'de tek ifadenin sonucu için bekleme (sn)
+DB_KEEPALIVE_IDLE_SECONDS = int(os.getenv("DB_KEEPALIVE_IDLE_SECONDS", "30"))  # PostgreSQL TCP keepalive
+DB_KEEPALIVE_INTERVAL_SECONDS = int(os.getenv("DB_KEEPALIVE_INTERVAL_SECONDS", "10"))
+DB_KEEPALIVE_COUNT = int(os.getenv("DB_KEEPALIVE_COUNT", "5"))
+DB_RETRIES = int(os.getenv("DB_RETRIES", "3"))  # batch / bağlantı / tablo işi başına en fazla tekrar
+DB_RETRY_BACKOFF_SECONDS = float(os.getenv("DB_RETRY_BACKOFF_SECONDS", "1"))  # 1, 2, 4 sn...
+
+# Tam yüklemede tablo içi paralellik: id aralıklarına bölme
+CUSTOMERS_PARTITIONS = int(os.getenv("CUSTOMERS_PARTITIONS", "1"))
+ROUTES_PARTITIONS = int(os.getenv("ROUTES_PARTITIONS", "1"))
+PARTITION_SPLIT = os.getenv("PARTITION_SPLIT", "minmax")  # minmax | quantile
+PARTITION_SAMPLE_PERCENT = float(os.getenv("PARTITION_SAMPLE_PERCENT", "100"))  # quantile için TABLESAMPLE yüzdesi
+PARTITION_RETRIES = int(os.getenv("PARTITION_RETRIES", "2"))
+
+# Tam yükleme staging tabloya yapılıp RENAME ile canlı tabloyla değiştirilsin mi
+CUSTOMERS_SHADOW_LOAD = os.getenv("CUSTOMERS_SHADOW_LOAD", "0") == "1"
+ROUTES_SHADOW_LOAD = os.getenv("ROUTES_SHADOW_LOAD", "0") == "1"
+
+# Kopyalama pipeline'ı: okuma / dönüşüm / yazma ayrı thread'lerde
+PIPELINE_COPY = os.getenv("PIPELINE_COPY", "0") == "1"
+PIPELINE_TRANSFORM_STAGE = os.getenv("PIPELINE_TRANSFORM_STAGE", "1") == "1"
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))  # stage'ler arasında bekleyen en fazla batch
+
+# Zamanlayıcı: HH:MM (her gün) veya <n>s / <n>m / <n>h (aralık); tablo bazında SYNC_SCHEDULE_<TABLO>, "off" = kapalı
+SYNC_SCHEDULE = os.getenv("SYNC_SCHEDULE", "23:00")
+SYNC_LOCK_FILE = os.getenv("SYNC_LOCK_FILE", "sync.lock")  # aynı anda iki sync çalışmasın
+
+# Şema önbelleği ve sapma kontrolü: warn = raporla, fail = yeni sapmada yazmadan dur
+SCHEMA_CACHE_FILE = os.getenv("SCHEMA_CACHE_FILE", "schema_cache.json")
+SCHEMA_DRIFT_POLICY = os.getenv("SCHEMA_DRIFT_POLICY", "warn")
+MARIA_PREPARED_STATEMENTS = os.getenv("MARIA_PREPARED_STATEMENTS", "1") == "1"  # tekrarlanan users sorguları
+
+# Değişiklik yakalama (capture): trigger'lar changelog tablosuna yazar, LISTEN/NOTIFY ile uyanılır
+CDC_CHANGELOG_TABLE = os.getenv("CDC_CHANGELOG_TABLE", "neocortex_schema_v1.sync_changelog")
+CDC_CHANNEL = os.getenv("CDC_CHANNEL", "sync_changes")
+CDC_TABLES = os.getenv("CDC_TABLES", "customers,routes,users")  # yakalanacak tablo işleri
+CDC_BATCH_SIZE = int(os.getenv("CDC_BATCH_SIZE", "5000"))  # bir mikro-batch'te en fazla changelog satırı
+CDC_COALESCE_SECONDS = float(os.getenv("CDC_COALESCE_SECONDS", "0.5"))  # bildirimden sonra değişiklik biriktirme
+CDC_POLL_SECONDS = float(os.getenv("CDC_POLL_SECONDS", "30"))  # bildirim gelmese de changelog'a bakma aralığı
+CDC_RETRY_SECONDS = float(os.getenv("CDC_RETRY_SECONDS", "5"))  # hata sonrası bekleme (katlanarak, en fazla 5 dk)
+CDC_LOCK_FILE = os.getenv("CDC_LOCK_FILE", SYNC_LOCK_FILE + ".capture")  # batch sync capture'ı bununla durdurur
+CDC_LOCK_WAIT_SECONDS = float(os.getenv("CDC_LOCK_WAIT_SECONDS", "300"))  # süren mikro-batch için bekleme
+
+# Doğrulama (verify): anahtar aralıkları iki sunucuda checksum'lanır, ağdan sadece özetler geçer
+VERIFY_FANOUT = int(os.getenv("VERIFY_FANOUT", "16"))  # uyuşmayan aralık kaç alt aralığa bölünür
+VERIFY_LEAF_ROWS = int(os.getenv("VERIFY_LEAF_ROWS", "256"))  # bu kadar satıra inen aralık anahtar bazında karşılaştırılır
+VERIFY_MAX_DIFFS = int(os.getenv("VERIFY_MAX_DIFFS", "1000"))  # tablo başına aranacak en fazla farklı anahtar
+VERIFY_FLOAT_DECIMALS = int(os.getenv("VERIFY_FLOAT_DECIMALS", "6"))  # float/double kolonlar bu basamağa yuvarlanır
+
+# Çalışma metrikleri: JSON rapor ve Prometheus node-exporter textfile (boş = yazma)
+SYNC_METRICS_FILE = os.getenv("SYNC_METRICS_FILE", "sync_metrics.json")
+SYNC_METRICS_TEXTFILE = os.getenv("SYNC_METRICS_TEXTFILE")
+
+# Ek tablolar: TableMapping tanımlarını içeren JSON dosyası (boş = sadece customers/routes/users)
+TABLE_MAPPINGS_FILE = os.getenv("TABLE_MAPPINGS_FILE")
+
+# Loglama: satır bazlı olaylar sayaçlara yazılır, sadece örneklenenler DEBUG satırı olur
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json (satır başına bir JSON nesnesi)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE")  # boş = sadece stdout
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # bu boyutta dosya döndürülür
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # dolarsa log satırı beklemeden atlanır
+LOG_ROW_SAMPLE = int(os.getenv("LOG_ROW_SAMPLE", "1000"))  # her olay türünün her N'incisi loglanır (0 = hiçbiri)
+
+# Profil (--profile): tablo başına rapor, collapsed-stack (flame graph) ve cProfile dosyası
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOOLS = os.getenv("PROFILE_TOOLS", "cprofile,tracemalloc")  # örnekleme her zaman açık; boş = en az ek yük
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))  # yığın örnekleme aralığı
+PROFILE_SNAPSHOT_SECONDS = float(os.getenv("PROFILE_SNAPSHOT_SECONDS", "1"))  # tepe bellek snapshot kontrolü
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25"))  # raporda her listenin satır sayısı
+
+log = logging.getLogger("sync")
+
+# region Logging
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, table job, event, message and the record's `fields`"""
+
+    def format(self, record):
+        entry = {'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                 'level': record.levelname.lower()}
+        for key in ('table', 'event'):
+            if getattr(record, key, None) is not None:
+                entry[key] = getattr(record, key)
+        entry['message'] = record.getMessage().strip()
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of waiting when the queue is full.
+
+    Records are tagged with the current table job (METRICS scope) in the
+    logging thread, since the listener formats them in its own thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.table = METRICS.current.get()
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose `stop` waits for room for its sentinel; the stock one raises on a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class SyncLogging:
+    """Routes the `sync` logger through a bounded queue to stdout and LOG_FILE.
+
+    Formatting and I/O happen in a QueueListener thread, so a log call never
+    waits on the terminal or the disk. LOG_FILE is rotated at LOG_MAX_BYTES.
+    """
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.targets = []
+
+    def start(self, stream=None):
+        """Install the handlers; `stream` replaces stdout as the console output.
+
+        Does nothing once started, so every entry point (`main`, `run_sync`,
+        `run_daemon`, `run_capture`, `verify_tables`) can call it.
+        """
+        if self.listener:
+            return
+        # stop() sonrası doğrudan bağlanan handler'lar yenileriyle çift yazmasın
+        for target in self.targets:
+            log.removeHandler(target)
+        if LOG_FORMAT == "json":
+            console_format = file_format = JsonLogFormatter()
+        else:
+            console_format = logging.Formatter("%(message)s")
+            file_format = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+
+        console = logging.StreamHandler(stream or sys.stdout)
+        console.setFormatter(console_format)
+        self.targets = [console]
+        if LOG_FILE:
+            rotating = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+            rotating.setFormatter(file_format)
+            self.targets.append(rotating)
+
+        self.handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.listener = DrainingQueueListener(self.handler.queue, *self.targets)
+        log.addHandler(self.handler)
+        log.setLevel(LOG_LEVEL.upper())
+        log.propagate = False
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out queued records; later ones (e.g. at exit) go to the handlers directly"""
+        if not self.listener:
+            return
+        self.listener.stop()
+        self.listener = None
+        log.removeHandler(self.handler)
+        for target in self.targets:
+            log.addHandler(target)
+        if self.handler.dropped:
+            log.warning(f"UYARI: log kuyruğu dolduğu için {self.handler.dropped} satır atlandı")
+
+
+LOGGING = SyncLogging()
+
+
+def row_event(event, message, **fields):
+    """Count a row-level event per table job; every LOG_ROW_SAMPLE-th one is also logged at DEBUG"""
+    count = METRICS.count(f"event_{event}")
+    if LOG_ROW_SAMPLE and (count - 1) % LOG_ROW_SAMPLE == 0 and log.isEnabledFor(logging.DEBUG):
+        log.debug(message, extra={'event': event, 'fields': {**fields, 'event_count': count}})
+
+
+# endregion
+
 # region Utility Functions
+_NOTIFY_STOP = object()
+
+
+class NotificationDispatcher:
+    """Delivers Teams webhook messages from one background worker.
+
+    `send` only enqueues (bounded; messages are dropped with a warning when
+    full), so the sync never waits on the webhook. The worker keeps a single
+    requests.Session, uses timeouts and retries connection errors, 429 and
+    5xx with exponential backoff. Messages that queue up together are
+    coalesced: per-table messages are folded into a queued final summary,
+    or merged into one card. `close` flushes what is left at shutdown.
+    """
+
+    def __init__(self, url, max_size, timeout, retries, backoff):
+        self.url = url
+        self.only_errors = False  # sık zamanlanmış işlerde yalnızca hata mesajları
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.queue = queue.Queue(maxsize=max_size)
+        self.lock = threading.Lock()
+        self.worker = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def send(self, payload, kind="info"):
+        """Queue a MessageCard payload; kind is info | table | summary | error"""
+        if not self.url or (self.only_errors and kind != "error"):
+            return False
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name="teams-notifier", daemon=True)
+                self.worker.start()
+        try:
+            self.queue.put_nowait((kind, payload))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            log.warning(f"Teams kuyruğu dolu, mesaj atlandı: {payload.get('title')}")
+            return False
+
+    def _run(self):
+        import requests
+
+        session = requests.Session()
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    for payload in self._coalesce([item for item in batch if item is not _NOTIFY_STOP]):
+                        self._post(session, payload)
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+                if any(item is _NOTIFY_STOP for item in batch):
+                    break
+        finally:
+            session.close()
+
+    @staticmethod
+    def _coalesce(items):
+        payloads, tables = [], []
+        for kind, payload in items:
+            if kind == "table":
+                tables.append(payload)
+            elif kind == "summary" and tables:
+                details = "\n\n---\n\n".join(table['text'] for table in tables)
+                payloads.append(dict(payload, text=f"{payload['text']}\n\nTablo Detaylari:\n\n{details}"))
+                tables = []
+            else:
+                payloads.append(payload)
+
+        if len(tables) > 1:
+            colors = [table['themeColor'] for table in tables if table['themeColor'] != "00ff00"]
+            tables = [dict(tables[0], title="Tablolar Tamamlandi", summary="Tablolar Tamamlandi",
+                           themeColor=colors[0] if colors else "00ff00",
+                           text="\n\n---\n\n".join(table['text'] for table in tables))]
+        return payloads + tables
+
+    def _post(self, session, payload):
+        import requests
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = session.post(self.url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                self.sent += 1
+                return True
+            except requests.RequestException as e:
+                status = e.response.status_code if e.response is not None else None
+                retriable = status is None or status == 429 or status >= 500
+                if not retriable or attempt == self.retries:
+                    self.failed += 1
+                    log.warning(f"Teams mesajı gönderilemedi ({payload.get('title')}): {e}")
+                    return False
+                delay = self.backoff * 2 ** attempt
+                if status == 429 and e.response.headers.get('Retry-After', '').isdigit():
+                    delay = max(delay, int(e.response.headers['Retry-After']))
+                log.warning(f"Teams mesajı tekrar denenecek ({delay:.0f} sn sonra): {e}")
+                time.sleep(delay)
+
+    def flush(self, timeout):
+        """Wait until everything queued so far was handled; False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flush pending messages and stop the worker"""
+        timeout = NOTIFY_FLUSH_TIMEOUT_SECONDS if timeout is None else timeout
+        worker = self.worker
+        if worker is None or not worker.is_alive():
+            return
+        if not self.flush(timeout):
+            log.warning(f"UYARI: {self.queue.unfinished_tasks} Teams mesajı gönderilemeden çıkılıyor")
+            return
+        self.queue.put(_NOTIFY_STOP)
+        worker.join(timeout)
+
+
+NOTIFIER = NotificationDispatcher(TEAMS_WEBHOOK_URL, NOTIFY_QUEUE_SIZE, NOTIFY_TIMEOUT_SECONDS, NOTIFY_RETRIES,
+                                  NOTIFY_BACKOFF_SECONDS)
+atexit.register(NOTIFIER.close)
+
+
 def send_teams_message(message: str, title: Optional[str] = None, color: str = "0078d4",
-                       summary: Optional[str] = "Bildirim"):
-    """Send notification to Teams channel"""
+                       summary: Optional[str] = "Bildirim", kind: str = "info"):
+    """Queue a notification for the Teams channel (see NotificationDispatcher)"""
+    payload = {
+        "@type": "MessageCard",
+        "@context": "",
+        "summary": summary,
+        "themeColor": color,
+        "title": title,
+        "text": message
+    }
+    return NOTIFIER.send(payload, kind)
+
+
+def print_notification(message):
+    """Print formatted notification with timestamp"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log.info(f"\n=== BİLDİRİM [{now}] ===\n{message}\n{'=' * 50}", extra={'event': 'notification'})
+
+
+def stream_source_rows(pg_cursor, query, cursor_name, params=None):
+    """Run a PostgreSQL query and return (column names, row iterator).
+
+    In streaming mode rows come from a server-side (named) cursor in chunks of
+    PG_ITERSIZE, so memory stays bounded regardless of table size.
+    """
+    if not PG_STREAM_READS:
+        with METRICS.stage('fetch'):
+            pg_cursor.execute(query, params)
+            rows = pg_cursor.fetchall()
+        return [desc[0] for desc in pg_cursor.description], iter(rows)
+
+    with METRICS.stage('fetch'):
+        stream_cursor = pg_cursor.connection.cursor(name=cursor_name)
+        stream_cursor.itersize = PG_ITERSIZE
+        stream_cursor.execute(query, params)
+
+        # Named cursor'da description ilk fetch'ten sonra dolar
+        first_chunk = stream_cursor.fetchmany(PG_ITERSIZE)
+    columns = [desc[0] for desc in stream_cursor.description]
+
+    def rows():
+        try:
+            chunk = first_chunk
+            while chunk:
+                yield from chunk
+                with METRICS.stage('fetch'):
+                    chunk = stream_cursor.fetchmany(PG_ITERSIZE)
+        finally:
+            stream_cursor.close()
+
+    return columns, rows()
+
+
+def load_sync_state():
+    """Read the persisted per-table sync state (watermarks etc.)"""
+    try:
+        with open(SYNC_STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+_sync_state_lock = threading.Lock()
+
+
+def _write_sync_state(update):
+    """Apply `update(state)` to the sync state and write the file atomically"""
+    with _sync_state_lock:
+        state = load_sync_state()
+        update(state)
+        tmp_path = f"{SYNC_STATE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, SYNC_STATE_FILE)
+
+
+def update_sync_state(table, **values):
+    """Merge `values` into the state of `table` and write the file atomically"""
+    _write_sync_state(lambda state: state.setdefault(table, {}).update(values))
+
+
+def mark_partial_target(table, name, partial):
+    """Record in the sync state that extra target `name` holds an incomplete copy of `table`, or clear it"""
+    def update(state):
+        targets = state.setdefault(table, {}).setdefault('partial_targets', {})
+        if partial:
+            targets[name] = datetime.now().isoformat()
+        else:
+            targets.pop(name, None)
+
+    if partial or name in load_sync_state().get(table, {}).get('partial_targets', {}):
+        _write_sync_state(update)
+
+
+def restore_state_value(value):
+    """Turn a datetime stored as text in the state file back into a datetime"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+
+class RunCheckpoint:
+    """Progress of sync runs, kept under "_checkpoint" in the sync state file.
+
+    Finished table jobs are stored with their stats, and full reloads store
+    the last committed key and row count after every commit (per id range
+    when partitioned). A `--resume` run skips the finished jobs and continues
+    the reloads from there. Runs only reset and clear the entries of their
+    own jobs, so a table on its own schedule does not discard the progress
+    of a failed nightly run. Updates for tables without started progress are
+    ignored.
+    """
+
+    STATE_KEY = '_checkpoint'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = None
+
+    def start(self, jobs, tables, resume=False):
+        """Begin a run of the job keys `jobs` copying `tables`; returns True if there was progress to resume"""
+        with self.lock:
+            self.data = load_sync_state().get(self.STATE_KEY) or {'jobs': {}, 'tables': {}}
+            found = resume and (any(key in self.data['jobs'] for key in jobs)
+                                or any(table in self.data['tables'] for table in tables))
+            if not resume:
+                self._drop(jobs, tables)
+            self._save()
+        return found
+
+    def finished_job(self, key):
+        """Stats of a job that already finished in this (possibly resumed) run, or None"""
+        with self.lock:
+            return self.data['jobs'].get(key) if self.data else None
+
+    def finish_job(self, key, stats):
+        with self.lock:
+            if self.data is not None:
+                self.data['jobs'][key] = json.loads(json.dumps(stats, default=str))
+                self._save()
+
+    def progress(self, table):
+        with self.lock:
+            if self.data is None:
+                return None
+            return json.loads(json.dumps(self.data['tables'].get(table), default=str))
+
+    def begin_table(self, table, **progress):
+        """Start (or restart) the copy progress of `table`"""
+        with self.lock:
+            if self.data is not None:
+                self.data['tables'][table] = progress
+                self._save()
+
+    def update(self, table, part=None, **values):
+        """Merge `values` into the progress of `table`, or of its id range number `part`"""
+        with self.lock:
+            progress = self.data['tables'].get(table) if self.data else None
+            if progress is not None and part is not None:
+                ranges = progress.get('ranges', [])
+                progress = ranges[part - 1] if part <= len(ranges) else None
+            if progress is None:
+                return
+            progress.update(values)
+            self._save()
+
+    def clear(self, jobs, tables):
+        """Forget the progress of a run that completed"""
+        with self.lock:
+            if self.data is None:
+                return
+            self._drop(jobs, tables)
+            if self.data['jobs'] or self.data['tables']:
+                self._save()
+            else:
+                _write_sync_state(lambda state: state.pop(self.STATE_KEY, None))
+            self.data = None
+
+    def _drop(self, jobs, tables):
+        for key in jobs:
+            self.data['jobs'].pop(key, None)
+        for table in tables:
+            self.data['tables'].pop(table, None)
+
+    def _save(self):
+        _write_sync_state(lambda state: state.__setitem__(self.STATE_KEY, self.data))
+
+
+RUN_CHECKPOINT = RunCheckpoint()
+
+
+class SyncAlreadyRunning(RuntimeError):
+    """Another sync holds SYNC_LOCK_FILE"""
+
+
+class SyncLock:
+    """Non-blocking inter-process lock on a file, so two syncs never overlap.
+
+    The lock is held on the open file (flock / msvcrt), so the OS releases it
+    when the process dies; a leftover lock file is not a stale lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self, wait=0):
+        """Take the lock, retrying for up to `wait` seconds while another process holds it"""
+        deadline = time.monotonic() + wait
+        while not self._try_acquire():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def _try_acquire(self):
+        file = open(self.path, 'a+', encoding='utf-8')
+        try:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            file.close()
+            return False
+        file.seek(0)
+        file.truncate()
+        file.write(f"pid {os.getpid()}, başlangıç {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        file.flush()
+        self.file = file
+        return True
+
+    def holder(self):
+        """Who holds the lock, as written by the holder"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return f.read().strip() or "bilinmiyor"
+        except OSError:
+            return "bilinmiyor"
+
+    def release(self):
+        if self.file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self.file, fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+
+@contextmanager
+def batch_sync_lock():
+    """Hold SYNC_LOCK_FILE and pause change capture, for a batch sync or verify.
+
+    Raises SyncAlreadyRunning if another batch sync holds SYNC_LOCK_FILE. A
+    capture micro-batch in progress is waited for up to CDC_LOCK_WAIT_SECONDS;
+    the next ones wait until the batch sync has finished.
+    """
+    lock = SyncLock(SYNC_LOCK_FILE)
+    # Capture her mikro-batch'ten önce SYNC_LOCK_FILE'ı bir anlığına dener; o an çakışırsa kısa bekleme yeter
+    if not lock.acquire(wait=1):
+        raise SyncAlreadyRunning(f"Başka bir sync çalışıyor ({lock.holder()})")
     try:
-        payload = {
-            "@type": "MessageCard",
-            "@context": "",
-            "summary": summary,
-            "themeColor": color,
-            "title": title,
-            "text": message
+        capture = SyncLock(CDC_LOCK_FILE)
+        if not capture.acquire(wait=CDC_LOCK_WAIT_SECONDS):
+            raise SyncAlreadyRunning(
+                f"Capture mikro-batch'i {CDC_LOCK_WAIT_SECONDS:.0f} sn'de bitmedi ({capture.holder()})")
+        try:
+            yield
+        finally:
+            capture.release()
+    finally:
+        lock.release()
+
+
+class WatermarkTracker:
+    """Keeps the highest value of the watermark column seen while streaming"""
+
+    def __init__(self, columns, watermark_column):
+        self.index = columns.index(watermark_column) if watermark_column in columns else None
+        self.value = None
+
+    def see(self, record):
+        if self.index is not None:
+            value = record[self.index]
+            if value is not None and (self.value is None or value > self.value):
+                self.value = value
+        return record
+
+
+class CopyProgress:
+    """Tracks the last copied key together with the watermark; `value` is (key, watermark)"""
+
+    def __init__(self, columns, key_column, watermark_column, watermark=None):
+        self.key = WatermarkTracker(columns, key_column)
+        self.watermark = WatermarkTracker(columns, watermark_column)
+        self.watermark.value = watermark
+
+    def see(self, record):
+        self.key.see(record)
+        return self.watermark.see(record)
+
+    @property
+    def value(self):
+        return self.key.value, self.watermark.value
+
+
+def batched(rows, size):
+    """Group an iterable into lists of at most `size` items"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# endregion
+
+# region Metrics
+
+class SyncMetrics:
+    """Stage timings and counters of one sync run, grouped by table job.
+
+    A measurement belongs to the table job of the current thread or asyncio
+    task (`scope`); worker threads started for a job inherit it through `bind`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = contextvars.ContextVar('metrics_table', default=None)
+        self.active = {}  # thread id -> içinde bulunulan en içteki stage (profil örnekleri için)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stages = defaultdict(lambda: defaultdict(float))
+            self.counters = defaultdict(lambda: defaultdict(int))
+            self.started = datetime.now()
+
+    @property
+    def table(self):
+        return self.current.get() or 'run'
+
+    @contextmanager
+    def scope(self, table):
+        token = self.current.set(table)
+        try:
+            yield
+        finally:
+            self.current.reset(token)
+
+    def bind(self, fn):
+        """Wrap `fn` so it records into the current table when run in another thread"""
+        table = self.table
+
+        def run(*args, **kwargs):
+            with self.scope(table):
+                return fn(*args, **kwargs)
+
+        return run
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.stages[self.table][stage] += seconds
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[self.table][name] += n
+            return self.counters[self.table][name]
+
+    @contextmanager
+    def stage(self, stage):
+        thread = threading.get_ident()
+        outer = self.active.get(thread)
+        self.active[thread] = stage
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.monotonic() - started)
+            if outer is None:
+                self.active.pop(thread, None)
+            else:
+                self.active[thread] = outer
+
+    def report(self, results, success=True):
+        """JSON-ready run report; `results` are the table stats dicts by job key"""
+        finished = datetime.now()
+        with self.lock:
+            stages = {table: dict(values) for table, values in self.stages.items()}
+            counters = {table: dict(values) for table, values in self.counters.items()}
+
+        tables = {}
+        for table in sorted(set(stages) | set(counters) | set(results)):
+            stats = results.get(table, {})
+            table_stages = stages.get(table, {})
+            seconds = table_stages.pop('total', 0.0)
+            rows_read = stats.get('read_count', 0)
+            tables[table] = {
+                'duration_seconds': round(seconds, 3),
+                'rows_read': rows_read,
+                'rows_written': sum(stats.get(key, 0) for key in ('insert_count', 'update_count', 'delete_count')),
+                'rows_per_second': round(rows_read / seconds, 1) if seconds else None,
+                'stages': {stage: round(value, 3) for stage, value in sorted(table_stages.items())},
+                **counters.get(table, {}),
+            }
+
+        return {
+            'started_at': self.started.isoformat(),
+            'finished_at': finished.isoformat(),
+            'duration_seconds': round((finished - self.started).total_seconds(), 3),
+            'success': success,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'tables': tables,
         }
-        headers = {'Content-Type': 'application/json'}
 
-        def send_request():
-            response = requests.post(TEAMS_WEBHOOK_URL, json=payload, headers=headers)
-            response.raise_for_status()
 
-        thread = Thread(target=send_request)
-        thread.start()
+METRICS = SyncMetrics()
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process, None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class InstrumentedCursor:
+    """DB-API cursor proxy that counts database round trips into METRICS.
+
+    After its connection reconnected, the next execute opens a new cursor on
+    the new connection with the original `cursor()` arguments.
+    """
+
+    def __init__(self, cursor, connection, side, server_side, open_args=((), {})):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, 'connection', connection)
+        object.__setattr__(self, '_counter', f"{side}_round_trips")
+        object.__setattr__(self, '_server_side', server_side)
+        object.__setattr__(self, '_open_args', open_args)
+        object.__setattr__(self, '_generation', connection.generation)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._current())
+
+    def execute(self, *args, **kwargs):
+        METRICS.count(self._counter)
+        try:
+            return self._current().execute(*args, **kwargs)
+        except Exception as e:
+            note_statement_error(e, args[0] if args else kwargs.get('operation'))
+            raise
+
+    def executemany(self, *args, **kwargs):
+        METRICS.count(self._counter)
+        try:
+            return self._current().executemany(*args, **kwargs)
+        except Exception as e:
+            note_statement_error(e, args[0] if args else kwargs.get('operation'))
+            raise
+
+    def copy_expert(self, *args, **kwargs):
+        METRICS.count(self._counter)
+        return self._current().copy_expert(*args, **kwargs)
+
+    def _current(self):
+        if self._generation != self.connection.generation:
+            args, kwargs = self._open_args
+            object.__setattr__(self, '_cursor', self.connection._conn.cursor(*args, **kwargs))
+            object.__setattr__(self, '_generation', self.connection.generation)
+        return self._cursor
+
+    def _fetch(self, method, *args):
+        # Client-side cursor'larda satırlar execute ile gelmiş olur
+        if self._server_side:
+            METRICS.count(self._counter)
+        return getattr(self._current(), method)(*args)
+
+    def fetchone(self):
+        return self._fetch('fetchone')
+
+    def fetchmany(self, *args):
+        return self._fetch('fetchmany', *args)
+
+    def fetchall(self):
+        return self._fetch('fetchall')
+
+
+class InstrumentedConnection:
+    """DB-API connection proxy whose cursors and commits are counted.
+
+    With `factory` (a function opening a new raw connection) it can replace a
+    lost connection in place, see `recover`.
+    """
+
+    def __init__(self, conn, side, factory=None):
+        self._conn = conn
+        self._side = side
+        self._factory = factory
+        self.generation = 0
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        server_side = self._side == "source" and bool(kwargs.get('name') or (args and args[0]))
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self, self._side, server_side,
+                                  (args, kwargs))
+
+    def commit(self):
+        METRICS.count(f"{self._side}_round_trips")
+        return self._conn.commit()
+
+    def rollback(self):
+        METRICS.count(f"{self._side}_round_trips")
+        return self._conn.rollback()
+
+    def recover(self):
+        """Roll back after a transient error; reconnect if the rollback fails, i.e. the connection is gone"""
+        try:
+            self.rollback()
+            return
+        except Exception:
+            if self._factory is None:
+                raise
+        self.reconnect()
+
+    def reconnect(self):
+        """Replace the raw connection; cursors move to the new one on their next execute"""
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        name = "PostgreSQL" if self._side == "source" else "MariaDB"
+        self._conn = connect_with_retry(self._factory, name)
+        self.generation += 1
+        METRICS.count('reconnects')
+        log.info(f"{name} bağlantısı yeniden kuruldu")
+
+
+def _prometheus_labels(**labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+def prometheus_text(report):
+    """node-exporter textfile format of a run report"""
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP db_sync_{name} {help_text}")
+        lines.append(f"# TYPE db_sync_{name} gauge")
+        lines.extend(f"db_sync_{name}{labels} {value}" for labels, value in samples if value is not None)
+
+    tables = report['tables'].items()
+    metric("last_run_timestamp_seconds", "End of the last sync run.",
+           [("", datetime.fromisoformat(report['finished_at']).timestamp())])
+    metric("last_run_success", "1 if the last sync run succeeded.", [("", int(report['success']))])
+    metric("run_duration_seconds", "Wall time of the last sync run.", [("", report['duration_seconds'])])
+    metric("peak_rss_bytes", "Peak resident memory of the sync process.", [("", report['peak_rss_bytes'])])
+    metric("table_duration_seconds", "Wall time per table job.",
+           [(_prometheus_labels(table=table), values['duration_seconds']) for table, values in tables])
+    metric("stage_seconds", "Time spent per table and stage.",
+           [(_prometheus_labels(table=table, stage=stage), seconds)
+            for table, values in tables for stage, seconds in values['stages'].items()])
+    metric("rows", "Rows read from the source and written to the target.",
+           [(_prometheus_labels(table=table, direction=direction), values[f'rows_{direction}'])
+            for table, values in tables for direction in ('read', 'written')])
+    metric("rows_per_second", "Source rows per second per table job.",
+           [(_prometheus_labels(table=table), values['rows_per_second']) for table, values in tables])
+    metric("batches", "Write statements sent per table job.",
+           [(_prometheus_labels(table=table), values.get('batches', 0)) for table, values in tables])
+    metric("round_trips", "Database round trips per table job.",
+           [(_prometheus_labels(table=table, db=side), values.get(f'{side}_round_trips', 0))
+            for table, values in tables for side in ('source', 'target')])
+    metric("retries", "Batches and table jobs retried after transient errors.",
+           [(_prometheus_labels(table=table, unit=unit), values.get(counter, 0))
+            for table, values in tables for unit, counter in (('batch', 'retried_batches'), ('job', 'retried_jobs'))])
+    metric("reconnects", "Database connections reopened after a lost connection.",
+           [(_prometheus_labels(table=table), values.get('reconnects', 0)) for table, values in tables])
+    metric("row_events", "Row-level events (inserted, updated, skipped...) per table job.",
+           [(_prometheus_labels(table=table, event=name[len('event_'):]), value)
+            for table, values in tables for name, value in values.items() if name.startswith('event_')])
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(report):
+    """Write the run report as JSON and, if configured, as a Prometheus textfile"""
+    for path, text in ((SYNC_METRICS_FILE, lambda: json.dumps(report, ensure_ascii=False, indent=2)),
+                       (SYNC_METRICS_TEXTFILE, lambda: prometheus_text(report))):
+        if not path:
+            continue
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning(f"Metrik dosyası yazılamadı ({path}): {e}")
+
+
+# endregion
+
+# region Transient Errors and Retries
+
+# MariaDB: lock wait timeout, deadlock, bağlanılamadı, server gone away, bağlantı koptu, paket okunamadı,
+# okuma zaman aşımı (yan etkili ifadelerde tekrar denenmez, bkz. note_statement_error)
+TRANSIENT_MARIA_ERRNOS = frozenset({1205, 1213, 2002, 2003, 2006, 2013, 2055, 3024})
+# PostgreSQL: serialization failure, deadlock, admin shutdown, bağlantı hataları
+TRANSIENT_PG_CODES = frozenset({'40001', '40P01', '57P01', '57P02', '57P03', '08000', '08001', '08003', '08006'})
+# psycopg2 bağlantı hatalarında kod yok; bunlar tekrar denemekle düzelmez
+PERMANENT_PG_CONNECT_ERRORS = ("authentication failed", "password", "does not exist")
+# mysql.connector: MARIA_READ_TIMEOUT doldu, ifade sunucuda hâlâ çalışıyor olabilir
+MARIA_READ_TIMEOUT_ERRNO = 3024
+# Okuma zaman aşımından sonra tekrar gönderilebilen ifadeler (yan etkisi yok)
+IDEMPOTENT_STATEMENTS = ('SELECT', 'SHOW')
+
+
+def note_statement_error(error, statement):
+    """Mark `error` as not retryable when a statement with side effects timed out waiting for its result"""
+    timed_out = isinstance(error, TimeoutError) or getattr(error, 'errno', None) == MARIA_READ_TIMEOUT_ERRNO
+    if timed_out and not str(statement).lstrip().upper().startswith(IDEMPOTENT_STATEMENTS):
+        error.retry_unsafe = True
+
+
+def is_transient_error(error):
+    """True for errors worth retrying on a fresh transaction or connection (deadlocks, lost connections...)"""
+    if getattr(error, 'retry_unsafe', False):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
         return True
-    except Exception as e:
-        print(f"Teams mesajı gönderilirken hata oluştu: {e}")
+    if isinstance(error, OSError):
         return False
+    errno = getattr(error, 'errno', None)
+    if errno is None and error.args and isinstance(error.args[0], int):
+        errno = error.args[0]  # PyMySQL / aiomysql: (errno, mesaj)
+    if errno in TRANSIENT_MARIA_ERRNOS:
+        return True
+    code = getattr(error, 'pgcode', None) or getattr(error, 'sqlstate', None)
+    if code:
+        return code in TRANSIENT_PG_CODES
+    # Kodsuz psycopg2 OperationalError: bağlantı kurulamadı / koptu
+    return isinstance(error, psycopg2.OperationalError) and not any(
+        text in str(error) for text in PERMANENT_PG_CONNECT_ERRORS)
 
 
-def print_notification(message):
-    """Print formatted notification with timestamp"""
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"\n=== BİLDİRİM [{now}] ===")
-    print(message)
-    print("=" * 50)
+def transient_retry_delay(error, attempt):
+    """Backoff before retrying `error` after `attempt` retries; None when it must not be retried"""
+    if attempt >= DB_RETRIES or not is_transient_error(error):
+        return None
+    return DB_RETRY_BACKOFF_SECONDS * 2 ** attempt
+
+
+def connect_with_retry(open_connection, name):
+    """Open a raw connection, retrying transient failures with exponential backoff"""
+    attempt = 0
+    while True:
+        try:
+            return open_connection()
+        except Exception as e:
+            delay = transient_retry_delay(e, attempt)
+            if delay is None:
+                raise
+            attempt += 1
+            log.warning(f"{name} bağlantısı kurulamadı ({e}), {delay:.0f} sn sonra tekrar ({attempt}/{DB_RETRIES})")
+            time.sleep(delay)
+
+
+def retry_transient(conn, action, label=""):
+    """Run `action(replay)` on `conn`, retrying transient errors with exponential backoff.
+
+    `replay` is False on the first call. Before a retry the transaction is
+    rolled back (or the connection reopened, see `InstrumentedConnection.recover`),
+    so on retries (`replay=True`) the action must resend everything it wrote
+    since the last commit. Each retry is counted as `retried_batches`.
+    """
+    attempt = 0
+    while True:
+        try:
+            return action(attempt > 0)
+        except Exception as e:
+            delay = transient_retry_delay(e, attempt)
+            if delay is None:
+                raise
+            attempt += 1
+            METRICS.count('retried_batches')
+            log.warning(f"{label}Geçici hata ({e}), batch {delay:.0f} sn sonra tekrar gönderilecek ({attempt}/{DB_RETRIES})")
+            time.sleep(delay)
+            getattr(conn, 'recover', conn.rollback)()
+
+
+async def retry_transient_async(conn, action, label=""):
+    """`retry_transient` for a coroutine `action(replay)` on an aiomysql connection.
+
+    Before a retry the transaction is rolled back; if the rollback fails the
+    connection is reopened with `ping(reconnect=True)`.
+    """
+    import asyncio
+
+    attempt = 0
+    while True:
+        try:
+            return await action(attempt > 0)
+        except Exception as e:
+            delay = transient_retry_delay(e, attempt)
+            if delay is None:
+                raise
+            attempt += 1
+            METRICS.count('retried_batches')
+            log.warning(f"{label}Geçici hata ({e}), batch {delay:.0f} sn sonra tekrar gönderilecek ({attempt}/{DB_RETRIES})")
+            await asyncio.sleep(delay)
+            try:
+                await conn.rollback()
+            except Exception:
+                await conn.ping(reconnect=True)
+
+
+# endregion
+
+# region Profiling
+
+PROFILE_CATEGORIES = {
+    'driver': "Sürücü çağrıları",
+    'transform': "Satır dönüşümü",
+    'sql': "SQL oluşturma",
+    'wait': "Bekleme (kuyruk / diğer thread)",
+    'other': "Diğer",
+}
+PROFILE_DRIVER_PACKAGES = ('psycopg2', 'mysql', 'asyncpg', 'aiomysql', 'pymysql')
+PROFILE_DRIVER_CLASSES = {'InstrumentedCursor', 'InstrumentedConnection'}  # metotları sürücü çağrısı sayılır
+# Fonksiyon adı (qualname veya sürücüde kısa ad) -> kategori
+PROFILE_FUNCTIONS = {
+    **dict.fromkeys(('TableMapping.compile.<locals>.transform', '_array_literal', '_array_literal_or_null',
+                     '_bool_text', '_bool_int', '_json_text', 'WatermarkTracker.see', 'CopyProgress.see',
+                     'dict_rows', 'row_digest', '_digest_value', '_lookup_key', 'plan_users_sync'), 'transform'),
+    **dict.fromkeys(('BatchWriter._send', 'BatchWriter._commit'), 'driver'),
+    **dict.fromkeys(('_value_size', 'BatchWriter.extend', 'AsyncBatchWriter.extend', 'InsertBatcher.row_size',
+                     'InsertBatcher.overflows', 'InsertBatcher.append', 'InsertBatcher.statement',
+                     'BoundTableMapping.insert_sql', 'users_update_sql', 'users_plan_runs',
+                     # sürücülerin istemci tarafında parametreleri SQL metnine yerleştirmesi
+                     '_ParamSubstitutor.__call__', '_bytestr_format_dict', '_process_params',
+                     '_process_params_dict', '_batch_insert', 'mogrify'), 'sql'),
+}
+# Yığında tanınan fonksiyon yoksa thread'in METRICS stage'i karar verir
+PROFILE_STAGES = {'transform': 'transform', 'fetch': 'driver', 'insert': 'driver', 'commit': 'driver',
+                  'truncate': 'driver', 'count': 'driver', 'load': 'driver', 'target_read': 'driver'}
+
+
+def _qualname(code):
+    return getattr(code, 'co_qualname', code.co_name)  # Python < 3.11: sadece kısa ad
+
+
+def frame_category(code):
+    """Profile category a function decides on its own, None if it does not"""
+    category = PROFILE_FUNCTIONS.get(_qualname(code)) or PROFILE_FUNCTIONS.get(code.co_name)
+    if category:
+        return category
+    path = code.co_filename.replace(os.sep, '/')
+    if '/mysql/connector/conversion' in path:  # değerleri SQL literal'ine çevirir
+        return 'sql'
+    if (any(f"/{package}/" in path for package in PROFILE_DRIVER_PACKAGES)
+            or _qualname(code).split('.')[0] in PROFILE_DRIVER_CLASSES):
+        return 'driver'
+    return None
+
+
+def frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{_qualname(code)}"
+
+
+class TableProfile:
+    """cProfile, stack samples and tracemalloc snapshots of one table job.
+
+    A background thread samples the stacks of the job thread and of every
+    thread started during the job (pipeline stages, partitions, fan-out
+    targets) every PROFILE_INTERVAL_MS; the sampler needs the GIL, so the
+    real interval is at least the interpreter's switch interval (5 ms). Each
+    sample is put in the category of its innermost recognised function
+    (PROFILE_FUNCTIONS, driver packages and classes), else of the thread's
+    METRICS stage; a sample blocked in `threading` / `queue` counts as
+    waiting. cProfile only sees the job thread; both cProfile and tracemalloc
+    slow Python code down, so the breakdown is the most accurate with
+    PROFILE_TOOLS empty.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        tools = {tool.strip() for tool in PROFILE_TOOLS.split(",")}
+        self.profiler = cProfile.Profile() if 'cprofile' in tools else None
+        self.trace_memory = 'tracemalloc' in tools
+        self.stacks = Counter()  # (thread adı, kod yığını) -> örnek
+        self.leaves = Counter()
+        self.categories = Counter()
+        self.thread_names = {}
+        self.first_snapshot = self.peak_snapshot = self.last_snapshot = None
+        self.peak_bytes = 0
+        self.rounds = 0
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, name=f"profile-{key}", daemon=True)
+
+    def start(self):
+        # Job'dan önce var olan thread'ler (log, Teams, diğer işler) örneklenmez
+        self.ignored = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        if self.trace_memory:
+            self.own_tracing = not tracemalloc.is_tracing()
+            if self.own_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.first_snapshot = self._snapshot()
+        self.started = time.monotonic()
+        self.sampler.start()
+        if self.profiler:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler:
+            self.profiler.disable()
+        self.seconds = time.monotonic() - self.started
+        self.stopped.set()
+        self.sampler.join()
+        if self.trace_memory:
+            self.last_snapshot = self._snapshot()
+            self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+            if self.own_tracing:
+                tracemalloc.stop()
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def _sample(self):
+        own = threading.get_ident()
+        next_snapshot = time.monotonic() + PROFILE_SNAPSHOT_SECONDS
+        while not self.stopped.wait(PROFILE_INTERVAL_MS / 1000):
+            self.rounds += 1
+            for thread, frame in sys._current_frames().items():
+                if thread != own and thread not in self.ignored:
+                    self._record(thread, frame)
+            if self.trace_memory and time.monotonic() >= next_snapshot:
+                # Tepe bellek: traced bellek son snapshot'tan %10 büyükse yenisini al
+                traced = tracemalloc.get_traced_memory()[0]
+                if traced > self.peak_bytes * 1.1:
+                    self.peak_snapshot, self.peak_bytes = self._snapshot(), traced
+                next_snapshot = time.monotonic() + PROFILE_SNAPSHOT_SECONDS
+
+    def _record(self, thread, frame):
+        if thread not in self.thread_names:
+            self.thread_names.update((t.ident, t.name) for t in threading.enumerate())
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+
+        leaf = codes[0].co_filename.replace(os.sep, '/')
+        if leaf.endswith(('/threading.py', '/queue.py')):
+            category = 'wait'
+        else:
+            category = next(filter(None, map(frame_category, codes)), None)
+            category = category or PROFILE_STAGES.get(METRICS.active.get(thread), 'other')
+        self.categories[category] += 1
+        self.leaves[codes[0]] += 1
+        self.stacks[(self.thread_names.get(thread, str(thread)), tuple(reversed(codes)))] += 1
+
+    def write(self, directory):
+        """Write <key>_<time>.txt report, .collapsed stacks and .prof (cProfile); returns the path prefix"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.key}_{datetime.now():%Y%m%d_%H%M%S}")
+        with open(base + ".collapsed", 'w', encoding='utf-8') as f:
+            for (thread, codes), samples in self.stacks.most_common():
+                f.write(';'.join([thread] + [frame_label(code) for code in codes]) + f" {samples}\n")
+        if self.profiler:
+            self.profiler.dump_stats(base + ".prof")
+        with open(base + ".txt", 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        return base
+
+    def breakdown(self):
+        """[(label, share of samples)] in PROFILE_CATEGORIES order"""
+        total = sum(self.categories.values()) or 1
+        return [(label, self.categories[category] / total) for category, label in PROFILE_CATEGORIES.items()]
+
+    def report(self):
+        samples = sum(self.categories.values())
+        lines = [f"Profil: {self.key}",
+                 f"Süre: {self.seconds:.2f} sn, {samples} örnek "
+                 f"(ort. {self.seconds / max(self.rounds, 1) * 1000:.1f} ms arayla), "
+                 f"araçlar: örnekleme{', cProfile' if self.profiler else ''}"
+                 f"{', tracemalloc' if self.trace_memory else ''}",
+                 "",
+                 "Zaman dağılımı (örneklerin payı, job'un tüm thread'leri):"]
+        for (category, label), (_, share) in zip(PROFILE_CATEGORIES.items(), self.breakdown()):
+            lines.append(f"  {label:<34} {share * 100:5.1f}%  {self.categories[category]:>8}")
+
+        lines += ["", "En çok örneklenen fonksiyonlar (yığının en içi):"]
+        for code, count in self.leaves.most_common(PROFILE_TOP):
+            lines.append(f"  {count / max(samples, 1) * 100:5.1f}%  {frame_label(code)}:{code.co_firstlineno}")
+
+        if self.profiler:
+            for sort, title in (('cumulative', "kümülatif süre"), ('tottime', "kendi süresi")):
+                stream = io.StringIO()
+                pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(PROFILE_TOP)
+                lines += ["", f"cProfile, {title} (sadece job thread'i):", stream.getvalue().strip()]
+
+        if self.trace_memory:
+            lines += ["", f"Bellek (tracemalloc): tepe {self.peak_bytes / 1024 / 1024:.1f} MB"]
+            peak = self.peak_snapshot or self.last_snapshot
+            lines.append("Tepe anında en çok bellek tutan satırlar:")
+            lines += [f"  {stat.size / 1024:10.0f} KB {stat.count:>9} blok  {stat.traceback}"
+                      for stat in peak.statistics('lineno')[:PROFILE_TOP]]
+            lines.append("Bitişte başlangıca göre kalan bellek:")
+            lines += [f"  {stat.size_diff / 1024:+10.0f} KB {stat.count_diff:>+9} blok  {stat.traceback}"
+                      for stat in self.last_snapshot.compare_to(self.first_snapshot, 'lineno')[:PROFILE_TOP]
+                      if stat.size_diff]
+        return "\n".join(lines) + "\n"
+
+
+class SyncProfiler:
+    """Profiles the table jobs whose keys are in `tables` (`table ... --profile`)"""
+
+    def __init__(self):
+        self.tables = set()
+        self.reports = {}  # job anahtarı -> son yazılan profilin yol öneki
+
+    @contextmanager
+    def profile(self, key):
+        if key not in self.tables:
+            yield
+            return
+        profile = TableProfile(key)
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            try:
+                self.reports[key] = base = profile.write(PROFILE_DIR)
+                breakdown = ", ".join(f"{label} %{share * 100:.0f}" for label, share in profile.breakdown())
+                log.info(f"{key} profili: {base}.txt ({breakdown})")
+            except OSError as e:
+                log.warning(f"{key} profili yazılamadı: {e}")
 
 
+PROFILER = SyncProfiler()
+
 # endregion
 
 # region Enhanced Teams Messaging Functions
 
-def send_detailed_start_message():
+START_MESSAGE_LABELS = {
+    'customers': "Customers Master tablosu",
+    'routes': "Routes tablosu",
+    'users': "Users tablosu (Upsert Logic)",
+}
+
+
+def send_detailed_start_message(jobs=None):
     start_time = datetime.now()
+    steps = "\n".join(
+        f"{number}. {START_MESSAGE_LABELS.get(key, f'{title} tablosu')}"
+        for number, (key, title, _) in enumerate(jobs or TABLE_JOBS, 1))
 
     message = f"""Database Synchronization Basladi
 
@@ -79,28 +1429,64 @@ Baslangic Saati: {start_time.strftime('%H:%M:%S')}
 Sunucu: {os.getenv('COMPUTERNAME', os.getenv('HOSTNAME', 'Unknown'))}
 
 Islem Sirasi:
-1. Customers Master tablosu
-2. Routes tablosu  
-3. Users tablosu (Upsert Logic)
+{steps}
 """
 
     send_teams_message(message, "Database Sync Basladi", "0078d4")
     return start_time
 
 
-def send_individual_table_completion(table_name, stats):
+SYNC_MODE_LABELS = {
+    'full': 'Tam Sync',
+    'incremental': 'Artimsal Sync',
+    'diff': 'Fark Sync',
+    'bulk': 'Toplu Yukleme',
+}
+
+
+def target_lines(stats):
+    """Message lines for the extra targets (SYNC_TARGETS) of a table job"""
+    lines = ""
+    for name, target in stats.get('targets', {}).items():
+        if target.get('error'):
+            result = f"HATA - {target['error']}" + (" (tablo eksik kaldi)" if target.get('partial') else "")
+        elif 'update_count' in target:
+            result = f"{target['insert_count']:,} yeni + {target['update_count']:,} guncelleme"
+        else:
+            result = f"{target.get('total_count') or 0:,} kayit"
+        lines += f"""
+- Hedef {name}: {result}"""
+    return lines
+
+
+def send_individual_table_completion(table_name, stats, mapping=None):
     """Her tablo için ayrı tamamlanma mesajı"""
 
     duration_str = str(stats.get('duration', 'N/A')).split('.')[0]  # Saniye kısmını kaldır
 
+    extra_lines = ""
+    if stats.get('mode') == 'diff':
+        extra_lines += f"""
+- Guncellenen Kayit: {stats.get('update_count', 0):,}
+- Silinen Kayit: {stats.get('delete_count', 0):,}
+- Degismeyen Kayit: {stats.get('no_change_count', 0):,}"""
+    if stats.get('staged'):
+        extra_lines += """
+- Yukleme: Staging tablo + RENAME"""
+    for number, part in enumerate(stats.get('partitions', []), 1):
+        extra_lines += f"""
+- Aralik #{number} {part['range']}: {part['rows']:,} kayit, {part['duration']:.1f} sn"""
+    extra_lines += target_lines(stats)
+
     if table_name.lower() == "customers":
         message = f"""Customers Sync Tamamlandi
 
 Istatistikler:
 - Kaynak: PostgreSQL (neocortex_schema_v1.customers_master)
 - Hedef: MariaDB (admin_efes1.customers_master)
+- Mod: {SYNC_MODE_LABELS.get(stats.get('mode'), 'Tam Sync')}
 - Okunan Kayit: {stats.get('read_count', 0):,}
-- Eklenen Kayit: {stats.get('insert_count', 0):,}
+- Eklenen Kayit: {stats.get('insert_count', 0):,}{extra_lines}
 - Final Toplam: {stats.get('total_count', 0):,}
 
 Sure: {duration_str}"""
@@ -111,13 +1497,18 @@ Sure: {duration_str}"""
 Istatistikler:
 - Kaynak: PostgreSQL (neocortex_schema_v1.routes)
 - Hedef: MariaDB (admin_efes1.routes)
+- Mod: {SYNC_MODE_LABELS.get(stats.get('mode'), 'Tam Sync')}
 - Okunan Kayit: {stats.get('read_count', 0):,}
-- Eklenen Kayit: {stats.get('insert_count', 0):,}
+- Eklenen Kayit: {stats.get('insert_count', 0):,}{extra_lines}
 - Final Toplam: {stats.get('total_count', 0):,}
 
 Sure: {duration_str}"""
 
     elif table_name.lower() == "users":
+        orphan_line = ""
+        if USERS_ORPHAN_POLICY != "report":
+            orphan_line = f"""
+- {'Arsivlenen' if USERS_ORPHAN_POLICY == 'archive' else 'Silinen'} (PostgreSQL'de yok): {stats.get('delete_count', 0):,}"""
         message = f"""Users Sync Tamamlandi
 
 Istatistikler:
@@ -126,37 +1517,92 @@ Istatistikler:
 - Toplam Okunan: {stats.get('read_count', 0):,}
 - Yeni Eklenen: {stats.get('insert_count', 0):,}
 - Guncellenen: {stats.get('update_count', 0):,}
-- Degismeyen: {stats.get('no_change_count', 0):,}
-- Cakisan/Hatali: {stats.get('error_count', 0):,}
+- Degismeyen: {stats.get('no_change_count', 0):,}{orphan_line}
+- Cakisan/Hatali: {stats.get('error_count', 0):,}{target_lines(stats)}
+
+Sure: {duration_str}"""
+
+    elif mapping is not None:
+        message = f"""{mapping.title} Sync Tamamlandi
+
+Istatistikler:
+- Kaynak: PostgreSQL ({mapping.source})
+- Hedef: MariaDB ({mapping.target})
+- Mod: {SYNC_MODE_LABELS.get(stats.get('mode'), 'Tam Sync')}
+- Okunan Kayit: {stats.get('read_count', 0):,}
+- Eklenen Kayit: {stats.get('insert_count', 0):,}{extra_lines}
+- Final Toplam: {stats.get('total_count', 0):,}
 
 Sure: {duration_str}"""
 
-    color = "00ff00" if stats.get('error_count', 0) == 0 else "ff9900"
-    send_teams_message(message, f"{table_name.title()} Tamamlandi", color)
+    failed_target = any(target.get('error') for target in stats.get('targets', {}).values())
+    color = "00ff00" if stats.get('error_count', 0) == 0 and not failed_target else "ff9900"
+    send_teams_message(message, f"{table_name.title()} Tamamlandi", color, kind="table")
 
 
-def send_final_summary(start_time, customers_stats, routes_stats, users_stats, success=True):
-    """general summary"""
+def send_final_summary(start_time, customers_stats, routes_stats, users_stats, success=True, other_stats=None,
+                       metrics=None):
+    """general summary; stats of tables that were not part of the run are None"""
     end_time = datetime.now()
     total_duration = end_time - start_time
     duration_str = str(total_duration).split('.')[0]  # Saniye kısmını kaldır
 
+    other_stats = other_stats or {}
+
     if success:
         # Toplam kayıt sayıları
-        total_processed = (
-                customers_stats.get('read_count', 0) +
-                routes_stats.get('read_count', 0) +
-                users_stats.get('read_count', 0)
-        )
-
-        total_inserted = (
-                customers_stats.get('insert_count', 0) +
-                routes_stats.get('insert_count', 0) +
-                users_stats.get('insert_count', 0)
-        )
-
-        total_updated = users_stats.get('update_count', 0)
-        total_errors = users_stats.get('error_count', 0)
+        all_stats = [stats for stats in (customers_stats, routes_stats, users_stats, *other_stats.values())
+                     if stats is not None]
+        total_processed = sum(stats.get('read_count', 0) for stats in all_stats)
+        total_inserted = sum(stats.get('insert_count', 0) for stats in all_stats)
+        total_updated = sum(stats.get('update_count', 0) for stats in all_stats)
+
+        table_lines = []
+        if customers_stats is not None:
+            table_lines.append(f"""Customers Master:
+- {customers_stats.get('total_count', 0):,} kayit - {SYNC_MODE_LABELS.get(customers_stats.get('mode'), 'Tam Sync')}""")
+        if routes_stats is not None:
+            table_lines.append(f"""Routes:
+- {routes_stats.get('total_count', 0):,} kayit - {SYNC_MODE_LABELS.get(routes_stats.get('mode'), 'Tam Sync')}""")
+        if users_stats is not None:
+            table_lines.append(f"""Users:
+- {users_stats.get('insert_count', 0):,} yeni + {users_stats.get('update_count', 0):,} guncelleme - Upsert""")
+        table_lines += [
+            f"""{title}:
+- {stats.get('total_count', 0):,} kayit - {SYNC_MODE_LABELS.get(stats.get('mode'), 'Tam Sync')}"""
+            for title, stats in other_stats.items()]
+        table_lines = "\n\n".join(table_lines)
+
+        performance_lines = ""
+        if metrics:
+            for table, values in metrics['tables'].items():
+                if table == 'run':
+                    continue
+                slowest = max(values['stages'].items(), key=lambda item: item[1], default=None)
+                retries = values.get('retried_batches', 0) + values.get('retried_jobs', 0)
+                performance_lines += f"""
+- {table}: {values['rows_per_second'] or 0:,.0f} kayit/sn""" + (
+                    f", en uzun asama: {slowest[0]} ({slowest[1]:.1f} sn)" if slowest else "") + (
+                    f", {retries} tekrar deneme / {values.get('reconnects', 0)} yeniden baglanti"
+                    if retries or values.get('reconnects') else "")
+            if metrics.get('peak_rss_bytes'):
+                performance_lines += f"""
+- Peak RSS: {metrics['peak_rss_bytes'] / 1024 / 1024:,.0f} MB"""
+            performance_lines = f"""
+
+Performans:{performance_lines}"""
+        total_errors = users_stats.get('error_count', 0) if users_stats is not None else 0
+        failed_targets = []
+        for table, stats in (('Customers', customers_stats), ('Routes', routes_stats), ('Users', users_stats),
+                             *other_stats.items()):
+            for name, target in (stats or {}).get('targets', {}).items():
+                if target.get('error'):
+                    failed_targets.append(f"{table} -> {name}")
+        if failed_targets:
+            performance_lines += """
+
+Yazilamayan Ek Hedefler:""" + "".join(f"""
+- {failed}""" for failed in failed_targets)
 
         message = f"""Database Synchronization Basariyla Tamamlandi!
 
@@ -173,22 +1619,15 @@ Genel Istatistikler:
 
 Tablo Bazinda Ozet:
 
-Customers Master:
-- {customers_stats.get('total_count', 0):,} kayit - Tam Sync
-
-Routes:
-- {routes_stats.get('total_count', 0):,} kayit - Tam Sync
-
-Users:
-- {users_stats.get('insert_count', 0):,} yeni + {users_stats.get('update_count', 0):,} guncelleme - Upsert
+{table_lines}
 
 Veritabanlari:
 - Kaynak: PostgreSQL (BE_DB)
-- Hedef: MariaDB (ORHAN_DB)
+- Hedef: MariaDB (ORHAN_DB){performance_lines}
 
-Sonuc: {"BASARILI" if total_errors == 0 else "UYARILARLA BASARILI"}"""
+Sonuc: {"BASARILI" if total_errors == 0 and not failed_targets else "UYARILARLA BASARILI"}"""
 
-        color = "00ff00" if total_errors == 0 else "ff9900"
+        color = "00ff00" if total_errors == 0 and not failed_targets else "ff9900"
 
     else:
         message = f"""Database Synchronization Basarisiz!
@@ -203,181 +1642,1722 @@ Oneri: Loglari kontrol edin ve tekrar deneyin"""
 
         color = "ff0000"
 
-    send_teams_message(message, "SYNC OZET RAPORU", color)
+    send_teams_message(message, "SYNC OZET RAPORU", color, kind="summary")
 
 
 # endregion
 
-# region Customer Sync Function
+# region Table Mappings
 
-def sync_customers(pg_cursor, maria_cursor, maria_conn):
-    print("Customers tablosu senkronizasyonu başlıyor")
-    start_time = datetime.now()
+def _array_literal(value):
+    """PostgreSQL array -> '{a,b}' text ('{}' for an empty array)"""
+    if isinstance(value, list):
+        return '{' + ','.join(str(x) for x in value) + '}'
+    return value
 
-    # region Data Fetch and Preparation
-    # Fetch all records from PostgreSQL
-    pg_cursor.execute("SELECT * FROM neocortex_schema_v1.customers_master ORDER BY id")
-    records = pg_cursor.fetchall()
-    print(f"{len(records)} kayıt bulundu")
 
-    # Clear destination table
-    maria_cursor.execute("TRUNCATE TABLE admin_efes1.customers_master")
-    maria_conn.commit()
+def _array_literal_or_null(value):
+    """PostgreSQL array -> '{a,b}' text, empty array -> NULL"""
+    if isinstance(value, list):
+        return '{' + ','.join(str(x) for x in value) + '}' if value else None
+    return value
 
-    # Get destination table columns
-    maria_cursor.execute("SHOW COLUMNS FROM admin_efes1.customers_master")
-    columns = []
-    for row in maria_cursor.fetchall():
-        columns.append(row[0])
 
-    query = f"INSERT INTO admin_efes1.customers_master ({','.join(columns)}) VALUES ({','.join(['%s'] * len(columns))})"
-    # endregion
+def _bool_text(value):
+    return 'true' if value else 'false'
 
-    # region Data Processing and Insertion
-    batch = []
-    insert_count = 0
 
-    # Process records in batches
-    for i, record in enumerate(records, 1):
-        data = {}
-        for j, col_name in enumerate([desc[0] for desc in pg_cursor.description]):
-            data[col_name] = record[j]
-
-        # Handle boolean to string conversion for 'durum' field
-        if 'durum' in data:
-            if data['durum']:
-                data['durum'] = 'true'
-            elif not data['durum']:
-                data['durum'] = 'false'
-            else:
-                data['durum'] = None
-
-        # Map columns and handle special cases
-        values = []
-        for col in columns:
-            if col == 'telefon':
-                values.append(None)
-            elif col == 'telefon_1':
-                values.append(data.get('telefon'))
-            else:
-                value = data.get(col)
-                # Convert arrays to PostgreSQL array format
-                if isinstance(value, list):
-                    if value:
-                        value = '{' + ','.join(str(x) for x in value) + '}'
-                    else:
-                        value = None
-                values.append(value)
-
-        batch.append(values)
-
-        # Execute batch insert every 1000 records
-        if i % 1000 == 0 or i == len(records):
-            maria_cursor.executemany(query, batch)
-            maria_conn.commit()
-            insert_count += len(batch)
-            print(f"{i} kayıt yazıldı")
-            batch = []
-    # endregion
+def _bool_int(value):
+    return 1 if value else 0
 
-    # region Final Count and Stats
-    # Verify final count
-    maria_cursor.execute("SELECT COUNT(*) FROM admin_efes1.customers_master")
-    total_count = maria_cursor.fetchone()[0]
 
-    # Prepare stats
-    stats = {
-        'read_count': len(records),
-        'insert_count': insert_count,
-        'total_count': total_count,
-        'duration': datetime.now() - start_time
-    }
+def _json_text(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
 
-    # Send completion notification
-    print(f"Customers tamamlandı - Toplam: {total_count} kayıt")
-    send_individual_table_completion("customers", stats)
-    print_notification(f"CUSTOMERS SYNC TAMAMLANDI\nEklenen: {insert_count} kayıt")
 
-    return stats
-    # endregion
+# array_to_string boolean elemanları t/f yazar; Python'daki str() ile aynı olsun diye True/False yapılır
+_ARRAY_TEXT_SQL = ("CASE WHEN pg_typeof({col}) = 'boolean[]'::regtype "
+                   "THEN replace(replace(array_to_string({col}, ',', 'None'), 't', 'True'), 'f', 'False') "
+                   "ELSE array_to_string({col}, ',', 'None') END")
+
+# Converter adı -> (Python fonksiyonu, aynı sonucu veren SQL şablonu; {col} kaynak kolon)
+CONVERTERS = {
+    'array_literal': (_array_literal, "'{{' || " + _ARRAY_TEXT_SQL + " || '}}'"),
+    'array_literal_or_null': (_array_literal_or_null,
+                              "CASE WHEN cardinality({col}) > 0 THEN '{{' || " + _ARRAY_TEXT_SQL + " || '}}' END"),
+    'bool_text': (_bool_text, "CASE WHEN {col} THEN 'true' ELSE 'false' END"),
+    'bool_int': (_bool_int, "CASE WHEN {col} THEN 1 ELSE 0 END"),
+    'json': (_json_text, "{col}::text"),
+}
+ARRAY_CONVERTERS = ('array_literal', 'array_literal_or_null')
+
+# Varsayılan olarak dizi converter'ının uygulandığı kaynak tipleri (psycopg2 bunları list döndürür)
+LIST_TYPES = ('ARRAY',)
+# json/jsonb her zaman PostgreSQL'in metni olarak yazılır (kaynak bağlantısı onları ayrıştırmadan getirir)
+JSON_TYPES = ('json', 'jsonb')
+
+
+def split_table_name(qualified):
+    """'schema.table' -> ('schema', 'table')"""
+    schema, _, table = qualified.rpartition('.')
+    return schema, table
+
+
+class TableMapping:
+    """Declarative description of how one PostgreSQL table is copied to MariaDB.
+
+    Target columns are filled from the source column with the same name unless
+    listed in `renames` (target -> source) or `null_columns`. `converters`
+    maps target columns to a CONVERTERS name; source columns of a list type
+    without an explicit converter get `array_converter`, and json/jsonb
+    columns always get `json`. `strategy` is one of
+    full | incremental | diff | bulk for tables copied by `copy_table`;
+    `shadow_load` makes full reloads go through a staging table.
+    """
+
+    def __init__(self, name, source, target, title=None, renames=None, null_columns=(), converters=None,
+                 array_converter='array_literal_or_null', strategy='full', watermark_column=None, partitions=1,
+                 key_column='id', shadow_load=False):
+        self.name = name
+        self.source = source
+        self.target = target
+        self.title = title or name.title()
+        self.renames = dict(renames or {})
+        self.null_columns = frozenset(null_columns)
+        self.converters = dict(converters or {})
+        self.array_converter = array_converter
+        self.strategy = strategy
+        self.watermark_column = watermark_column
+        self.partitions = partitions
+        self.key_column = key_column
+        self.shadow_load = shadow_load
+        for converter in list(self.converters.values()) + [array_converter]:
+            if converter is not None and converter not in CONVERTERS:
+                raise ValueError(f"{name}: bilinmeyen converter '{converter}'")
+
+    @property
+    def table(self):
+        """Bare source table name, used for state keys, cursor names and logs"""
+        return split_table_name(self.source)[1]
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+    def _converter_name(self, col, source_types):
+        """CONVERTERS name for target column `col`; `compile` and `select_expr` both follow it"""
+        data_type = source_types.get(self.renames.get(col, col))
+        converter_name = self.converters.get(col)
+        if converter_name is None:
+            if data_type in JSON_TYPES:
+                return 'json'
+            return self.array_converter if data_type in LIST_TYPES else None
+        if converter_name in ARRAY_CONVERTERS and data_type is not None and data_type not in LIST_TYPES:
+            # Dizi olmayan kolonda dizi converter'ı değeri değiştirmez
+            return 'json' if data_type in JSON_TYPES else None
+        return converter_name
+
+    def compile(self, source_columns, target_columns, source_types):
+        """Build a record -> target values function for this column order.
+
+        All name lookups and converter choices happen here, once; the
+        returned function only indexes the source tuple.
+        """
+        positions = {col: i for i, col in enumerate(source_columns)}
+        steps = []
+        for col in target_columns:
+            index = None if col in self.null_columns else positions.get(self.renames.get(col, col))
+            converter_name = self._converter_name(col, source_types) if index is not None else None
+            steps.append((index, CONVERTERS[converter_name][0] if converter_name else None))
+
+        if len(steps) > 1 and all(index is not None and converter is None for index, converter in steps):
+            # Sadece kolon seçimi: C seviyesinde itemgetter
+            return itemgetter(*(index for index, _ in steps))
+
+        steps = tuple(steps)
+
+        def transform(record):
+            return [None if index is None else (record[index] if converter is None else converter(record[index]))
+                    for index, converter in steps]
+
+        return transform
+
+    def select_expr(self, col, source_types):
+        """SQL expression producing the same value as the compiled Python transform"""
+        source_col = self.renames.get(col, col)
+        if col in self.null_columns or source_col not in source_types:
+            return "NULL"
+        ident = f'"{source_col}"'
+        data_type = source_types[source_col]
+        converter_name = self._converter_name(col, source_types)
+        if converter_name:
+            return CONVERTERS[converter_name][1].format(col=ident)
+        if data_type == 'boolean':
+            return f"{ident}::int"
+        if data_type == 'timestamp with time zone':
+            return f"{ident}::timestamp"
+        return ident
+
+    def bind(self, pg_cursor, maria_cursor):
+        """Introspect source types and target columns once for this run"""
+        return BoundTableMapping(self, source_column_types(pg_cursor, self.source),
+                                 get_target_columns(maria_cursor, self.target))
+
+
+class BoundTableMapping:
+    """A TableMapping together with the column lists it is compiled against"""
+
+    def __init__(self, mapping, source_types, target_columns, target=None):
+        self.mapping = mapping
+        self.source_types = source_types
+        self.target_columns = target_columns
+        # Staging yüklemede yazılan tablo, canlı tablo değil
+        self.target = target or mapping.target
+        self.staging = target is not None
+
+    def __getattr__(self, name):
+        return getattr(self.mapping, name)
+
+    def with_target(self, target):
+        """Same mapping writing into another table with the same columns"""
+        return BoundTableMapping(self.mapping, self.source_types, self.target_columns, target)
+
+    def row_transformer(self, source_columns):
+        return self.mapping.compile(source_columns, self.target_columns, self.source_types)
+
+    def select_exprs(self):
+        return [self.mapping.select_expr(col, self.source_types) for col in self.target_columns]
+
+    def insert_sql(self, upsert=False):
+        columns = self.target_columns
+        sql = f"INSERT INTO {self.target} ({','.join(columns)}) VALUES ({','.join(['%s'] * len(columns))})"
+        if upsert:
+            sql += " ON DUPLICATE KEY UPDATE " + ', '.join(
+                f"{col}=VALUES({col})" for col in columns if col != self.key_column)
+        return sql
+
+
+def source_column_types(pg_cursor, source):
+    """{column name: information_schema data_type} for a 'schema.table' source"""
+    if source in SCHEMA.source:
+        return dict(SCHEMA.source[source])
+    schema, table = split_table_name(source)
+    pg_cursor.execute(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = %s AND table_name = %s", (schema, table))
+    return dict(pg_cursor.fetchall())
+
+
+def get_target_columns(maria_cursor, target):
+    """Column names of a MariaDB table in table order"""
+    if target in SCHEMA.target:
+        return [column for column, _ in SCHEMA.target[target]]
+    maria_cursor.execute(f"SHOW COLUMNS FROM {target}")
+    return [row[0] for row in maria_cursor.fetchall()]
+
+
+CUSTOMERS_MAPPING = TableMapping(
+    'customers', 'neocortex_schema_v1.customers_master', 'admin_efes1.customers_master',
+    renames={'telefon_1': 'telefon'},
+    null_columns=['telefon'],
+    converters={'durum': 'bool_text'},
+    strategy=CUSTOMERS_SYNC_MODE,
+    watermark_column=CUSTOMERS_WATERMARK_COLUMN,
+    partitions=CUSTOMERS_PARTITIONS,
+    shadow_load=CUSTOMERS_SHADOW_LOAD,
+)
+
+ROUTES_MAPPING = TableMapping(
+    'routes', 'neocortex_schema_v1.routes', 'admin_efes1.routes',
+    array_converter=None,
+    strategy=ROUTES_SYNC_MODE,
+    watermark_column=ROUTES_WATERMARK_COLUMN,
+    partitions=ROUTES_PARTITIONS,
+    shadow_load=ROUTES_SHADOW_LOAD,
+)
+
+# Users kendi upsert kurallarıyla senkronize edilir; mapping sadece satır dönüşümü için kullanılır
+USERS_MAPPING = TableMapping(
+    'users', 'neocortex_schema_v1.users', 'admin_efes1.users',
+    converters={'account_active': 'bool_int'},
+    array_converter='array_literal',
+    strategy='users_upsert',
+)
+
+
+def load_extra_mappings(path):
+    """Additional tables from a JSON file: a list of TableMapping keyword dicts"""
+    if not path:
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [TableMapping.from_config(config) for config in json.load(f)]
+
+
+EXTRA_TABLE_MAPPINGS = load_extra_mappings(TABLE_MAPPINGS_FILE)
+
+# copy_table ile kopyalanan tüm tablolar
+COPIED_TABLE_MAPPINGS = [CUSTOMERS_MAPPING, ROUTES_MAPPING] + EXTRA_TABLE_MAPPINGS
 
 
 # endregion
 
-# region Routes Sync Function
+# region Schema Cache
 
-def sync_routes(pg_cursor, maria_cursor, maria_conn):
-    print("Routes tablosu senkronizasyonu başlıyor...")
-    start_time = datetime.now()
+def _text(value):
+    # Bazı mysql.connector sürümleri information_schema metinlerini bytes döndürür
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
 
-    # region Data Fetch and Preparation
-    # Fetch all routes from PostgreSQL
-    pg_cursor.execute("SELECT * FROM neocortex_schema_v1.routes ORDER BY id")
-    records = pg_cursor.fetchall()
-    print(f"{len(records)} kayıt bulundu")
 
-    # Clear and prepare destination table
-    maria_cursor.execute("TRUNCATE TABLE admin_efes1.routes")
-    maria_conn.commit()
+class SchemaCache:
+    """Columns and types of the mapped tables on both servers, read once per run.
 
-    maria_cursor.execute("SHOW COLUMNS FROM admin_efes1.routes")
-    columns = [row[0] for row in maria_cursor.fetchall()]
+    `refresh` reads every source table with one information_schema query on
+    PostgreSQL and every target with one on MariaDB; `source_column_types`
+    and `get_target_columns` answer from here afterwards instead of querying
+    per table.
+    """
 
-    query = f"INSERT INTO admin_efes1.routes ({','.join(columns)}) VALUES ({','.join(['%s'] * len(columns))})"
-    # endregion
+    def __init__(self):
+        self.source = {}  # 'schema.table' -> {kolon: data_type}
+        self.target = {}  # 'schema.table' -> [(kolon, column_type)], tablo sırasıyla
 
-    # region Data Processing and Insertion
-    batch = []
-    insert_count = 0
+    def refresh(self, pg_cursor, maria_cursor, mappings):
+        sources = sorted({mapping.source for mapping in mappings})
+        targets = sorted({mapping.target for mapping in mappings})
 
-    # Process and insert routes in batches
-    for i, record in enumerate(records, 1):
-        data = {}
-        for j, col_name in enumerate([desc[0] for desc in pg_cursor.description]):
-            data[col_name] = record[j]
+        pg_cursor.execute(
+            "SELECT table_schema || '.' || table_name, column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema || '.' || table_name = ANY(%s) ORDER BY 1, ordinal_position", (sources,))
+        source = defaultdict(dict)
+        for table, column, data_type in pg_cursor.fetchall():
+            source[table][column] = data_type
 
-        values = []
-        for col in columns:
-            values.append(data.get(col))
-        batch.append(values)
+        maria_cursor.execute(
+            "SELECT CONCAT(table_schema, '.', table_name), column_name, column_type FROM information_schema.columns "
+            f"WHERE CONCAT(table_schema, '.', table_name) IN ({', '.join(['%s'] * len(targets))}) "
+            "ORDER BY 1, ordinal_position", targets)
+        target = defaultdict(list)
+        for table, column, column_type in maria_cursor.fetchall():
+            target[_text(table)].append((_text(column), _text(column_type)))
+
+        self.source, self.target = dict(source), dict(target)
+
+    def fingerprint(self, mapping):
+        data = [sorted(self.source.get(mapping.source, {}).items()), self.target.get(mapping.target, [])]
+        return hashlib.sha1(json.dumps(data).encode('utf-8')).hexdigest()[:16]
+
+
+SCHEMA = SchemaCache()
+
+
+def schema_drift(mapping, source_types, target_columns):
+    """Column-set differences between a source table and its target under `mapping`"""
+    if not source_types:
+        return [f"kaynak tablo {mapping.source} bulunamadı"]
+    if not target_columns:
+        return [f"hedef tablo {mapping.target} bulunamadı"]
+    drift = []
+    used = set()
+    for col in target_columns:
+        source_col = mapping.renames.get(col, col)
+        if col in mapping.null_columns:
+            continue
+        if source_col in source_types:
+            used.add(source_col)
+        else:
+            drift.append(f"hedef kolon {col} kaynakta yok, NULL yazılıyor")
+    drift += [f"kaynak kolon {col} hedefte yok, kopyalanmıyor" for col in source_types if col not in used]
+    return drift
+
+
+def schema_changes(previous, source_types, target):
+    """Columns added, removed or retyped since the cached schema"""
+    changes = []
+    for side, old, new in (("kaynak", previous.get('source', {}), source_types),
+                           ("hedef", dict(previous.get('target', [])), dict(target))):
+        changes += [f"{side} kolon {col} kaldırıldı" for col in sorted(old.keys() - new.keys())]
+        changes += [f"{side} kolon {col} eklendi" for col in sorted(new.keys() - old.keys())]
+        changes += [f"{side} kolon {col}: {old[col]} -> {new[col]}"
+                    for col in sorted(old.keys() & new.keys()) if old[col] != new[col]]
+    return changes
+
+
+def check_schema(pg_cursor, maria_cursor, mappings):
+    """Refresh SCHEMA and compare it with SCHEMA_CACHE_FILE before anything is written.
+
+    Drift between source and target columns is printed every run. Schema
+    changes and drift that is new since the cached fingerprint are also sent
+    to Teams; with SCHEMA_DRIFT_POLICY=fail new drift raises instead and the
+    cache is left as it was, so the next run fails again until the schema is
+    fixed or the drift is accepted by one run with `warn`. The first run of
+    a table only records its baseline.
+    """
+    with METRICS.stage('schema'):
+        SCHEMA.refresh(pg_cursor, maria_cursor, mappings)
+    try:
+        with open(SCHEMA_CACHE_FILE, encoding='utf-8') as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        cache = {}
+
+    alerts, new_drift = [], []
+    for mapping in mappings:
+        source_types = SCHEMA.source.get(mapping.source, {})
+        target = SCHEMA.target.get(mapping.target, [])
+        fingerprint = SCHEMA.fingerprint(mapping)
+        drift = schema_drift(mapping, source_types, [column for column, _ in target])
+        previous = cache.get(mapping.name)
+
+        for item in drift:
+            log.warning(f"Şema farkı - {mapping.name}: {item}")
+        if previous and previous.get('fingerprint') != fingerprint:
+            alerts += [f"{mapping.name}: {change}" for change in schema_changes(previous, source_types, target)]
+            added = [item for item in drift if item not in previous.get('drift', [])]
+            alerts += [f"{mapping.name}: {item}" for item in added]
+            new_drift += [f"{mapping.name}: {item}" for item in added]
+
+        cache[mapping.name] = {'fingerprint': fingerprint, 'source': source_types, 'target': target,
+                               'drift': drift, 'checked_at': datetime.now().isoformat()}
+
+    if alerts:
+        log.warning("Şema değişikliği:\n" + "\n".join(f"- {alert}" for alert in alerts))
+        fail = bool(new_drift) and SCHEMA_DRIFT_POLICY == "fail"
+        send_teams_message("SEMA DEGISIKLIGI\n\n" + "\n".join(f"- {alert}" for alert in alerts) + (
+            "\n\nDurum: Sync yazmadan durduruldu (SCHEMA_DRIFT_POLICY=fail)" if fail else ""),
+            "SEMA DEGISIKLIGI", "ff0000" if fail else "ff9900", kind="error")
+        if fail:
+            raise RuntimeError(f"Şema sapması: {'; '.join(new_drift)}")
+
+    tmp_path = f"{SCHEMA_CACHE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, SCHEMA_CACHE_FILE)
 
-        # Batch insert every 1000 records
-        if i % 1000 == 0 or i == len(records):
-            maria_cursor.executemany(query, batch)
-            maria_conn.commit()
-            insert_count += len(batch)
-            print(f"{i} kayıt yazıldı")
-            batch = []
-    # endregion
 
-    # region Final Count and Stats
-    # Verify final count
-    maria_cursor.execute("SELECT COUNT(*) FROM admin_efes1.routes")
-    total_count = maria_cursor.fetchone()[0]
+# endregion
 
-    # Prepare stats
-    stats = {
-        'read_count': len(records),
-        'insert_count': insert_count,
-        'total_count': total_count,
-        'duration': datetime.now() - start_time
-    }
 
-    # Send completion notification
-    print(f"Routes tamamlandı - Toplam: {total_count} kayıt")
-    send_individual_table_completion("routes", stats)
-    print_notification(f"ROUTES SYNC TAMAMLANDI\nEklenen: {insert_count} kayıt")
+# region Table Copy Engine
 
-    return stats
-    # endregion
+def full_reload(pg_cursor, maria_cursor, maria_conn, bound, watermark_column=None):
+    """TRUNCATE the target table and refill it from the source table.
 
+    The last committed key and row count are checkpointed after every commit.
+    When the run checkpoint has progress for this table, rows after the last
+    committed key are deleted and the copy continues from there instead.
+    Returns (read_count, insert_count, max watermark seen or None).
+    """
+    key_column = bound.key_column
+    progress = resumable_progress(bound)
+    last_key = progress.get('last_key') if progress else None
 
-# endregion
+    # Stream records from PostgreSQL
+    if last_key is None:
+        pg_columns, records = stream_source_rows(
+            pg_cursor, f"SELECT * FROM {bound.source} ORDER BY {key_column}", f"{bound.table}_stream")
+    else:
+        pg_columns, records = stream_source_rows(
+            pg_cursor, f"SELECT * FROM {bound.source} WHERE {key_column} > %s ORDER BY {key_column}",
+            f"{bound.table}_stream", (last_key,))
+
+    # Clear destination table (or what was written after the checkpoint)
+    with METRICS.stage('truncate'):
+        if last_key is None:
+            maria_cursor.execute(f"TRUNCATE TABLE {bound.target}")
+        else:
+            maria_cursor.execute(f"DELETE FROM {bound.target} WHERE {key_column} > %s", (last_key,))
+        maria_conn.commit()
+
+    if last_key is None:
+        done_rows, watermark = 0, None
+        if not bound.staging:
+            RUN_CHECKPOINT.begin_table(bound.table, target=bound.target, key_column=key_column,
+                                       last_key=None, rows=0, watermark=None)
+    else:
+        done_rows, watermark = progress['rows'], restore_state_value(progress.get('watermark'))
+        log.info(f"{bound.table}: checkpoint'ten devam ediliyor, {done_rows} kayıt zaten yazılmış "
+                 f"({key_column} > {last_key})")
+
+    tracker = CopyProgress(pg_columns, key_column, watermark_column, watermark)
+    if watermark_column and tracker.watermark.index is None:
+        log.warning(f"UYARI: {bound.table} kaynağında {watermark_column} kolonu yok, artımlı sync yapılamayacak")
+
+    def save_progress(value, rows):
+        committed_key, committed_watermark = value
+        RUN_CHECKPOINT.update(bound.table, last_key=committed_key, rows=done_rows + rows,
+                              watermark=committed_watermark)
+
+    insert_count = insert_stream(maria_cursor, maria_conn, bound.insert_sql(), bound.row_transformer(pg_columns),
+                                 records, tracker, on_commit=None if bound.staging else save_progress)
+    read_count = done_rows + insert_count
+    log.info(f"{read_count} kayıt okundu")
+
+    return read_count, read_count, tracker.watermark.value
+
+
+def report_target_failure(table, name, error):
+    """Log and notify a failed extra target; the other targets are not affected"""
+    log.error(f"{table} -> {name}: {error}")
+    send_teams_message(f"{table} tablosu {name} hedefine yazilamadi: {error}\nDiger hedefler etkilenmedi.",
+                       "SYNC HEDEF HATASI", "ff0000", kind="error")
+
+
+def target_result(table, name, future):
+    """Stats of an extra target job, or its error as {'error': ...} after reporting it"""
+    try:
+        return future.result()
+    except Exception as e:
+        report_target_failure(table, name, e)
+        return {'error': str(e)}
+
+
+class FanOutTarget:
+    """One target of a fan-out copy: a bounded queue of batches drained by its own writer thread.
+
+    The thread truncates the target table, writes the batches through a
+    `BatchWriter` on its own connection and counts the result. An `extra`
+    target is loaded into a staging table swapped in by RENAME
+    (`shadow_full_load`), so a failure leaves its old copy untouched; where
+    foreign keys or triggers prevent that, it is loaded in place and marked
+    in the sync state as partial until a load completes. A failing target
+    keeps its error and stops. The time the reader spends waiting on a
+    full queue adds up over the whole copy; an extra target is left behind
+    once that reaches FANOUT_STALL_SECONDS, so a slow extra target can delay
+    the others by at most that much in total.
+    """
+
+    def __init__(self, name, bound, connect, scope, label="", extra=True, on_commit=None):
+        self.name = name
+        self.bound = bound
+        self.connect = connect  # () -> (bağlantı, kapatılsın mı)
+        self.scope = scope
+        self.label = label
+        self.extra = extra
+        self.on_commit = on_commit
+        self.partial = False  # yerinde yükleme yarıda kaldı
+        self.queue = queue.Queue(FANOUT_QUEUE_BATCHES)
+        self.waited = 0.0  # okuyucunun bu hedefin dolu kuyruğunda beklediği toplam süre
+        self.error = None
+        self.insert_count = 0
+        self.total_count = None
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"fanout-{name}", daemon=True)
+        self.thread.start()
+
+    def put(self, batch):
+        """Queue a (rows, watermark) batch (None ends the stream); False once the target failed or stalled"""
+        while self.error is None:
+            started = time.monotonic()
+            try:
+                self.queue.put(batch, timeout=1)
+                return True
+            except queue.Full:
+                pass
+            finally:
+                self.waited += time.monotonic() - started
+            if self.extra and self.waited >= FANOUT_STALL_SECONDS:
+                self.error = TimeoutError(f"okuma toplam {self.waited:.0f} sn bu hedefi bekledi, bırakıldı")
+        return False
+
+    def finish(self):
+        """End the stream and wait for the writer; a failed or stalled one is stopped first"""
+        if not self.put(None):
+            self.abort(self.error)
+        self.thread.join()
+        return self.error is None
+
+    def abort(self, error):
+        """Stop the writer after its current batch"""
+        if self.error is None:
+            self.error = error
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass  # worker bir sonraki batch'te hatayı görüp durur
+
+    def stats(self):
+        duration = self.duration if not self.thread.is_alive() else time.monotonic() - self.started
+        return {'insert_count': self.insert_count, 'total_count': self.total_count, 'partial': self.partial,
+                'duration': round(duration, 3), 'error': None if self.error is None else str(self.error)}
+
+    def _load(self, cursor, conn, bound):
+        """Write the queued batches into `bound.target`; returns the rows written"""
+        if not bound.staging:
+            with METRICS.stage('truncate'):
+                cursor.execute(f"TRUNCATE TABLE {bound.target}")
+                conn.commit()
+        writer = BatchWriter(cursor, conn, bound.insert_sql(), self.label, self.on_commit)
+        while True:
+            batch = self.queue.get()
+            if self.error is not None:
+                raise self.error
+            if batch is None:
+                return writer.close()
+            writer.extend(*batch)
+
+    def _run(self):
+        conn = cursor = None
+        owned = False
+        try:
+            with METRICS.scope(self.scope):
+                conn, owned = self.connect()
+                cursor = conn.cursor()
+                blockers = shadow_load_blockers(cursor, self.bound.target) if self.extra else None
+                if self.extra and not blockers:
+                    self.insert_count = shadow_full_load(cursor, conn, self.bound,
+                                                         lambda bound: self._load(cursor, conn, bound))
+                else:
+                    if blockers:
+                        log.warning(f"UYARI: {self.name} hedefinde {self.bound.target} için {', '.join(blockers)} "
+                                    f"var, tablo yerinde yükleniyor; yarıda kalırsa eksik olarak işaretlenir")
+                        self.partial = True
+                        mark_partial_target(self.bound.table, self.name, True)
+                    self.insert_count = self._load(cursor, conn, self.bound)
+                with METRICS.stage('count'):
+                    cursor.execute(f"SELECT COUNT(*) FROM {self.bound.target}")
+                    self.total_count = cursor.fetchone()[0]
+                if self.extra:
+                    self.partial = False
+                    mark_partial_target(self.bound.table, self.name, False)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.duration = time.monotonic() - self.started
+            for resource, close in ((cursor, True), (conn, owned)):
+                if resource is not None and close:
+                    try:
+                        resource.close()
+                    except Exception:
+                        pass
+
+
+def fanout_full_reload(pg_cursor, maria_conn, bound, watermark_column=None):
+    """Full reload that reads and transforms the source once and writes it to every target.
+
+    The main target (`maria_conn`, writing into `bound.target`, which may be
+    a staging table) and each of TARGET_DBS get their own `FanOutTarget`;
+    with `maria_conn=None` only the extra targets are loaded. A failed or
+    stalled extra target is reported and left behind while the others
+    continue; a failure of the main target fails the job after the other
+    targets are done. The main target is checkpointed like `full_reload`,
+    but a fan-out read always starts from the beginning. Returns
+    (read_count, insert_count of the main target or None, max watermark
+    seen or None, stats of the extra targets by name).
+    """
+    key_column = bound.key_column
+    pg_columns, records = stream_source_rows(
+        pg_cursor, f"SELECT * FROM {bound.source} ORDER BY {key_column}", f"{bound.table}_stream")
+    transform = bound.row_transformer(pg_columns)
+    tracker = CopyProgress(pg_columns, key_column, watermark_column)
+    checkpointed = maria_conn is not None and not bound.staging
+    if checkpointed:
+        RUN_CHECKPOINT.begin_table(bound.table, target=bound.target, key_column=key_column,
+                                   last_key=None, rows=0, watermark=None)
+
+    def save_progress(value, rows):
+        committed_key, committed_watermark = value
+        RUN_CHECKPOINT.update(bound.table, last_key=committed_key, rows=rows, watermark=committed_watermark)
+
+    scope = METRICS.table
+    # Ek hedefler kendi staging tablolarına yazar (ana hedef zaten staging'e yazıyor olabilir)
+    extra_bound = BoundTableMapping(bound.mapping, bound.source_types, bound.target_columns)
+    for name in load_sync_state().get(bound.table, {}).get('partial_targets', {}):
+        if name in TARGET_DBS:
+            log.warning(f"{bound.table} -> {name}: önceki çalıştırmada yarıda kaldı, tablo eksik; yeniden yükleniyor")
+    targets = [FanOutTarget(name, extra_bound, lambda name=name: (connect_target(name), True), f"{scope}@{name}",
+                            f"[{name}] ") for name in TARGET_DBS]
+    if maria_conn is not None:
+        # Ana hedef bırakılmaz: onu beklemek fan-out olmadan da beklenecek süre (takılırsa sürücü zaman aşımı keser)
+        targets.insert(0, FanOutTarget("main", bound, lambda: (maria_conn, False), scope, extra=False,
+                                       on_commit=save_progress if checkpointed else None))
+
+    read_count = 0
+    live = list(targets)
+    try:
+        for batch in batched(records, MARIA_BATCH_SIZE):
+            with METRICS.stage('transform'):
+                rows = [transform(tracker.see(record)) for record in batch]
+            read_count += len(rows)
+            live = [target for target in live if target.put((rows, tracker.value))]
+            if not live:
+                break
+    except Exception as e:
+        for target in targets:
+            target.abort(e)
+        # Yazan thread'ler bitmeden ana bağlantı havuza / tekrar denemeye dönmesin
+        for target in targets:
+            target.thread.join()
+        raise
+    for target in targets:
+        target.finish()
+
+    main = targets[0] if maria_conn is not None else None
+    extras = [target for target in targets if target is not main]
+    for target in extras:
+        if target.error is not None:
+            report_target_failure(bound.table, target.name, target.error)
+    log.info(f"{bound.table}: {read_count} kayıt okundu, " + ", ".join(
+        f"{target.name}: {'HATA' if target.error else target.insert_count}" for target in targets))
+    if main is not None and main.error is not None:
+        raise main.error
+    return (read_count, main.insert_count if main else None, tracker.watermark.value,
+            {target.name: target.stats() for target in extras})
+
+
+def resumable_progress(bound, partitioned=False):
+    """Checkpointed full reload progress of `bound` from the failed run, or None.
+
+    Staging loads always start over; progress recorded for another target,
+    key column or partitioning is ignored.
+    """
+    if bound.staging:
+        return None
+    progress = RUN_CHECKPOINT.progress(bound.table)
+    if (not progress or progress.get('target') != bound.target or progress.get('key_column') != bound.key_column
+            or ('ranges' in progress) != partitioned):
+        return None
+    return progress
+
+
+def _value_size(value):
+    """Approximate bytes a bound value takes in the SQL text"""
+    if value is None:
+        return 4
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 2
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) + 10
+    return len(str(value)) + 2
+
+
+class InsertBatcher:
+    """Batching state of a multi-row INSERT, shared by `BatchWriter` and `AsyncBatchWriter`.
+
+    It only sizes batches, builds statements and keeps the accounting; the
+    writers send what it returns. Rows are sent as one
+    `INSERT ... VALUES (...), (...)` statement per batch. A batch ends at the
+    current row target or when its estimated size reaches
+    MARIA_PACKET_FRACTION of max_allowed_packet, whichever comes first. After
+    each statement the row target is scaled towards MARIA_BATCH_TARGET_SECONDS
+    per statement (at most x2 / x0.5 per step, within MIN/MAX_ROWS).
+
+    Commits are independent of statement size: every MARIA_COMMIT_ROWS rows
+    and on close. `on_commit(watermark, rows)` receives the newest watermark
+    whose rows are all committed and the number of rows added up to it.
+    """
+
+    def __init__(self, query, max_packet, label="", on_commit=None):
+        self.label = label
+        self.on_commit = on_commit
+
+        values_at = query.index(" VALUES ")
+        group_end = query.index(")", values_at) + 1
+        self.prefix = query[:values_at] + " VALUES "
+        self.group = query[values_at + len(" VALUES "):group_end]
+        self.suffix = query[group_end:]
+
+        self.max_packet = max_packet
+        self.max_bytes = int(self.max_packet * MARIA_PACKET_FRACTION) - len(self.prefix) - len(self.suffix)
+
+        self.batch_rows = min(max(MARIA_BATCH_SIZE, MARIA_BATCH_MIN_ROWS), MARIA_BATCH_MAX_ROWS)
+        self.rows = []
+        self.params = []
+        self.size = 0
+        self.watermarks = []  # (bu satır sayısına kadar, watermark)
+        self.added = 0
+        self.written = 0
+        self.committed = 0
+        self.statements = 0
+        self.bytes_sent = 0
+        self.write_seconds = 0.0
+        self.sizes_seen = [self.batch_rows, self.batch_rows]
+        self.started = time.monotonic()
+
+    @staticmethod
+    def row_size(row):
+        """Approximate bytes `row` adds to the statement"""
+        return sum(_value_size(value) for value in row) + len(row) + 3
+
+    def overflows(self, row_size):
+        """True when the queued rows must be written before a row of `row_size` fits"""
+        return bool(self.rows) and self.size + row_size > self.max_bytes
+
+    def append(self, row, row_size):
+        """Queue a row; True when the batch reached its row target"""
+        self.rows.append(row)
+        self.params.extend(row)
+        self.size += row_size
+        return len(self.rows) >= self.batch_rows
+
+    def extended(self, count, watermark):
+        """Record that `count` more rows, all at or below `watermark`, were queued"""
+        self.added += count
+        self.watermarks.append((self.added, watermark))
+
+    def statement(self):
+        """(sql, params) for the queued rows"""
+        return self.prefix + ','.join([self.group] * len(self.rows)) + self.suffix, self.params
+
+    def sent(self, elapsed):
+        """Account the written batch and adapt the row target; True when a commit is due"""
+        count = len(self.rows)
+        METRICS.add_time('insert', elapsed)
+        METRICS.count('batches')
+
+        self.statements += 1
+        self.bytes_sent += self.size
+        self.write_seconds += elapsed
+        self.written += count
+        self.rows, self.params, self.size = [], [], 0
+
+        if MARIA_BATCH_TARGET_SECONDS > 0 and elapsed > 0:
+            scale = min(2.0, max(0.5, MARIA_BATCH_TARGET_SECONDS / elapsed))
+            self.batch_rows = int(min(MARIA_BATCH_MAX_ROWS, max(MARIA_BATCH_MIN_ROWS, count * scale)))
+            self.sizes_seen = [min(self.sizes_seen[0], self.batch_rows), max(self.sizes_seen[1], self.batch_rows)]
+
+        return self.written - self.committed >= MARIA_COMMIT_ROWS
+
+    def commit_pending(self):
+        """True when written rows or queued watermarks still wait for a commit"""
+        return self.written > self.committed or bool(self.watermarks)
+
+    def mark_committed(self):
+        """Account a commit of everything written and report the committed watermark"""
+        self.committed = self.written
+        committed_watermark = committed_rows = None
+        while self.watermarks and self.watermarks[0][0] <= self.committed:
+            committed_rows, committed_watermark = self.watermarks.pop(0)
+        if self.on_commit and committed_watermark is not None:
+            self.on_commit(committed_watermark, committed_rows)
+        log.debug(f"{self.label}{self.committed} kayıt yazıldı",
+                  extra={'event': 'commit', 'fields': {'rows': self.committed}})
+
+    def finished(self):
+        """Log the batch statistics and return the number of rows written"""
+        elapsed = time.monotonic() - self.started
+        if self.statements:
+            log.info(f"{self.label}Batch: {self.statements} sorgu, ort. {self.written / self.statements:.0f} satır / "
+                     f"{self.bytes_sent / self.statements / 1024:.0f} KB (max_allowed_packet "
+                     f"{self.max_packet // 1024} KB), hedef {self.sizes_seen[0]}-{self.sizes_seen[1]} satır, "
+                     f"son {self.batch_rows}; {self.written / max(elapsed, 1e-9):.0f} satır/sn "
+                     f"(yazma {self.write_seconds:.1f} sn)")
+        return self.written
+
+
+class BatchWriter:
+    """Writes rows through an `InsertBatcher` on a mysql.connector connection.
+
+    A statement failing with a transient error (deadlock, lock wait timeout,
+    lost connection) is retried through `retry_transient`; since the rollback
+    or reconnect drops the whole open transaction, the statements sent since
+    the last commit are kept and resent with it.
+    """
+
+    def __init__(self, maria_cursor, maria_conn, query, label="", on_commit=None, max_packet=None):
+        self.maria_cursor = maria_cursor
+        self.maria_conn = maria_conn
+        self.label = label
+        if max_packet is None:
+            maria_cursor.execute("SELECT @@max_allowed_packet")
+            max_packet = int(maria_cursor.fetchone()[0])
+        self.batcher = InsertBatcher(query, max_packet, label, on_commit)
+        self.uncommitted = []  # son commit'ten beri gönderilen (sql, params); tekrar denemede yeniden gönderilir
+
+    def extend(self, rows, watermark=None):
+        """Queue rows; full batches are written (and committed) right away"""
+        batcher = self.batcher
+        for row in rows:
+            row_size = batcher.row_size(row)
+            if batcher.overflows(row_size):
+                self._flush()
+            if batcher.append(row, row_size):
+                self._flush()
+        batcher.extended(len(rows), watermark)
+
+    def _flush(self):
+        if not self.batcher.rows:
+            return
+        self.uncommitted.append(self.batcher.statement())
+        started = time.monotonic()
+        retry_transient(self.maria_conn, self._send, self.label)
+        if self.batcher.sent(time.monotonic() - started):
+            self._commit()
+
+    def _send(self, replay):
+        for sql, params in self.uncommitted if replay else self.uncommitted[-1:]:
+            self.maria_cursor.execute(sql, params)
+
+    def _commit(self):
+        with METRICS.stage('commit'):
+            self.maria_conn.commit()
+        self.uncommitted.clear()
+        self.batcher.mark_committed()
+
+    def close(self):
+        """Write and commit what is left, print the batch statistics"""
+        self._flush()
+        if self.batcher.commit_pending():
+            self._commit()
+        return self.batcher.finished()
+
+
+def insert_stream(maria_cursor, maria_conn, query, transform, records, watermark, label="", on_commit=None):
+    """Transform streamed source records and insert them through a `BatchWriter`.
+
+    `on_commit` is called after each commit with the highest watermark of the
+    rows committed so far and their count. With PIPELINE_COPY the work is
+    split across reader / transform / writer stages (see
+    `pipelined_insert_stream`).
+    """
+    if PIPELINE_COPY:
+        return pipelined_insert_stream(maria_cursor, maria_conn, query, transform, records, watermark, label,
+                                       on_commit)
+
+    writer = BatchWriter(maria_cursor, maria_conn, query, label, on_commit)
+
+    # Insert records in batches as they stream in
+    for batch in batched(records, MARIA_BATCH_SIZE):
+        with METRICS.stage('transform'):
+            rows = [transform(watermark.see(record)) for record in batch]
+        writer.extend(rows, watermark.value)
+    return writer.close()
+
+
+class StageTimer:
+    """Busy / idle seconds of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.idle = 0.0
+
+    def __str__(self):
+        return f"{self.name} meşgul {self.busy:.1f} sn / boşta {self.idle:.1f} sn"
+
+
+_PIPELINE_END = object()
+
+
+def pipelined_insert_stream(maria_cursor, maria_conn, query, transform, records, watermark, label="",
+                            on_commit=None):
+    """Producer-consumer version of `insert_stream`.
+
+    A reader thread fetches raw batches, an optional transform thread maps
+    them, and the calling thread writes and commits. Stages are connected by
+    queues of PIPELINE_QUEUE_SIZE batches so memory stays capped. The first
+    error in any stage stops the others and is re-raised here; after a reader
+    or transform error the writer rolls back instead of committing the rest.
+    """
+    stop = threading.Event()
+    errors = []
+    reader, transformer, writer = StageTimer("okuma"), StageTimer("dönüşüm"), StageTimer("yazma")
+    raw_batches = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    row_batches = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) if PIPELINE_TRANSFORM_STAGE else raw_batches
+
+    def put(q, item, timer):
+        started = time.monotonic()
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        timer.idle += time.monotonic() - started
+
+    def get(q, timer):
+        started = time.monotonic()
+        item = _PIPELINE_END
+        while not stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        timer.idle += time.monotonic() - started
+        return item
+
+    def transform_batch(batch):
+        # Watermark, batch dönüştürüldükten sonraki değeriyle birlikte taşınır
+        with METRICS.stage('transform'):
+            rows = [transform(watermark.see(record)) for record in batch]
+        return rows, watermark.value
+
+    def read():
+        source = iter(records)
+        try:
+            while not stop.is_set():
+                started = time.monotonic()
+                batch = list(islice(source, MARIA_BATCH_SIZE))
+                if batch and not PIPELINE_TRANSFORM_STAGE:
+                    batch = transform_batch(batch)
+                reader.busy += time.monotonic() - started
+                if not batch:
+                    break
+                put(raw_batches, batch, reader)
+            put(raw_batches, _PIPELINE_END, reader)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            if hasattr(records, 'close'):
+                records.close()
+
+    def transform_stage():
+        try:
+            while True:
+                batch = get(raw_batches, transformer)
+                if batch is _PIPELINE_END:
+                    break
+                started = time.monotonic()
+                batch = transform_batch(batch)
+                transformer.busy += time.monotonic() - started
+                put(row_batches, batch, transformer)
+            put(row_batches, _PIPELINE_END, transformer)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=METRICS.bind(read), name=f"{label}reader", daemon=True)]
+    if PIPELINE_TRANSFORM_STAGE:
+        threads.append(threading.Thread(target=METRICS.bind(transform_stage), name=f"{label}transform",
+                                        daemon=True))
+    for thread in threads:
+        thread.start()
+
+    batch_writer = BatchWriter(maria_cursor, maria_conn, query, label, on_commit)
+    try:
+        while True:
+            item = get(row_batches, writer)
+            if item is _PIPELINE_END:
+                break
+            rows, batch_watermark = item
+            started = time.monotonic()
+            batch_writer.extend(rows, batch_watermark)
+            writer.busy += time.monotonic() - started
+        if errors:
+            # Okuma/dönüşüm hatası: yarım kalan tablo commit edilmez, seri insert_stream'deki gibi geri alınır
+            maria_conn.rollback()
+        else:
+            started = time.monotonic()
+            insert_count = batch_writer.close()
+            writer.busy += time.monotonic() - started
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    stages = [reader, transformer, writer] if PIPELINE_TRANSFORM_STAGE else [reader, writer]
+    log.info(f"{label}Pipeline: " + ", ".join(str(stage) for stage in stages))
+    return insert_count
+
+
+def compute_id_ranges(pg_cursor, source, partitions, key_column='id'):
+    """Split a source table into contiguous key ranges.
+
+    Returns a list of (lower inclusive, upper exclusive) tuples where None
+    means unbounded. `minmax` splits [min, max] evenly and needs integer ids;
+    `quantile` uses percentile_disc over the (optionally sampled) ids so
+    skewed distributions get ranges of similar row counts.
+    """
+    if PARTITION_SPLIT == "quantile":
+        fractions = [k / partitions for k in range(1, partitions)]
+        sample = f" TABLESAMPLE SYSTEM ({PARTITION_SAMPLE_PERCENT})" if PARTITION_SAMPLE_PERCENT < 100 else ""
+        pg_cursor.execute(
+            f"SELECT percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY {key_column}) "
+            f"FROM {source}{sample}", (fractions,))
+        boundaries = pg_cursor.fetchone()[0] or []
+    else:
+        pg_cursor.execute(f"SELECT min({key_column}), max({key_column}) FROM {source}")
+        min_id, max_id = pg_cursor.fetchone()
+        if min_id is None:
+            return [(None, None)]
+        step = (max_id - min_id + 1) / partitions
+        boundaries = [min_id + int(step * k) for k in range(1, partitions)]
+
+    # Tekrarlanan sınırları at (küçük / çarpık tablolarda olur)
+    edges = sorted(set(b for b in boundaries if b is not None))
+    lowers = [None] + edges
+    uppers = edges + [None]
+    return list(zip(lowers, uppers))
+
+
+def _range_condition(id_range, key_column='id'):
+    lower, upper = id_range
+    conditions, params = [], []
+    if lower is not None:
+        conditions.append(f"{key_column} >= %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append(f"{key_column} < %s")
+        params.append(upper)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", tuple(params)
+
+
+def copy_id_range(bound, id_range, number, watermark_column=None, progress=None):
+    """Copy one id range on a dedicated source/target connection pair.
+
+    With checkpoint `progress` for the range, rows after its last committed
+    key (or the whole range, before the first checkpoint) are deleted and
+    only the rest of the range is copied.
+    """
+    started = time.monotonic()
+    where, params = _range_condition(id_range, bound.key_column)
+    last_key = progress.get('last_key') if progress else None
+    if last_key is None:
+        done_rows, watermark = 0, None
+    else:
+        done_rows, watermark = progress['rows'], restore_state_value(progress.get('watermark'))
+        where += (" AND " if where else " WHERE ") + f"{bound.key_column} > %s"
+        params += (last_key,)
+
+    def save_progress(value, rows):
+        committed_key, committed_watermark = value
+        RUN_CHECKPOINT.update(bound.table, number, last_key=committed_key, rows=done_rows + rows,
+                              watermark=committed_watermark)
+
+    pg_conn = connect_source()
+    maria_conn = connect_target()
+    try:
+        maria_cursor = maria_conn.cursor()
+        if bound.staging:
+            set_load_checks(maria_cursor, False)
+        if progress is not None:
+            # Son checkpoint'ten sonra commit edilmiş olabilecek satırları temizle
+            log.info(f"[{bound.table} #{number}] checkpoint'ten devam ediliyor, {done_rows} kayıt zaten yazılmış")
+            maria_cursor.execute(f"DELETE FROM {bound.target}{where}", params)
+            maria_conn.commit()
+        pg_columns, records = stream_source_rows(
+            pg_conn.cursor(), f"SELECT * FROM {bound.source}{where} ORDER BY {bound.key_column}",
+            f"{bound.table}_range_{number}", params)
+        tracker = CopyProgress(pg_columns, bound.key_column, watermark_column, watermark)
+        insert_count = done_rows + insert_stream(
+            maria_cursor, maria_conn, bound.insert_sql(), bound.row_transformer(pg_columns), records, tracker,
+            label=f"[{bound.table} #{number}] ", on_commit=None if bound.staging else save_progress)
+        maria_cursor.close()
+    finally:
+        pg_conn.close()
+        maria_conn.close()
+    if not bound.staging:
+        RUN_CHECKPOINT.update(bound.table, number, rows=insert_count, watermark=tracker.watermark.value, done=True)
+    return {
+        'range': id_range,
+        'rows': insert_count,
+        'duration': time.monotonic() - started,
+        'watermark': tracker.watermark.value,
+    }
+
+
+def partitioned_full_reload(pg_cursor, maria_cursor, maria_conn, bound, partitions, watermark_column=None):
+    """Full reload where each id range is copied by its own worker.
+
+    A failed range is cleared on the target and retried alone, up to
+    PARTITION_RETRIES times, without touching the other ranges. Progress is
+    checkpointed per range; a resumed run reuses the stored ranges, skips the
+    finished ones and continues the others after their last committed key.
+    Returns (read_count, insert_count, max watermark, per-range report).
+    """
+    table = bound.table
+    progress = resumable_progress(bound, partitioned=True)
+    if progress:
+        ranges = [tuple(part['range']) for part in progress['ranges']]
+        done = sum(1 for part in progress['ranges'] if part.get('done'))
+        log.info(f"{table}: checkpoint'ten devam ediliyor, {done}/{len(ranges)} aralık tamamlanmış: {ranges}")
+    else:
+        ranges = compute_id_ranges(pg_cursor, bound.source, partitions, bound.key_column)
+        log.info(f"{table}: {len(ranges)} id aralığına bölündü: {ranges}")
+
+        with METRICS.stage('truncate'):
+            maria_cursor.execute(f"TRUNCATE TABLE {bound.target}")
+            maria_conn.commit()
+        if not bound.staging:
+            RUN_CHECKPOINT.begin_table(table, target=bound.target, key_column=bound.key_column, ranges=[
+                {'range': list(id_range), 'last_key': None, 'rows': 0, 'watermark': None, 'done': False}
+                for id_range in ranges
+            ])
+
+    def run_range(number, id_range):
+        range_progress = progress['ranges'][number - 1] if progress else None
+        if range_progress and range_progress.get('done'):
+            return {'range': id_range, 'rows': range_progress['rows'], 'duration': 0.0, 'attempts': 0,
+                    'watermark': restore_state_value(range_progress.get('watermark'))}
+
+        for attempt in range(PARTITION_RETRIES + 1):
+            try:
+                result = copy_id_range(bound, id_range, number, watermark_column, range_progress)
+                result['attempts'] = attempt + 1
+                return result
+            except Exception as e:
+                if attempt == PARTITION_RETRIES:
+                    raise
+                log.warning(f"[{table} #{number}] aralık {id_range} hata verdi ({e}), tekrar deneniyor")
+                where, params = _range_condition(id_range, bound.key_column)
+                maria_cursor_retry = maria_conn_retry = None
+                try:
+                    maria_conn_retry = connect_target()
+                    maria_cursor_retry = maria_conn_retry.cursor()
+                    maria_cursor_retry.execute(f"DELETE FROM {bound.target}{where}", params)
+                    maria_conn_retry.commit()
+                finally:
+                    if maria_cursor_retry:
+                        maria_cursor_retry.close()
+                    if maria_conn_retry:
+                        maria_conn_retry.close()
+                range_progress = None
+                if not bound.staging:
+                    RUN_CHECKPOINT.update(table, number, last_key=None, rows=0, watermark=None)
+
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix=f"{table}-range") as executor:
+        report = list(executor.map(METRICS.bind(run_range), range(1, len(ranges) + 1), ranges))
+
+    for number, result in enumerate(report, 1):
+        log.info(f"[{table} #{number}] aralık {result['range']}: {result['rows']} kayıt, "
+                 f"{result['duration']:.1f} sn, {result['attempts']} deneme")
+
+    insert_count = sum(result['rows'] for result in report)
+    watermarks = [result['watermark'] for result in report if result['watermark'] is not None]
+    return insert_count, insert_count, max(watermarks, default=None), report
+
+
+def incremental_sync(pg_cursor, maria_cursor, maria_conn, bound, watermark_column, since):
+    """Upsert only rows whose watermark column is >= `since`.
+
+    `>=` re-reads the boundary rows of the previous run; the upsert makes that
+    harmless and protects against rows committed late with the same value.
+    The watermark is persisted after every committed batch.
+    """
+    pg_columns, records = stream_source_rows(
+        pg_cursor,
+        f"SELECT * FROM {bound.source} WHERE {watermark_column} >= %s ORDER BY {watermark_column}",
+        f"{bound.table}_incremental", (since,))
+
+    watermark = WatermarkTracker(pg_columns, watermark_column)
+
+    def save_watermark(committed_watermark, committed_rows):
+        update_sync_state(bound.table, watermark=committed_watermark, watermark_column=watermark_column)
+
+    upsert_count = insert_stream(maria_cursor, maria_conn, bound.insert_sql(upsert=True),
+                                 bound.row_transformer(pg_columns), records, watermark, on_commit=save_watermark)
+    log.info(f"{upsert_count} değişen kayıt okundu ({watermark_column} >= {since})")
+
+    return upsert_count, upsert_count, watermark.value
+
+
+def _digest_value(value):
+    """Normalise a value so PostgreSQL and MariaDB representations hash alike"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, datetime):
+        # MariaDB DATETIME saat dilimi tutmaz
+        return value.replace(tzinfo=None).isoformat(sep=' ')
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def row_digest(values):
+    """Digest of a mapped row, used to detect changed rows in diff mode"""
+    return hashlib.md5('\x1f'.join(_digest_value(v) for v in values).encode('utf-8')).digest()
+
+
+def stream_target_rows(maria_cursor, target, columns, page_size, key_column='id'):
+    """Yield target table rows ordered by key using keyset pagination.
+
+    Each page is fully fetched before it is yielded, so the same connection can
+    be used for writes between pages.
+    """
+    key_index = columns.index(key_column)
+    select = f"SELECT {','.join(columns)} FROM {target}"
+    query = f"{select} WHERE {key_column} > %s ORDER BY {key_column} LIMIT {page_size}"
+    maria_cursor.execute(f"{select} ORDER BY {key_column} LIMIT {page_size}")
+    while True:
+        page = maria_cursor.fetchall()
+        if not page:
+            return
+        yield from page
+        if len(page) < page_size:
+            return
+        maria_cursor.execute(query, (page[-1][key_index],))
+
+
+def diff_sync(pg_cursor, maria_cursor, maria_conn, bound):
+    """Write only the differences between source and target, without TRUNCATE.
+
+    Both sides are streamed ordered by id and merged; rows are compared by a
+    digest over the mapped column values, so memory use does not depend on
+    table size and writes are proportional to the change set. Assumes an
+    integer `id` primary key that sorts the same way on both servers.
+    Returns counts of inserted / updated / deleted / unchanged rows.
+    """
+    key_column = bound.key_column
+    pg_columns, records = stream_source_rows(
+        pg_cursor, f"SELECT * FROM {bound.source} ORDER BY {key_column}", f"{bound.table}_diff")
+
+    columns = bound.target_columns
+    key_index = columns.index(key_column)
+    insert_sql = bound.insert_sql()
+    update_sql = bound.insert_sql(upsert=True)
+
+    counts = {'read_count': 0, 'insert_count': 0, 'update_count': 0, 'delete_count': 0, 'no_change_count': 0}
+    pending = {'insert': [], 'update': [], 'delete': []}
+
+    def send(replay):
+        # Her flush kendi transaction'ı: tekrar denemede hepsi yeniden gönderilir
+        if pending['insert']:
+            maria_cursor.executemany(insert_sql, pending['insert'])
+        if pending['update']:
+            maria_cursor.executemany(update_sql, pending['update'])
+        if pending['delete']:
+            maria_cursor.execute(
+                f"DELETE FROM {bound.target} WHERE {key_column} IN ({','.join(['%s'] * len(pending['delete']))})",
+                pending['delete'])
+
+    def flush(force=False):
+        if not force and sum(len(rows) for rows in pending.values()) < MARIA_BATCH_SIZE:
+            return
+        with METRICS.stage('insert'):
+            retry_transient(maria_conn, send, f"[{bound.table}] ")
+        METRICS.count('batches')
+        with METRICS.stage('commit'):
+            maria_conn.commit()
+        for kind, rows in pending.items():
+            counts[f"{kind}_count"] += len(rows)
+            rows.clear()
+
+    transform = bound.row_transformer(pg_columns)
+    source = (transform(record) for record in records)
+    target = stream_target_rows(maria_cursor, bound.target, columns, PG_ITERSIZE, key_column)
+    src_row = next(source, None)
+    tgt_row = next(target, None)
+
+    # Sort-merge: iki akış da id'ye göre sıralı
+    while src_row is not None or tgt_row is not None:
+        if tgt_row is None or (src_row is not None and src_row[key_index] < tgt_row[key_index]):
+            pending['insert'].append(src_row)
+            counts['read_count'] += 1
+            src_row = next(source, None)
+        elif src_row is None or tgt_row[key_index] < src_row[key_index]:
+            pending['delete'].append(tgt_row[key_index])
+            tgt_row = next(target, None)
+        else:
+            if row_digest(src_row) != row_digest(tgt_row):
+                pending['update'].append(src_row)
+            else:
+                counts['no_change_count'] += 1
+            counts['read_count'] += 1
+            src_row = next(source, None)
+            tgt_row = next(target, None)
+        flush()
+    flush(force=True)
+
+    log.info(f"Diff: {counts['insert_count']} eklendi, {counts['update_count']} güncellendi, "
+             f"{counts['delete_count']} silindi, {counts['no_change_count']} değişmedi")
+    return counts
+
+
+def bulk_full_reload(pg_cursor, maria_cursor, maria_conn, bound):
+    """Full reload via COPY ... TO STDOUT and LOAD DATA LOCAL INFILE.
+
+    The column mapping is compiled into the COPY query itself
+    (`TableMapping.select_expr`), so no per-row
+    Python objects are built. Data flows through a named pipe
+    (BULK_TRANSFER_VIA=fifo) or a temporary file. Needs local_infile enabled
+    on the MariaDB server.
+    Returns (rows copied from PostgreSQL, rows loaded into MariaDB).
+    """
+    table = bound.table
+    columns = bound.target_columns
+    select_sql = f"SELECT {', '.join(bound.select_exprs())} FROM {bound.source} ORDER BY {bound.key_column}"
+    # FORCE_QUOTE: NULL olmayan her değer tırnaklı, NULL tırnaksız 'NULL' kelimesi olarak yazılır
+    copy_sql = f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv, NULL 'NULL', FORCE_QUOTE *)"
+
+    with METRICS.stage('truncate'):
+        maria_cursor.execute(f"TRUNCATE TABLE {bound.target}")
+        maria_conn.commit()
+
+    def load_sql(path):
+        return (f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {bound.target} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\n' ({','.join(columns)})")
+
+    work_dir = tempfile.mkdtemp(prefix=f"{table}_bulk_")
+    path = os.path.join(work_dir, f"{table}.csv")
+    try:
+        if BULK_TRANSFER_VIA == "fifo":
+            os.mkfifo(path)
+            errors = []
+
+            def write_pipe():
+                try:
+                    with open(path, 'wb') as pipe:
+                        pg_cursor.copy_expert(copy_sql, pipe)
+                except BaseException as e:
+                    errors.append(e)
+
+            writer = threading.Thread(target=METRICS.bind(write_pipe), name=f"{table}-copy", daemon=True)
+            writer.start()
+            try:
+                with METRICS.stage('load'):
+                    maria_cursor.execute(load_sql(path))
+            except BaseException:
+                # LOAD DATA pipe'ı hiç açmadıysa yazan thread open()'da bekler; okuma ucunu açıp bırak
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+                os.close(fd)
+                writer.join()
+                raise
+            writer.join()
+            if errors:
+                raise errors[0]
+        else:
+            with METRICS.stage('fetch'), open(path, 'wb') as spool:
+                pg_cursor.copy_expert(copy_sql, spool)
+            with METRICS.stage('load'):
+                maria_cursor.execute(load_sql(path))
+
+        read_count = pg_cursor.rowcount
+        insert_count = maria_cursor.rowcount
+        maria_conn.commit()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    log.info(f"{table}: COPY ile {read_count} kayıt okundu, LOAD DATA ile {insert_count} kayıt yüklendi")
+    return read_count, insert_count
+
+
+def set_load_checks(maria_cursor, enabled):
+    """Turn unique / foreign key checks on or off for this MariaDB session"""
+    flag = 1 if enabled else 0
+    maria_cursor.execute(f"SET SESSION unique_checks={flag}, foreign_key_checks={flag}")
+
+
+def shadow_load_blockers(maria_cursor, target):
+    """Foreign keys and triggers that a RENAME swap would not carry over"""
+    schema, table = split_table_name(target)
+    params = (schema, table)
+    maria_cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.KEY_COLUMN_USAGE WHERE REFERENCED_TABLE_NAME IS NOT NULL AND ("
+        "(TABLE_SCHEMA = COALESCE(NULLIF(%s, ''), DATABASE()) AND TABLE_NAME = %s) OR "
+        "(REFERENCED_TABLE_SCHEMA = COALESCE(NULLIF(%s, ''), DATABASE()) AND REFERENCED_TABLE_NAME = %s))",
+        params * 2)
+    foreign_keys = maria_cursor.fetchone()[0]
+    maria_cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TRIGGERS "
+        "WHERE EVENT_OBJECT_SCHEMA = COALESCE(NULLIF(%s, ''), DATABASE()) AND EVENT_OBJECT_TABLE = %s", params)
+    triggers = maria_cursor.fetchone()[0]
+
+    blockers = []
+    if foreign_keys:
+        blockers.append(f"{foreign_keys} foreign key kolonu")
+    if triggers:
+        blockers.append(f"{triggers} trigger")
+    return blockers
+
+
+def secondary_indexes(maria_cursor, table):
+    """{index name: ADD clause} for every non-primary index of a MariaDB table"""
+    maria_cursor.execute(f"SHOW INDEX FROM {table}")
+    names = [desc[0] for desc in maria_cursor.description]
+    indexes = {}
+    for row in maria_cursor.fetchall():
+        info = dict(zip(names, row))
+        if info['Key_name'] == 'PRIMARY':
+            continue
+        index = indexes.setdefault(info['Key_name'], {
+            'unique': not int(info['Non_unique']),
+            'type': info['Index_type'],
+            'parts': [],
+        })
+        part = f"`{info['Column_name']}`" + (f"({info['Sub_part']})" if info['Sub_part'] else "")
+        index['parts'].append((int(info['Seq_in_index']), part))
+
+    clauses = {}
+    for name, index in indexes.items():
+        kind = {'FULLTEXT': 'FULLTEXT INDEX', 'SPATIAL': 'SPATIAL INDEX'}.get(
+            index['type'], 'UNIQUE INDEX' if index['unique'] else 'INDEX')
+        clauses[name] = f"ADD {kind} `{name}` ({', '.join(part for _, part in sorted(index['parts']))})"
+    return clauses
+
+
+def shadow_full_load(maria_cursor, maria_conn, bound, load):
+    """Run `load` against a staging copy of the target and swap it in with RENAME.
+
+    The staging table is created with CREATE TABLE ... LIKE, its secondary
+    indexes are dropped for the load and rebuilt in one ALTER afterwards, and
+    the session runs with unique/foreign key checks off. Readers keep seeing
+    the old table until the single RENAME TABLE; if anything fails before
+    that, only the staging table is dropped.
+    """
+    target = bound.target
+    staging = f"{target}__staging"
+    old = f"{target}__old"
+
+    # Önceki yarım kalmış çalışmalardan kalanlar
+    maria_cursor.execute(f"DROP TABLE IF EXISTS {staging}, {old}")
+    maria_cursor.execute(f"CREATE TABLE {staging} LIKE {target}")
+    indexes = secondary_indexes(maria_cursor, staging)
+    if indexes:
+        maria_cursor.execute(f"ALTER TABLE {staging} " + ', '.join(f"DROP INDEX `{name}`" for name in indexes))
+
+    try:
+        set_load_checks(maria_cursor, False)
+        result = load(bound.with_target(staging))
+
+        if indexes:
+            started = time.monotonic()
+            maria_cursor.execute(f"ALTER TABLE {staging} " + ', '.join(indexes.values()))
+            METRICS.add_time('index_build', time.monotonic() - started)
+            log.info(f"{bound.table}: {len(indexes)} ikincil index yükleme sonrası oluşturuldu "
+                     f"({time.monotonic() - started:.1f} sn)")
+        set_load_checks(maria_cursor, True)
+
+        with METRICS.stage('swap'):
+            maria_cursor.execute(f"RENAME TABLE {target} TO {old}, {staging} TO {target}")
+    except Exception:
+        # Canlı tablo hiç değişmedi, sadece staging'i temizle
+        for sql in ("SET SESSION unique_checks=1, foreign_key_checks=1", f"DROP TABLE IF EXISTS {staging}"):
+            try:
+                maria_cursor.execute(sql)
+            except Exception:
+                pass
+        raise
+
+    maria_cursor.execute(f"DROP TABLE {old}")
+    maria_conn.commit()
+    log.info(f"{bound.table}: staging tablo RENAME ile canlıya alındı")
+    return result
+
+
+def run_full_load(maria_cursor, maria_conn, bound, load):
+    """Call `load(bound)` directly or through a staging table; returns (result, staged)"""
+    if not bound.shadow_load:
+        return load(bound), False
+
+    blockers = shadow_load_blockers(maria_cursor, bound.target)
+    if blockers:
+        log.warning(f"UYARI: {bound.target} için {', '.join(blockers)} var, RENAME ile taşınamaz; "
+                    f"tablo yerinde yükleniyor")
+        return load(bound), False
+    return shadow_full_load(maria_cursor, maria_conn, bound, load), True
+
+
+def copy_table(pg_cursor, maria_cursor, maria_conn, mapping):
+    """Copy one table according to its TableMapping and return partial stats.
+
+    Strategies: full (TRUNCATE + reload), incremental (watermark upsert), diff
+    (digest sort-merge that writes only changed rows) and bulk (COPY ->
+    LOAD DATA, mapping compiled to SQL).
+
+    Full reloads are split into `mapping.partitions` id ranges copied in
+    parallel when partitions > 1, and go through a staging table swapped in
+    by RENAME when `mapping.shadow_load` is set.
+
+    In incremental mode a full reload is still done when there is no stored
+    watermark yet, when SYNC_FORCE_FULL is set or when the last full reload is
+    older than FULL_RELOAD_INTERVAL_HOURS.
+
+    With extra targets (SYNC_TARGETS) the main target keeps its strategy. A
+    fresh, unpartitioned full reload reads the source once for all targets
+    (`fanout_full_reload`); otherwise the extra targets get a full reload
+    from a second read after the main copy.
+    """
+    bound = mapping.bind(pg_cursor, maria_cursor)
+    stats = copy_main_target(pg_cursor, maria_cursor, maria_conn, bound)
+    if TARGET_DBS and 'targets' not in stats:
+        log.info(f"{mapping.table}: ana hedef '{stats['mode']}' modunda yazıldı, ek hedefler ayrı bir okumayla "
+                 f"tam yükleniyor")
+        stats['targets'] = fanout_full_reload(pg_cursor, None, bound)[3]
+    return stats
+
+
+def copy_main_target(pg_cursor, maria_cursor, maria_conn, bound):
+    """`copy_table` on ORHAN_DB; a fan-out full reload also loads the extra targets and adds their 'targets'"""
+    mapping = bound.mapping
+    mode = mapping.strategy
+    table = mapping.table
+    watermark_column = mapping.watermark_column
+
+    if mode == "diff":
+        return dict(diff_sync(pg_cursor, maria_cursor, maria_conn, bound), mode='diff')
+
+    if mode == "bulk":
+        (read_count, insert_count), staged = run_full_load(
+            maria_cursor, maria_conn, bound, lambda b: bulk_full_reload(pg_cursor, maria_cursor, maria_conn, b))
+        return {'read_count': read_count, 'insert_count': insert_count, 'mode': 'bulk', 'staged': staged}
+
+    if mode == "incremental":
+        if not watermark_column:
+            raise ValueError(f"{table}: incremental mod için watermark kolonu tanımlı değil")
+
+        state = load_sync_state().get(table, {})
+        last_full = state.get('last_full_reload')
+        full_due = (
+                SYNC_FORCE_FULL
+                or state.get('watermark') is None
+                or state.get('watermark_column') != watermark_column
+                or last_full is None
+                or datetime.now() - datetime.fromisoformat(last_full) >= timedelta(hours=FULL_RELOAD_INTERVAL_HOURS)
+        )
+
+        if not full_due:
+            read_count, insert_count, _ = incremental_sync(
+                pg_cursor, maria_cursor, maria_conn, bound, watermark_column, state['watermark'])
+            return {'read_count': read_count, 'insert_count': insert_count, 'mode': 'incremental'}
+
+        log.info(f"{table}: periyodik / ilk tam yükleme yapılıyor")
+    elif mode != "full":
+        raise ValueError(f"{table}: bilinmeyen sync modu '{mode}'")
+
+    tracked_column = watermark_column if mode == "incremental" else None
+    copy_stats = {'mode': 'full'}
+
+    def load(target_bound):
+        if mapping.partitions > 1:
+            read_count, insert_count, max_watermark, copy_stats['partitions'] = partitioned_full_reload(
+                pg_cursor, maria_cursor, maria_conn, target_bound, mapping.partitions, tracked_column)
+            return read_count, insert_count, max_watermark
+        if TARGET_DBS and resumable_progress(target_bound) is None:
+            read_count, insert_count, max_watermark, copy_stats['targets'] = fanout_full_reload(
+                pg_cursor, maria_conn, target_bound, tracked_column)
+            return read_count, insert_count, max_watermark
+        return full_reload(pg_cursor, maria_cursor, maria_conn, target_bound, tracked_column)
+
+    (read_count, insert_count, max_watermark), copy_stats['staged'] = run_full_load(
+        maria_cursor, maria_conn, bound, load)
+    if mode == "incremental":
+        update_sync_state(table, watermark=max_watermark, watermark_column=watermark_column,
+                          last_full_reload=datetime.now().isoformat())
+    return dict(copy_stats, read_count=read_count, insert_count=insert_count)
+
+
+# endregion
+
+# region Mapped Table Sync Functions
+
+def sync_mapped_table(mapping, pg_cursor, maria_cursor, maria_conn):
+    """Copy one table described by a TableMapping and report it"""
+    log.info(f"{mapping.title} tablosu senkronizasyonu başlıyor")
+    start_time = datetime.now()
+
+    # region Data Transfer
+    copy_stats = copy_table(pg_cursor, maria_cursor, maria_conn, mapping)
+    # endregion
+
+    # region Final Count and Stats
+    # Verify final count
+    with METRICS.stage('count'):
+        maria_cursor.execute(f"SELECT COUNT(*) FROM {mapping.target}")
+        total_count = maria_cursor.fetchone()[0]
+
+    # Prepare stats
+    stats = {
+        **copy_stats,
+        'total_count': total_count,
+        'duration': datetime.now() - start_time
+    }
+
+    # Send completion notification
+    log.info(f"{mapping.title} tamamlandı - Toplam: {total_count} kayıt")
+    send_individual_table_completion(mapping.name, stats, mapping)
+    print_notification(f"{mapping.name.upper()} SYNC TAMAMLANDI\nEklenen: {stats['insert_count']} kayıt")
+
+    return stats
+    # endregion
+
+
+def sync_customers(pg_cursor, maria_cursor, maria_conn):
+    return sync_mapped_table(CUSTOMERS_MAPPING, pg_cursor, maria_cursor, maria_conn)
+
+
+def sync_routes(pg_cursor, maria_cursor, maria_conn):
+    return sync_mapped_table(ROUTES_MAPPING, pg_cursor, maria_cursor, maria_conn)
+
+
+# endregion
+
+# region Users Sync Function
+
+class PreparedStatements:
+    """Server-side prepared statements for SQL shapes executed over and over.
+
+    mysql.connector re-prepares a prepared cursor whenever its SQL text
+    changes, so every shape gets its own cursor (the least recently used one
+    is closed beyond `max_size`). With MARIA_PREPARED_STATEMENTS=0 a plain
+    text cursor is used instead.
+    """
+
+    def __init__(self, maria_conn, max_size=64):
+        self.maria_conn = maria_conn
+        self.max_size = max_size
+        self.cursors = OrderedDict()
+
+    def cursor(self, sql):
+        cursor = self.cursors.pop(sql, None)
+        if cursor is None:
+            if len(self.cursors) >= self.max_size:
+                self.cursors.popitem(last=False)[1].close()
+            cursor = self.maria_conn.cursor(prepared=True) if MARIA_PREPARED_STATEMENTS else self.maria_conn.cursor()
+        self.cursors[sql] = cursor
+        return cursor
+
+    def execute(self, sql, params):
+        self.cursor(sql).execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        self.cursor(sql).executemany(sql, seq_params)
+
+    def query(self, sql, params):
+        """Rows as dicts, like a dictionary cursor"""
+        cursor = self.cursor(sql)
+        cursor.execute(sql, params)
+        return dict_rows(cursor.description, cursor.fetchall())
+
+    def close(self):
+        for cursor in self.cursors.values():
+            cursor.close()
+        self.cursors.clear()
+
+
+def dict_rows(description, rows):
+    names = [desc[0] for desc in description]
+    return [dict(zip(names, row)) for row in rows]
+
+
+USERS_SELECT_BY_KEY = "SELECT * FROM admin_efes1.users WHERE id=%s AND position_code=%s"
+USERS_SELECT_BY_ID = "SELECT * FROM admin_efes1.users WHERE id=%s"
+USERS_SELECT_BY_POSITION = "SELECT * FROM admin_efes1.users WHERE position_code=%s"
+
+
+@lru_cache(maxsize=256)
+def users_update_sql(columns, move=False):
+    """UPDATE admin_efes1.users setting `columns` (plus position_code for a move), built once per shape"""
+    updates = [f"{col}=%s" for col in columns] + (["position_code=%s"] if move else [])
+    return f"UPDATE admin_efes1.users SET {', '.join(updates)} WHERE id=%s AND position_code=%s"
+
+
+def users_issue(error_messages, kind, message, **fields):
+    """Record a skipped / conflicting users row in `error_messages` as {'kind', 'message', 'fields'}"""
+    error_messages.append({'kind': kind, 'message': message, 'fields': fields})
+    row_event(kind, message, **fields)
 
-# region Users Sync Function
 
 def sync_users(pg_cursor, maria_cursor, maria_conn):
-    print("Users senkronizasyonu başlıyor.")
+    if USERS_SYNC_MODE == "bulk" or TARGET_DBS:
+        return sync_users_bulk(pg_cursor, maria_cursor, maria_conn)
+
+    log.info("Users senkronizasyonu başlıyor.")
     start_time = datetime.now()
 
     insert_count = 0
@@ -389,69 +3369,54 @@ def sync_users(pg_cursor, maria_cursor, maria_conn):
     maria_cursor = maria_conn.cursor(dictionary=True)
 
     # Get all users from PostgreSQL
-    pg_cursor.execute("SELECT * FROM neocortex_schema_v1.users ORDER BY id, position_code")
-    rows = pg_cursor.fetchall()
+    with METRICS.stage('fetch'):
+        pg_cursor.execute("SELECT * FROM neocortex_schema_v1.users ORDER BY id, position_code")
+        rows = pg_cursor.fetchall()
     columns = [desc[0] for desc in pg_cursor.description]
+    to_user = USERS_MAPPING.compile(columns, columns, source_column_types(pg_cursor, USERS_MAPPING.source))
     pg_user_keys = set()
+    value_columns = [col for col in columns if col not in ('id', 'position_code')]
+    insert_sql = f"INSERT INTO admin_efes1.users ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    # Tekrarlanan sorgu şekilleri sunucu tarafında bir kez hazırlanır
+    statements = PreparedStatements(maria_conn)
 
     # Process each user record
     for row in rows:
-        user_data = {}
-        for i, col in enumerate(columns):
-            val = row[i]
-            # Convert arrays to string format
-            if isinstance(val, list):
-                val = '{' + ','.join(str(x) for x in val) + '}'
-            user_data[col] = val
-
-        if 'account_active' in user_data:
-            if user_data['account_active']:
-                user_data['account_active'] = 1
-            else:
-                user_data['account_active'] = 0
+        user_data = dict(zip(columns, to_user(row)))
 
         user_id = user_data['id']
         position_code = user_data['position_code']
         pg_user_keys.add((user_id, position_code))
 
         # Check if user exists with same id and position_code
-        maria_cursor.execute(
-            "SELECT * FROM admin_efes1.users WHERE id=%s AND position_code=%s",
-            (user_id, position_code)
-        )
-        existing_user = maria_cursor.fetchone()
+        existing_rows = statements.query(USERS_SELECT_BY_KEY, (user_id, position_code))
+        existing_user = existing_rows[0] if existing_rows else None
 
         if existing_user:
             # Update existing user if data changed
-            updates, update_values = [], []
+            changed = tuple(col for col in value_columns if user_data[col] != existing_user[col])
 
-            for col in columns:
-                if col in ('id', 'position_code'):
-                    continue
-                if user_data[col] != existing_user[col]:
-                    updates.append(f"{col}=%s")
-                    update_values.append(user_data[col])
-
-            if updates:
-                update_values.extend([user_id, position_code])
-                sql = f"UPDATE admin_efes1.users SET {', '.join(updates)} WHERE id=%s AND position_code=%s"
-                maria_cursor.execute(sql, update_values)
-                print(f"Güncellendi: id={user_id}, position={position_code}")
+            if changed:
+                update_values = [user_data[col] for col in changed] + [user_id, position_code]
+                statements.execute(users_update_sql(changed), update_values)
+                row_event('updated', f"Güncellendi: id={user_id}, position={position_code}",
+                          id=user_id, position_code=position_code)
                 update_count += 1
             else:
-                print(f"Değişiklik yok: id={user_id}, position={position_code}")
+                row_event('unchanged', f"Değişiklik yok: id={user_id}, position={position_code}",
+                          id=user_id, position_code=position_code)
                 no_change_count += 1
 
         else:
             # Handle new user insertion with conflict resolution
-            maria_cursor.execute("SELECT * FROM admin_efes1.users WHERE id=%s", (user_id,))
-            rows_same_id = maria_cursor.fetchall()
+            rows_same_id = statements.query(USERS_SELECT_BY_ID, (user_id,))
 
             # Skip if PostgreSQL has NULL position_code but MariaDB already has this ID
             if rows_same_id and position_code is None:
-                mesaj = f"SKIP: id={user_id} → PostgreSQL'de position_code NULL ve MariaDB'de zaten bu id var."
-                print(mesaj)
-                error_messages.append(mesaj)
+                users_issue(error_messages, 'null_position',
+                            f"SKIP: id={user_id} → PostgreSQL'de position_code NULL ve MariaDB'de zaten bu id var.",
+                            id=user_id, position_code=None)
                 continue
 
             # Update position_code for existing user with same ID
@@ -459,87 +3424,86 @@ def sync_users(pg_cursor, maria_cursor, maria_conn):
                 for row_id in rows_same_id:
                     old_position_code = row_id['position_code']
                     if old_position_code != position_code:
-                        updates, update_values = [], []
-                        for col in columns:
-                            if col in ('id', 'position_code'):
-                                continue
-                            if user_data[col] != row_id[col]:
-                                updates.append(f"{col}=%s")
-                                update_values.append(user_data[col])
-                        updates.append("position_code=%s")
-                        update_values.append(position_code)
-                        update_values.extend([user_id, old_position_code])
-
-                        sql = f"UPDATE admin_efes1.users SET {', '.join(updates)} WHERE id=%s AND position_code=%s"
-                        maria_cursor.execute(sql, update_values)
-                        print(
-                            f"Position_code güncellendi: ID={user_id}, eski Position={old_position_code}, yeni Position={position_code}")
+                        changed = tuple(col for col in value_columns if user_data[col] != row_id[col])
+                        update_values = [user_data[col] for col in changed] + [position_code, user_id,
+                                                                               old_position_code]
+                        statements.execute(users_update_sql(changed, move=True), update_values)
+                        row_event('moved', f"Position_code güncellendi: ID={user_id}, eski Position={old_position_code}, "
+                                           f"yeni Position={position_code}",
+                                  id=user_id, position_code=position_code, old_position_code=old_position_code)
                         update_count += 1
             else:
                 # Check for position_code conflicts before inserting
-                maria_cursor.execute(
-                    "SELECT * FROM admin_efes1.users WHERE position_code=%s",
-                    (position_code,)
-                )
-                rows_same_position = maria_cursor.fetchall()
+                rows_same_position = statements.query(USERS_SELECT_BY_POSITION, (position_code,))
 
                 conflict_found = False
                 for row in rows_same_position:
                     if row['id'] != user_id:
-                        mesaj = f"UYARI: Aynı position_code farklı id ile var: position_code={position_code}, mevcut_id={row['id']}, yeni_id={user_id}"
-                        print(mesaj)
-                        error_messages.append(mesaj)
+                        users_issue(error_messages, 'position_conflict',
+                                    f"UYARI: Aynı position_code farklı id ile var: position_code={position_code}, "
+                                    f"mevcut_id={row['id']}, yeni_id={user_id}",
+                                    id=user_id, position_code=position_code, existing_id=row['id'])
                         conflict_found = True
 
                 # Insert new user if no conflicts
                 if not conflict_found:
-                    cols_str = ', '.join(columns)
-                    placeholders = ', '.join(['%s'] * len(columns))
-                    values = []
-                    for col in columns:
-                        val = user_data[col]
-                        if isinstance(val, list):
-                            val = '{' + ','.join(str(x) for x in val) + '}'
-                        values.append(val)
-
-                    insert_sql = f"INSERT INTO admin_efes1.users ({cols_str}) VALUES ({placeholders})"
-                    maria_cursor.execute(insert_sql, values)
-                    print(f"Eklendi: ID={user_id}, Position={position_code}")
+                    statements.execute(insert_sql, [user_data[col] for col in columns])
+                    row_event('inserted', f"Eklendi: ID={user_id}, Position={position_code}",
+                              id=user_id, position_code=position_code)
                     insert_count += 1
 
     # Check for records in MariaDB that don't exist in PostgreSQL
-    maria_cursor.execute("SELECT id, position_code FROM admin_efes1.users")
-    maria_users = maria_cursor.fetchall()
+    if not users_orphans_on_server():
+        maria_cursor.execute("SELECT id, position_code FROM admin_efes1.users")
+        maria_users = maria_cursor.fetchall()
 
-    for user in maria_users:
-        key = (user['id'], user['position_code'])
-        if key not in pg_user_keys:
-            mesaj = f"MariaDB'de var ama PostgreSQL'de yok: ID={key[0]}, Position={key[1]}"
-            print(mesaj)
-            error_messages.append(mesaj)
+        for user in maria_users:
+            key = (user['id'], user['position_code'])
+            if key not in pg_user_keys:
+                users_issue(error_messages, 'orphan', f"MariaDB'de var ama PostgreSQL'de yok: ID={key[0]}, Position={key[1]}",
+                            id=key[0], position_code=key[1])
 
     maria_conn.commit()
+    statements.close()
     maria_cursor.close()  # Close dictionary cursor
 
+    delete_count = 0
+    if users_orphans_on_server():
+        delete_count = handle_users_orphans(maria_conn, pg_user_keys, columns, error_messages)
+
+    return finish_users_sync(start_time, len(rows), insert_count, update_count, no_change_count, error_messages,
+                             delete_count)
+
+
+def finish_users_sync(start_time, read_count, insert_count, update_count, no_change_count, error_messages,
+                      delete_count=0, targets=None):
+    """Build users stats, print the summary and send notifications; `targets` are extra target stats"""
     # Prepare stats
     stats = {
-        'read_count': len(rows),
+        'read_count': read_count,
         'insert_count': insert_count,
         'update_count': update_count,
+        'delete_count': delete_count,
         'no_change_count': no_change_count,
         'error_count': len(error_messages),
         'duration': datetime.now() - start_time
     }
+    if targets:
+        stats['targets'] = targets
 
     # Summary and send notifications
-    print("\n--- SENKRONİZASYON ÖZETİ ---")
-    print(f"Toplam PostgreSQL'den okunan kayıt: {len(rows)}")
-    print(f"Güncellenen: {update_count}")
-    print(f"Ekleme yapılan: {insert_count}")
-    print(f"Değişmeyen: {no_change_count}")
-    print(f"Hatalı / Çakışan: {len(error_messages)}")
-    for err in error_messages:
-        print("HATA:", err)
+    log.info("\n--- SENKRONİZASYON ÖZETİ ---")
+    log.info(f"Toplam PostgreSQL'den okunan kayıt: {read_count}")
+    log.info(f"Güncellenen: {update_count}")
+    log.info(f"Ekleme yapılan: {insert_count}")
+    log.info(f"Değişmeyen: {no_change_count}")
+    if USERS_ORPHAN_POLICY != "report":
+        log.info(f"{'Arşivlenen' if USERS_ORPHAN_POLICY == 'archive' else 'Silinen'} (PostgreSQL'de yok): {delete_count}")
+    log.info(f"Hatalı / Çakışan: {len(error_messages)}")
+    for issue in error_messages:
+        log.warning(f"HATA: {issue['message']}", extra={'event': issue['kind'], 'fields': issue['fields']})
+    if targets:
+        log.info("Ek hedefler:" + target_lines(stats))
 
     send_individual_table_completion("users", stats)
     print_notification(f"USERS SYNC TAMAMLANDI\nEklenen: {insert_count}, Güncellenen: {update_count}")
@@ -549,51 +3513,1071 @@ def sync_users(pg_cursor, maria_cursor, maria_conn):
 
 # endregion
 
-# region Main Sync Function
+# region Users Bulk Sync
+
+def _lookup_key(value):
+    """Normalise a lookup value the way MariaDB's `col=%s` comparison sees it"""
+    # utf8mb4_unicode_ci: büyük/küçük harf duyarsız, sondaki boşluklar yok sayılır
+    if isinstance(value, str):
+        return value.rstrip(' ').casefold()
+    return value
+
+
+class UsersIndex:
+    """In-memory copy of admin_efes1.users indexed by (id, position_code), id and position_code.
+
+    Lookups follow SQL semantics: a NULL value never matches `col=%s`.
+    """
+
+    def __init__(self, rows):
+        self.rows = []
+        self.by_key = defaultdict(list)
+        self.by_id = defaultdict(list)
+        self.by_position = defaultdict(list)
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        self.rows.append(row)
+        user_id, position_code = _lookup_key(row['id']), _lookup_key(row['position_code'])
+        if user_id is not None:
+            self.by_id[user_id].append(row)
+            if position_code is not None:
+                self.by_key[(user_id, position_code)].append(row)
+        if position_code is not None:
+            self.by_position[position_code].append(row)
+
+    def find(self, user_id, position_code):
+        if user_id is None or position_code is None:
+            return []
+        return self.by_key.get((_lookup_key(user_id), _lookup_key(position_code)), [])
+
+    def find_by_id(self, user_id):
+        if user_id is None:
+            return []
+        return self.by_id.get(_lookup_key(user_id), [])
+
+    def find_by_position(self, position_code):
+        if position_code is None:
+            return []
+        return self.by_position.get(_lookup_key(position_code), [])
+
+    def move(self, row, new_position_code):
+        """Change a row's position_code and re-index it"""
+        user_id, old_position_code = _lookup_key(row['id']), _lookup_key(row['position_code'])
+        if old_position_code is not None:
+            self.by_position[old_position_code].remove(row)
+            if user_id is not None:
+                self.by_key[(user_id, old_position_code)].remove(row)
+        row['position_code'] = new_position_code
+        new_position_code = _lookup_key(new_position_code)
+        if new_position_code is not None:
+            self.by_position[new_position_code].append(row)
+            if user_id is not None:
+                self.by_key[(user_id, new_position_code)].append(row)
+
+
+def plan_users_sync(columns, users, index, report_missing=True):
+    """Reconcile PostgreSQL users against an in-memory UsersIndex.
+
+    Applies exactly the rules of the per-row path in `sync_users`, mutating
+    `index` as MariaDB would be mutated, and returns the planned operations as
+    a list of ('update' | 'move' | 'insert', user_data, old_position_code,
+    changed_columns) together with the counters and error messages.
+    `report_missing=False` skips the MariaDB-only rows report, for an index
+    holding only part of the table.
+    """
+    operations = []
+    insert_count = 0
+    update_count = 0
+    no_change_count = 0
+    error_messages = []
+    pg_user_keys = set()
+    value_columns = [col for col in columns if col not in ('id', 'position_code')]
+
+    for user_data in users:
+        user_id = user_data['id']
+        position_code = user_data['position_code']
+        pg_user_keys.add((user_id, position_code))
+
+        # Check if user exists with same id and position_code
+        existing_rows = index.find(user_id, position_code)
+
+        if existing_rows:
+            # Update existing user if data changed
+            changed = [col for col in value_columns if user_data[col] != existing_rows[0][col]]
+            if changed:
+                for existing in existing_rows:
+                    for col in changed:
+                        existing[col] = user_data[col]
+                operations.append(('update', user_data, position_code, tuple(changed)))
+                row_event('updated', f"Güncellendi: id={user_id}, position={position_code}",
+                          id=user_id, position_code=position_code)
+                update_count += 1
+            else:
+                row_event('unchanged', f"Değişiklik yok: id={user_id}, position={position_code}",
+                          id=user_id, position_code=position_code)
+                no_change_count += 1
+            continue
+
+        # Snapshot, per-row path'teki fetchall() sonucunun karşılığı
+        rows_same_id = [dict(row) for row in index.find_by_id(user_id)]
+
+        # Skip if PostgreSQL has NULL position_code but MariaDB already has this ID
+        if rows_same_id and position_code is None:
+            users_issue(error_messages, 'null_position',
+                        f"SKIP: id={user_id} → PostgreSQL'de position_code NULL ve MariaDB'de zaten bu id var.",
+                        id=user_id, position_code=None)
+            continue
+
+        # Update position_code for existing user with same ID
+        if rows_same_id:
+            for row_id in rows_same_id:
+                old_position_code = row_id['position_code']
+                if old_position_code != position_code:
+                    changed = [col for col in value_columns if user_data[col] != row_id[col]]
+                    for target in list(index.find(user_id, old_position_code)):
+                        for col in changed:
+                            target[col] = user_data[col]
+                        index.move(target, position_code)
+                    operations.append(('move', user_data, old_position_code, tuple(changed)))
+                    row_event('moved', f"Position_code güncellendi: ID={user_id}, eski Position={old_position_code}, "
+                                       f"yeni Position={position_code}",
+                              id=user_id, position_code=position_code, old_position_code=old_position_code)
+                    update_count += 1
+            continue
+
+        # Check for position_code conflicts before inserting
+        conflict_found = False
+        for row in index.find_by_position(position_code):
+            if row['id'] != user_id:
+                users_issue(error_messages, 'position_conflict',
+                            f"UYARI: Aynı position_code farklı id ile var: position_code={position_code}, "
+                            f"mevcut_id={row['id']}, yeni_id={user_id}",
+                            id=user_id, position_code=position_code, existing_id=row['id'])
+                conflict_found = True
+
+        # Insert new user if no conflicts
+        if not conflict_found:
+            index.add(dict(user_data))
+            operations.append(('insert', user_data, None, ()))
+            row_event('inserted', f"Eklendi: ID={user_id}, Position={position_code}",
+                      id=user_id, position_code=position_code)
+            insert_count += 1
+
+    # Check for records in MariaDB that don't exist in PostgreSQL
+    for user in index.rows if report_missing else ():
+        key = (user['id'], user['position_code'])
+        if key not in pg_user_keys:
+            users_issue(error_messages, 'orphan', f"MariaDB'de var ama PostgreSQL'de yok: ID={key[0]}, Position={key[1]}",
+                        id=key[0], position_code=key[1])
+
+    return operations, insert_count, update_count, no_change_count, error_messages
+
+
+def users_upsert_supported(maria_cursor):
+    """True when every unique key of admin_efes1.users lies within (id, position_code).
+
+    Only then does INSERT ... ON DUPLICATE KEY UPDATE hit the same row the
+    per-row `UPDATE ... WHERE id=%s AND position_code=%s` would.
+    """
+    maria_cursor.execute("SHOW INDEX FROM admin_efes1.users")
+    return users_upsert_allowed(maria_cursor.fetchall())
 
-def run_sync():
-    start_time = send_detailed_start_message()
 
-    print("=== DATABASE SYNC BAŞLIYOR ===")
-    print(f"Başlangıç zamanı: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+def users_upsert_allowed(index_rows):
+    """`users_upsert_supported` for SHOW INDEX rows given as dicts"""
+    unique_keys = defaultdict(set)
+    for row in index_rows:
+        if int(row['Non_unique']) == 0:
+            unique_keys[row['Key_name']].add(row['Column_name'])
+    return bool(unique_keys) and all(cols <= {'id', 'position_code'} for cols in unique_keys.values())
 
-    # Database connections - tek sefer açılıyor
-    pg_conn = None
-    maria_conn = None
 
+def apply_users_plan(maria_cursor, operations, columns, use_upsert, statements=None):
+    """Execute planned users operations as batched executemany calls (see `users_plan_runs`).
+
+    UPDATEs go through `statements` (prepared) when given; INSERTs stay on
+    the text cursor, which mysql.connector rewrites into one multi-row INSERT.
+    """
+    round_trips = 0
+    for sql, run in users_plan_runs(operations, columns, use_upsert):
+        if statements is not None and sql.startswith("UPDATE"):
+            statements.executemany(sql, run)
+        else:
+            maria_cursor.executemany(sql, run)
+        round_trips += 1
+    return round_trips
+
+
+def users_plan_runs(operations, columns, use_upsert):
+    """Yield (sql, values list) runs for planned users operations.
+
+    Consecutive operations sharing the same statement form one run of at most
+    MARIA_BATCH_SIZE; the overall order is preserved because a move can
+    depend on an earlier update. Plain updates become one multi-row INSERT ...
+    ON DUPLICATE KEY UPDATE when `use_upsert` is set, otherwise they keep the
+    per-row path's SET columns.
+    """
+    value_columns = [col for col in columns if col not in ('id', 'position_code')]
+    cols_str = ', '.join(columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    insert_sql = f"INSERT INTO admin_efes1.users ({cols_str}) VALUES ({placeholders})"
+    upsert_sql = insert_sql + " ON DUPLICATE KEY UPDATE " + ', '.join(f"{col}=VALUES({col})" for col in value_columns)
+    use_upsert = use_upsert and bool(value_columns)
+
+    def statement(kind, user_data, old_position_code, changed):
+        if kind == 'insert':
+            return insert_sql, [user_data[col] for col in columns]
+        if kind == 'update' and use_upsert:
+            return upsert_sql, [user_data[col] for col in columns]
+
+        update_values = [user_data[col] for col in changed]
+        if kind == 'move':
+            update_values.append(user_data['position_code'])
+        update_values.extend([user_data['id'], old_position_code])
+        return users_update_sql(changed, move=kind == 'move'), update_values
+
+    run_sql, run = None, []
+    for operation in operations:
+        sql, values = statement(*operation)
+        if run and (sql != run_sql or len(run) == MARIA_BATCH_SIZE):
+            yield run_sql, run
+            run = []
+        run_sql = sql
+        run.append(values)
+    if run:
+        yield run_sql, run
+
+
+def sync_users_bulk(pg_cursor, maria_cursor, maria_conn):
+    """Set-based variant of `sync_users`: one read per side, batched writes, same stats.
+
+    The source is read once; with SYNC_TARGETS it is reconciled with every
+    extra target at the same time, each on its own thread and connection.
+    """
+    log.info("Users senkronizasyonu başlıyor (bulk).")
+    start_time = datetime.now()
+
+    # Get all users from PostgreSQL
+    with METRICS.stage('fetch'):
+        pg_cursor.execute("SELECT * FROM neocortex_schema_v1.users ORDER BY id, position_code")
+        rows = pg_cursor.fetchall()
+    columns = [desc[0] for desc in pg_cursor.description]
+    to_user = USERS_MAPPING.compile(columns, columns, source_column_types(pg_cursor, USERS_MAPPING.source))
+    users = [dict(zip(columns, to_user(row))) for row in rows]
+
+    with ThreadPoolExecutor(max_workers=max(len(TARGET_DBS), 1), thread_name_prefix="users-target") as executor:
+        futures = {name: executor.submit(reconcile_users_target, name, columns, users) for name in TARGET_DBS}
+        insert_count, update_count, no_change_count, error_messages, delete_count = reconcile_users(
+            maria_conn, columns, users)
+        targets = {name: target_result('users', name, future) for name, future in futures.items()}
+
+    return finish_users_sync(start_time, len(rows), insert_count, update_count, no_change_count, error_messages,
+                             delete_count, targets)
+
+
+def reconcile_users(maria_conn, columns, users):
+    """Plan and apply the users of the source on one target.
+
+    Returns (insert_count, update_count, no_change_count, error_messages,
+    delete_count).
+    """
+    maria_cursor = maria_conn.cursor(dictionary=True)
+
+    # MariaDB tablosunu tek seferde belleğe al
+    with METRICS.stage('target_read'):
+        maria_cursor.execute("SELECT * FROM admin_efes1.users")
+        index = UsersIndex(maria_cursor.fetchall())
+    log.info(f"MariaDB'den {len(index.rows)} kullanıcı yüklendi")
+
+    with METRICS.stage('transform'):
+        operations, insert_count, update_count, no_change_count, error_messages = plan_users_sync(
+            columns, users, index, report_missing=not users_orphans_on_server())
+
+    use_upsert = users_upsert_supported(maria_cursor)
+    statements = PreparedStatements(maria_conn)
     try:
-        # Connect to PostgreSQL (source)
-        print("PostgreSQL bağlantısı kuruluyor...")
-        pg_conn = psycopg2.connect(**BE_DB)
-        pg_conn.set_client_encoding('UTF8')
-        pg_cursor = pg_conn.cursor()
+        with METRICS.stage('insert'):
+            round_trips = apply_users_plan(maria_cursor, operations, columns, use_upsert, statements)
+    finally:
+        statements.close()
+    METRICS.count('batches', round_trips)
+    log.info(f"{len(operations)} işlem {round_trips} toplu sorgu ile uygulandı "
+             f"({'ON DUPLICATE KEY UPDATE' if use_upsert else 'UPDATE'})")
+
+    with METRICS.stage('commit'):
+        maria_conn.commit()
+    maria_cursor.close()  # Close dictionary cursor
+
+    delete_count = 0
+    if users_orphans_on_server():
+        delete_count = handle_users_orphans(
+            maria_conn, {(user['id'], user['position_code']) for user in users}, columns, error_messages)
+    return insert_count, update_count, no_change_count, error_messages, delete_count
+
 
-        # Connect to MariaDB (destination)
-        print("MariaDB bağlantısı kuruluyor...")
-        maria_conn = mysql.connector.connect(**ORHAN_DB, charset='utf8mb4', collation='utf8mb4_unicode_ci')
+def reconcile_users_target(name, columns, users):
+    """`reconcile_users` on extra target `name`, on its own connection; returns its stats"""
+    started = time.monotonic()
+    with METRICS.scope(f"users@{name}"):
+        maria_conn = connect_target(name)
+        try:
+            insert_count, update_count, no_change_count, error_messages, delete_count = reconcile_users(
+                maria_conn, columns, users)
+        finally:
+            maria_conn.close()
+    return {'insert_count': insert_count, 'update_count': update_count, 'no_change_count': no_change_count,
+            'delete_count': delete_count, 'error_count': len(error_messages),
+            'duration': round(time.monotonic() - started, 3), 'error': None}
+
+
+# endregion
+
+# region Users Orphans
+
+USERS_KEYS_TABLE = "sync_user_keys"  # bağlantıya özel geçici tablo
+
+# users satırının PostgreSQL anahtarlarında olmadığı koşul (NULL position_code NULL ile eşleşir)
+USERS_NOT_IN_SOURCE = (f"NOT EXISTS (SELECT 1 FROM {USERS_KEYS_TABLE} k WHERE k.id = admin_efes1.users.id "
+                       f"AND k.position_code <=> admin_efes1.users.position_code)")
+
+
+def users_orphans_on_server():
+    return USERS_ORPHAN_CHECK == "server" or USERS_ORPHAN_POLICY in ("delete", "archive")
+
+
+def load_users_keys(maria_cursor, user_keys):
+    """Load PostgreSQL (id, position_code) keys into the USERS_KEYS_TABLE temporary table.
+
+    The table is created from admin_efes1.users, so it has the same column
+    types and collation and key matches on the server behave like the sync's
+    `id=%s AND position_code=%s` lookups.
+    """
+    maria_cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {USERS_KEYS_TABLE}")
+    maria_cursor.execute(f"CREATE TEMPORARY TABLE {USERS_KEYS_TABLE} (KEY (id, position_code)) "
+                         "SELECT id, position_code FROM admin_efes1.users LIMIT 0")
+    keys = list(user_keys)
+    for start in range(0, len(keys), MARIA_BATCH_SIZE):
+        batch = keys[start:start + MARIA_BATCH_SIZE]
+        maria_cursor.execute(
+            f"INSERT INTO {USERS_KEYS_TABLE} (id, position_code) VALUES {', '.join(['(%s, %s)'] * len(batch))}",
+            [value for key in batch for value in key])
+        METRICS.count('batches')
+
+
+def find_users_orphans(maria_cursor):
+    """admin_efes1.users keys missing from USERS_KEYS_TABLE, with one indexed anti-join"""
+    maria_cursor.execute(
+        f"SELECT u.id, u.position_code FROM admin_efes1.users u LEFT JOIN {USERS_KEYS_TABLE} k "
+        "ON k.id = u.id AND k.position_code <=> u.position_code WHERE k.id IS NULL ORDER BY u.id")
+    return [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in maria_cursor.fetchall()]
+
+
+def remove_users_orphans(maria_cursor, orphans, columns, archive):
+    """Delete (after copying them into USERS_ORPHAN_ARCHIVE_TABLE if `archive`) the orphan rows in id batches"""
+    if archive:
+        cols = ', '.join(columns)
+        maria_cursor.execute(f"CREATE TABLE IF NOT EXISTS {USERS_ORPHAN_ARCHIVE_TABLE} "
+                             f"SELECT {cols}, NOW() AS archived_at FROM admin_efes1.users LIMIT 0")
+    ids = sorted({user_id for user_id, _ in orphans})
+    removed = 0
+    for start in range(0, len(ids), MARIA_BATCH_SIZE):
+        batch = ids[start:start + MARIA_BATCH_SIZE]
+        where = f"WHERE id IN ({', '.join(['%s'] * len(batch))}) AND {USERS_NOT_IN_SOURCE}"
+        if archive:
+            maria_cursor.execute(f"INSERT INTO {USERS_ORPHAN_ARCHIVE_TABLE} ({cols}, archived_at) "
+                                 f"SELECT {cols}, NOW() FROM admin_efes1.users {where}", batch)
+        maria_cursor.execute(f"DELETE FROM admin_efes1.users {where}", batch)
+        removed += maria_cursor.rowcount
+        METRICS.count('batches')
+    return removed
+
+
+def handle_users_orphans(maria_conn, user_keys, columns, error_messages):
+    """Find users rows PostgreSQL no longer has on the server and apply USERS_ORPHAN_POLICY.
+
+    Runs after the sync's own commit, in its own transaction. `report` adds
+    them to `error_messages` like the client-side check; `delete` and
+    `archive` remove them and return how many rows were removed.
+    """
+    maria_cursor = maria_conn.cursor()
+    try:
+        with METRICS.stage('orphans'):
+            load_users_keys(maria_cursor, user_keys)
+            orphans = find_users_orphans(maria_cursor)
+
+            policy = USERS_ORPHAN_POLICY
+            if orphans and policy != "report" and not user_keys:
+                log.warning("UYARI: PostgreSQL'den kullanıcı okunmadı, MariaDB'deki kayıtlar silinmeyecek")
+                policy = "report"
+
+            if policy == "report":
+                for user_id, position_code in orphans:
+                    users_issue(error_messages, 'orphan',
+                                f"MariaDB'de var ama PostgreSQL'de yok: ID={user_id}, Position={position_code}",
+                                id=user_id, position_code=position_code)
+                removed = 0
+            else:
+                removed = remove_users_orphans(maria_cursor, orphans, columns, archive=policy == "archive")
+                event, label = ("archived", "Arşivlendi") if policy == "archive" else ("deleted", "Silindi")
+                for user_id, position_code in orphans:
+                    row_event(event, f"{label} (PostgreSQL'de yok): ID={user_id}, Position={position_code}",
+                              id=user_id, position_code=position_code)
+
+            maria_cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {USERS_KEYS_TABLE}")
+        with METRICS.stage('commit'):
+            maria_conn.commit()
+    finally:
+        maria_cursor.close()
+    log.info(f"PostgreSQL'de olmayan users kaydı: {len(orphans)} (anti-join, {len(user_keys)} anahtar)")
+    return removed
+
+
+# endregion
+
+# region Connection Pool and Table Jobs
+
+def connect_source():
+    """Open a PostgreSQL (source) connection"""
+    log.info("PostgreSQL bağlantısı kuruluyor...")
+    return InstrumentedConnection(connect_with_retry(_open_source, "PostgreSQL"), "source", _open_source)
+
+
+def _open_source():
+    conn = psycopg2.connect(**BE_DB, connect_timeout=DB_CONNECT_TIMEOUT, keepalives=1,
+                            keepalives_idle=DB_KEEPALIVE_IDLE_SECONDS,
+                            keepalives_interval=DB_KEEPALIVE_INTERVAL_SECONDS,
+                            keepalives_count=DB_KEEPALIVE_COUNT)
+    conn.set_client_encoding('UTF8')
+    configure_source_connection(conn)
+    return conn
+
+
+def configure_source_connection(conn):
+    """Keep json/jsonb as PostgreSQL's own text (asyncpg's default), so rows match `TableMapping.select_expr`"""
+    psycopg2.extras.register_default_json(conn, loads=str)
+    psycopg2.extras.register_default_jsonb(conn, loads=str)
+
+
+def connect_target(target=None):
+    """Open a MariaDB (destination) connection; `target` names one of TARGET_DBS instead of ORHAN_DB"""
+    name = f"MariaDB ({target})" if target else "MariaDB"
+    log.info(f"{name} bağlantısı kuruluyor...")
+    open_target = partial(_open_target, target)
+    return InstrumentedConnection(connect_with_retry(open_target, name), "target", open_target)
+
+
+def _open_target(target=None):
+    import mysql.connector
+
+    db = TARGET_DBS[target] if target else ORHAN_DB
+    if target and not db['host']:
+        raise ValueError(f"{target.upper()}_DB_HOST tanımlı değil")
+    # mysql.connector TCP keepalive desteklemiyor; kopan bağlantıyı okuma/yazma zaman aşımı yakalar
+    return mysql.connector.connect(**db, charset='utf8mb4', collation='utf8mb4_unicode_ci',
+                                   connection_timeout=DB_CONNECT_TIMEOUT,
+                                   read_timeout=MARIA_READ_TIMEOUT or None, write_timeout=MARIA_READ_TIMEOUT or None,
+                                   allow_local_infile=any(m.strategy == "bulk" for m in COPIED_TABLE_MAPPINGS))
+
+
+class ConnectionPool:
+    """Small thread-safe pool; connections are opened lazily up to `max_size`"""
+
+    def __init__(self, factory, max_size, name):
+        self.factory = factory
+        self.name = name
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.all = []
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            conn = self.factory()
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.all.append(conn)
+        return conn
+
+    def release(self, conn, broken=False):
+        if broken:
+            # Hatalı bağlantıyı havuza geri koyma
+            with self.lock:
+                self.all.remove(conn)
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            self.idle.put(conn)
+        self.slots.release()
+
+    def close_all(self):
+        with self.lock:
+            conns, self.all = self.all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if conns:
+            log.info(f"{self.name} bağlantıları kapatıldı ({len(conns)})")
+
+
+# Bağımsız tablo işleri: (anahtar, başlık, sync fonksiyonu)
+TABLE_JOBS = [
+    ("customers", "Customers", sync_customers),
+    ("routes", "Routes", sync_routes),
+    ("users", "Users", sync_users),
+] + [(mapping.name, mapping.title, partial(sync_mapped_table, mapping)) for mapping in EXTRA_TABLE_MAPPINGS]
+
+
+def run_table_job(key, title, sync_fn, pg_pool, maria_pool):
+    """Run one table sync on its own source/target connection pair and checkpoint its stats.
+
+    A job failing with a transient error that the batch retries could not
+    absorb (e.g. a lost source connection mid-stream) is restarted on fresh
+    connections up to DB_RETRIES times; it continues from the run checkpoint.
+    Jobs in PROFILER.tables are profiled, retries included.
+    """
+    with METRICS.scope(key), METRICS.stage('total'), PROFILER.profile(key):
+        attempt = 0
+        while True:
+            try:
+                stats = _run_table_job(title, sync_fn, pg_pool, maria_pool)
+                break
+            except Exception as e:
+                delay = retry_table_job(title, e, attempt)
+                attempt += 1
+                time.sleep(delay)
+    RUN_CHECKPOINT.finish_job(key, stats)
+    return stats
+
+
+def retry_table_job(title, error, attempt):
+    """Backoff before restarting a failed table job; re-raises `error` when it must not be retried"""
+    delay = transient_retry_delay(error, attempt)
+    if delay is None:
+        raise error
+    METRICS.count('retried_jobs')
+    log.warning(f"{title}: geçici hata ({error}), iş {delay:.0f} sn sonra checkpoint'ten devam edecek "
+             f"({attempt + 1}/{DB_RETRIES})")
+    return delay
+
+
+def _run_table_job(title, sync_fn, pg_pool, maria_pool):
+    log.info(f"\n{title} sync başlıyor.")
+    pg_conn = pg_pool.acquire()
+    try:
+        maria_conn = maria_pool.acquire()
+    except Exception:
+        pg_pool.release(pg_conn)
+        raise
+
+    broken = False
+    pg_cursor = maria_cursor = None
+    try:
+        pg_cursor = pg_conn.cursor()
         maria_cursor = maria_conn.cursor()
+        return sync_fn(pg_cursor, maria_cursor, maria_conn)
+    except Exception:
+        broken = True
+        raise
+    finally:
+        for cursor in (pg_cursor, maria_cursor):
+            if cursor is None:
+                continue
+            try:
+                cursor.close()
+            except Exception:
+                broken = True
+        if not broken:
+            # Okuma transaction'ını kapat, snapshot'ı bırak
+            try:
+                pg_conn.rollback()
+            except Exception as e:
+                log.warning(f"{title}: PostgreSQL rollback başarısız ({e}), bağlantı kapatılıyor")
+                broken = True
+        # Havuz slotları her durumda geri verilir, yoksa sonraki işler acquire'da sonsuza dek bekler
+        pg_pool.release(pg_conn, broken)
+        maria_pool.release(maria_conn, broken)
+
+
+def check_run_schema(mappings, pg_pool, maria_pool):
+    """`check_schema` on a connection pair from the pools"""
+    pg_conn = pg_pool.acquire()
+    try:
+        maria_conn = maria_pool.acquire()
+    except Exception:
+        pg_pool.release(pg_conn)
+        raise
 
-        # Tüm sync işlemlerini çalıştır ve sonuçları al
-        print("\nCustomers sync başlıyor.")
-        customers_stats = sync_customers(pg_cursor, maria_cursor, maria_conn)
+    broken = False
+    try:
+        pg_cursor, maria_cursor = pg_conn.cursor(), maria_conn.cursor()
+        check_schema(pg_cursor, maria_cursor, mappings)
+        pg_cursor.close()
+        maria_cursor.close()
+        pg_conn.rollback()
+    except Exception:
+        broken = True
+        raise
+    finally:
+        pg_pool.release(pg_conn, broken)
+        maria_pool.release(maria_conn, broken)
+
+
+def run_table_jobs(jobs, pg_pool, maria_pool, parallelism):
+    """Run table jobs sequentially or in a thread pool and return stats by key.
+
+    On failure the jobs that have not started yet are cancelled, running ones
+    are allowed to finish and the first error is re-raised.
+    """
+    if parallelism <= 1:
+        return {key: run_table_job(key, title, sync_fn, pg_pool, maria_pool) for key, title, sync_fn in jobs}
+
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="sync") as executor:
+        futures = {
+            executor.submit(run_table_job, key, title, sync_fn, pg_pool, maria_pool): key
+            for key, title, sync_fn in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                if not errors:
+                    for pending in futures:
+                        pending.cancel()
+                errors.append(e)
+    if errors:
+        raise errors[0]
+    return results
 
-        print("\nRoutes sync başlıyor.")
-        routes_stats = sync_routes(pg_cursor, maria_cursor, maria_conn)
 
-        print("\nUsers sync başlıyor.")
-        users_stats = sync_users(pg_cursor, maria_cursor, maria_conn)
+# endregion
+
+# region Async Engine
+
+class AsyncBatchWriter:
+    """Writes rows through an `InsertBatcher` on an aiomysql connection; statements are awaited.
+
+    Transient errors are retried like in `BatchWriter`, through
+    `retry_transient_async`, resending the statements since the last commit.
+    """
+
+    def __init__(self, maria_conn, query, max_packet, label="", on_commit=None):
+        self.maria_conn = maria_conn
+        self.batcher = InsertBatcher(query, max_packet, label, on_commit)
+        self.uncommitted = []  # son commit'ten beri gönderilen (sql, params); tekrar denemede yeniden gönderilir
+
+    async def extend(self, rows, watermark=None):
+        batcher = self.batcher
+        for row in rows:
+            row_size = batcher.row_size(row)
+            if batcher.overflows(row_size):
+                await self._flush()
+            if batcher.append(row, row_size):
+                await self._flush()
+        batcher.extended(len(rows), watermark)
+
+    async def _flush(self):
+        if not self.batcher.rows:
+            return
+        self.uncommitted.append(self.batcher.statement())
+        started = time.monotonic()
+        await retry_transient_async(self.maria_conn, self._send, self.batcher.label)
+        if self.batcher.sent(time.monotonic() - started):
+            await self._commit()
+
+    async def _send(self, replay):
+        async with self.maria_conn.cursor() as cursor:
+            for sql, params in self.uncommitted if replay else self.uncommitted[-1:]:
+                await cursor.execute(sql, params)
+                METRICS.count('target_round_trips')
+
+    async def _commit(self):
+        with METRICS.stage('commit'):
+            await self.maria_conn.commit()
+        METRICS.count('target_round_trips')
+        self.uncommitted.clear()
+        self.batcher.mark_committed()
+
+    async def close(self):
+        await self._flush()
+        if self.batcher.commit_pending():
+            await self._commit()
+        return self.batcher.finished()
+
+
+async def open_async_pools(size):
+    """asyncpg and aiomysql pools of up to `size` connections each"""
+    import asyncpg
+    import aiomysql
+
+    log.info("PostgreSQL (asyncpg) ve MariaDB (aiomysql) havuzları açılıyor...")
+    pg_pool = await asyncpg.create_pool(
+        host=BE_DB['host'], port=int(BE_DB['port']) if BE_DB['port'] else None, database=BE_DB['database'],
+        user=BE_DB['user'], password=BE_DB['password'], min_size=1, max_size=size,
+        timeout=DB_CONNECT_TIMEOUT)
+    try:
+        maria_pool = await aiomysql.create_pool(
+            host=ORHAN_DB['host'], port=int(ORHAN_DB['port'] or 3306), db=ORHAN_DB['database'],
+            user=ORHAN_DB['user'], password=ORHAN_DB['password'], minsize=1, maxsize=size, charset='utf8mb4',
+            init_command="SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci", autocommit=False,
+            connect_timeout=DB_CONNECT_TIMEOUT)
+    except Exception:
+        await pg_pool.close()
+        raise
+    return pg_pool, maria_pool
+
+
+async def close_async_pools(pg_pool, maria_pool):
+    maria_pool.close()
+    await maria_pool.wait_closed()
+    await pg_pool.close()
+    log.info("Async bağlantı havuzları kapatıldı")
+
+
+async def async_full_reload(pg_conn, maria_conn, bound):
+    """`full_reload` on asyncpg / aiomysql connections, with the same checkpointing.
+
+    The source is read through an asyncpg cursor (binary protocol) in chunks
+    of PG_ITERSIZE inside a read transaction.
+    Returns (read_count, insert_count).
+    """
+    key_column = bound.key_column
+    progress = resumable_progress(bound)
+    last_key = progress.get('last_key') if progress else None
+
+    async with maria_conn.cursor() as cursor:
+        with METRICS.stage('truncate'):
+            if last_key is None:
+                await cursor.execute(f"TRUNCATE TABLE {bound.target}")
+            else:
+                await cursor.execute(f"DELETE FROM {bound.target} WHERE {key_column} > %s", (last_key,))
+            await maria_conn.commit()
+        await cursor.execute("SELECT @@max_allowed_packet")
+        max_packet = int((await cursor.fetchone())[0])
+    METRICS.count('target_round_trips', 3)
+
+    if last_key is None:
+        done_rows = 0
+        RUN_CHECKPOINT.begin_table(bound.table, target=bound.target, key_column=key_column,
+                                   last_key=None, rows=0, watermark=None)
+    else:
+        done_rows = progress['rows']
+        log.info(f"{bound.table}: checkpoint'ten devam ediliyor, {done_rows} kayıt zaten yazılmış "
+                 f"({key_column} > {last_key})")
+
+    def save_progress(value, rows):
+        committed_key, committed_watermark = value
+        RUN_CHECKPOINT.update(bound.table, last_key=committed_key, rows=done_rows + rows,
+                              watermark=committed_watermark)
+
+    query = f"SELECT * FROM {bound.source}"
+    args = ()
+    if last_key is not None:
+        query += f" WHERE {key_column} > $1"
+        args = (last_key,)
+    query += f" ORDER BY {key_column}"
+
+    async with pg_conn.transaction(readonly=True):
+        with METRICS.stage('fetch'):
+            statement = await pg_conn.prepare(query)
+            columns = [attribute.name for attribute in statement.get_attributes()]
+            cursor = await statement.cursor(*args)
+        METRICS.count('source_round_trips', 2)
+        tracker = CopyProgress(columns, key_column, None)
+        transform = bound.row_transformer(columns)
+        writer = AsyncBatchWriter(maria_conn, bound.insert_sql(), max_packet, on_commit=save_progress)
+        while True:
+            with METRICS.stage('fetch'):
+                chunk = await cursor.fetch(PG_ITERSIZE)
+            METRICS.count('source_round_trips')
+            if not chunk:
+                break
+            for batch in batched(chunk, MARIA_BATCH_SIZE):
+                with METRICS.stage('transform'):
+                    rows = [transform(tracker.see(record)) for record in batch]
+                await writer.extend(rows, tracker.value)
+        insert_count = await writer.close()
+
+    read_count = done_rows + insert_count
+    log.info(f"{read_count} kayıt okundu")
+    return read_count, read_count
+
+
+async def async_sync_mapped_table(mapping, pg_pool, maria_pool):
+    """`sync_mapped_table` for a plain full reload on the async pools; same stats"""
+    log.info(f"{mapping.title} tablosu senkronizasyonu başlıyor")
+    start_time = datetime.now()
+    bound = BoundTableMapping(mapping, dict(SCHEMA.source[mapping.source]),
+                              [column for column, _ in SCHEMA.target[mapping.target]])
+
+    async with pg_pool.acquire() as pg_conn, maria_pool.acquire() as maria_conn:
+        read_count, insert_count = await async_full_reload(pg_conn, maria_conn, bound)
+        with METRICS.stage('count'):
+            async with maria_conn.cursor() as cursor:
+                await cursor.execute(f"SELECT COUNT(*) FROM {mapping.target}")
+                total_count = (await cursor.fetchone())[0]
+        METRICS.count('target_round_trips')
+
+    stats = {
+        'mode': 'full',
+        'staged': False,
+        'read_count': read_count,
+        'insert_count': insert_count,
+        'total_count': total_count,
+        'duration': datetime.now() - start_time
+    }
+
+    log.info(f"{mapping.title} tamamlandı - Toplam: {total_count} kayıt")
+    send_individual_table_completion(mapping.name, stats, mapping)
+    print_notification(f"{mapping.name.upper()} SYNC TAMAMLANDI\nEklenen: {stats['insert_count']} kayıt")
+    return stats
+
+
+async def async_sync_users(pg_pool, maria_pool):
+    """Users sync on the async pools: `sync_users_bulk`'s plan, so the same rules and stats as both modes"""
+    log.info("Users senkronizasyonu başlıyor (async).")
+    start_time = datetime.now()
+
+    async with pg_pool.acquire() as pg_conn, maria_pool.acquire() as maria_conn:
+        with METRICS.stage('fetch'):
+            statement = await pg_conn.prepare("SELECT * FROM neocortex_schema_v1.users ORDER BY id, position_code")
+            columns = [attribute.name for attribute in statement.get_attributes()]
+            rows = await statement.fetch()
+        METRICS.count('source_round_trips', 2)
+        to_user = USERS_MAPPING.compile(columns, columns, dict(SCHEMA.source[USERS_MAPPING.source]))
+
+        async with maria_conn.cursor() as cursor:
+            with METRICS.stage('target_read'):
+                await cursor.execute("SELECT * FROM admin_efes1.users")
+                index = UsersIndex(dict_rows(cursor.description, await cursor.fetchall()))
+                await cursor.execute("SHOW INDEX FROM admin_efes1.users")
+                use_upsert = users_upsert_allowed(dict_rows(cursor.description, await cursor.fetchall()))
+            METRICS.count('target_round_trips', 2)
+            log.info(f"MariaDB'den {len(index.rows)} kullanıcı yüklendi")
+
+            with METRICS.stage('transform'):
+                operations, insert_count, update_count, no_change_count, error_messages = plan_users_sync(
+                    columns, (dict(zip(columns, to_user(row))) for row in rows), index)
+
+            round_trips = 0
+            with METRICS.stage('insert'):
+                for sql, run in users_plan_runs(operations, columns, use_upsert):
+                    await cursor.executemany(sql, run)
+                    round_trips += 1
+            METRICS.count('batches', round_trips)
+            METRICS.count('target_round_trips', round_trips)
+            log.info(f"{len(operations)} işlem {round_trips} toplu sorgu ile uygulandı "
+                     f"({'ON DUPLICATE KEY UPDATE' if use_upsert else 'UPDATE'})")
+
+        with METRICS.stage('commit'):
+            await maria_conn.commit()
+        METRICS.count('target_round_trips')
+
+    return finish_users_sync(start_time, len(rows), insert_count, update_count, no_change_count, error_messages)
+
+
+def async_unsupported(key):
+    """Why job `key` has no native coroutine on the async engine, None if it has one.
+
+    Native: plain full reloads (not partitioned, no shadow load) of mappings
+    whose schema is in SCHEMA, and users unless orphans are deleted or
+    archived. Fan-out to extra targets (SYNC_TARGETS) runs on threads only.
+    """
+    if TARGET_DBS:
+        return "SYNC_TARGETS ile fan-out"
+    if key == 'users':
+        if USERS_ORPHAN_POLICY in ("delete", "archive"):
+            return f"USERS_ORPHAN_POLICY={USERS_ORPHAN_POLICY}"
+        return None if USERS_MAPPING.source in SCHEMA.source else "şema önbellekte yok"
+    mapping = next((mapping for mapping in COPIED_TABLE_MAPPINGS if mapping.name == key), None)
+    if mapping is None:
+        return "tablo eşlemesi yok"
+    if mapping.strategy != "full":
+        return f"'{mapping.strategy}' modu"
+    if mapping.partitions > 1:
+        return f"{mapping.partitions} bölümlü yükleme"
+    if mapping.shadow_load:
+        return "shadow load"
+    if mapping.source not in SCHEMA.source or mapping.target not in SCHEMA.target:
+        return "şema önbellekte yok"
+    return None
+
+
+def async_table_job(key, pg_pool, maria_pool):
+    """Coroutine running job `key` natively on the async pools, None if only the thread engine supports it"""
+    if async_unsupported(key):
+        return None
+    if key == 'users':
+        return async_sync_users(pg_pool, maria_pool)
+    mapping = next(mapping for mapping in COPIED_TABLE_MAPPINGS if mapping.name == key)
+    return async_sync_mapped_table(mapping, pg_pool, maria_pool)
+
+
+async def run_table_jobs_async(jobs, pg_pool, maria_pool, parallelism):
+    """`run_table_jobs` on the async engine: jobs are coroutines sharing asyncpg / aiomysql pools.
+
+    At most `parallelism` jobs run at once. Jobs without a native coroutine
+    run the thread engine's job in a worker thread on `pg_pool` /
+    `maria_pool`. On failure the jobs that have not started are cancelled,
+    running ones finish and the first error is re-raised.
+    """
+    import asyncio
+
+    pg_async, maria_async = await open_async_pools(parallelism)
+    slots = asyncio.Semaphore(parallelism)
+    started = set()
+
+    async def run(key, title, sync_fn):
+        async with slots:
+            started.add(key)
+            coroutine = async_table_job(key, pg_async, maria_async)
+            if coroutine is None:
+                log.warning(f"{title}: async motorda karşılığı yok ({async_unsupported(key)}), "
+                            f"thread motoruyla çalışıyor")
+                return await asyncio.to_thread(run_table_job, key, title, sync_fn, pg_pool, maria_pool)
+            log.info(f"\n{title} sync başlıyor.")
+            with METRICS.scope(key), METRICS.stage('total'):
+                attempt = 0
+                while True:
+                    try:
+                        stats = await coroutine
+                        break
+                    except Exception as e:
+                        delay = retry_table_job(title, e, attempt)
+                        attempt += 1
+                        await asyncio.sleep(delay)
+                        coroutine = async_table_job(key, pg_async, maria_async)
+            RUN_CHECKPOINT.finish_job(key, stats)
+            return stats
+
+    try:
+        tasks = {asyncio.create_task(run(*job)): job[0] for job in jobs}
+        results, errors = {}, []
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    if not errors:
+                        for other in pending:
+                            if tasks[other] not in started:
+                                other.cancel()
+                    errors.append(task.exception())
+                else:
+                    results[tasks[task]] = task.result()
+        if errors:
+            raise errors[0]
+        return results
+    finally:
+        await close_async_pools(pg_async, maria_async)
+
+
+# endregion
+
+# region Main Sync Function
+
+def run_sync(resume=False, tables=None, notify=True):
+    """Sync all tables, or only the job keys in `tables`.
+
+    Holds `batch_sync_lock` for the whole run, so change capture pauses, and
+    raises SyncAlreadyRunning if another sync has it. With `resume` the checkpoint of a failed run is
+    continued. With `notify=False` only errors are sent to Teams.
+    """
+    # main() dışından (başka bir script, cron wrapper) çağrıldığında da INFO logları görünsün
+    LOGGING.start()
+    jobs = TABLE_JOBS if tables is None else [job for job in TABLE_JOBS if job[0] in tables]
+    unknown = set(tables or ()) - {key for key, _, _ in TABLE_JOBS}
+    if unknown:
+        raise ValueError(f"Bilinmeyen tablo: {', '.join(sorted(unknown))}")
+
+    with batch_sync_lock():
+        NOTIFIER.only_errors = not notify
+        try:
+            return _run_sync(jobs, resume)
+        finally:
+            NOTIFIER.only_errors = False
+
+
+def _run_sync(jobs, resume):
+    start_time = send_detailed_start_message(jobs)
+    METRICS.reset()
+
+    log.info("=== DATABASE SYNC BAŞLIYOR ===")
+    log.info(f"Başlangıç zamanı: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # Checkpoint: --resume ile önceki çalıştırmada biten tablolar atlanır
+    keys = [key for key, _, _ in jobs]
+    copied_tables = [mapping.table for mapping in COPIED_TABLE_MAPPINGS if mapping.name in keys]
+    results = {}
+    if RUN_CHECKPOINT.start(keys, copied_tables, resume):
+        for key, title, _ in jobs:
+            stats = RUN_CHECKPOINT.finished_job(key)
+            if stats is not None:
+                results[key] = stats
+                log.info(f"{title} önceki çalıştırmada tamamlanmış, atlanıyor")
+    elif resume:
+        log.info("Devam edilecek checkpoint yok, tüm tablolar senkronize edilecek")
+    pending_jobs = [job for job in jobs if job[0] not in results]
+
+    # Database connections - her tablo işi havuzdan kendi bağlantı çiftini alır
+    parallelism = max(1, SYNC_PARALLEL_TABLES)
+    if PROFILER.tables:
+        # Profilde örnekler karışmasın: tablolar sırayla, thread motorunda
+        parallelism = 1
+        if SYNC_ENGINE == "async":
+            log.warning("Profil thread motorunda alınıyor (SYNC_ENGINE=async yok sayıldı)")
+    pg_pool = ConnectionPool(connect_source, parallelism, "PostgreSQL")
+    maria_pool = ConnectionPool(connect_target, parallelism, "MariaDB")
+
+    try:
+        # Tüm sync işlemlerini çalıştır ve sonuçları al
+        if parallelism > 1:
+            log.info(f"Tablolar paralel çalışacak (en fazla {parallelism} iş)")
+        # Şema kontrolü: yazmadan önce, her sunucuya tek sorgu
+        check_run_schema([mapping for mapping in COPIED_TABLE_MAPPINGS + [USERS_MAPPING] if mapping.name in keys],
+                         pg_pool, maria_pool)
+        if SYNC_ENGINE == "async" and not PROFILER.tables:
+            import asyncio
+            results.update(asyncio.run(run_table_jobs_async(pending_jobs, pg_pool, maria_pool, parallelism)))
+        else:
+            results.update(run_table_jobs(pending_jobs, pg_pool, maria_pool, parallelism))
+        RUN_CHECKPOINT.clear(keys, copied_tables)
+
+        # Metrik raporu
+        report = METRICS.report(results)
+        write_metrics(report)
 
         # Final özet raporu gönder
-        send_final_summary(start_time, customers_stats, routes_stats, users_stats, success=True)
+        other_stats = {mapping.title: results[mapping.name] for mapping in EXTRA_TABLE_MAPPINGS
+                       if mapping.name in results}
+        send_final_summary(start_time, results.get('customers'), results.get('routes'), results.get('users'),
+                           success=True, other_stats=other_stats, metrics=report)
 
         end_time = datetime.now()
         duration = end_time - start_time
 
-        print("TÜM SYNC TAMAMLANDI")
-        print(f"Süre: {duration}")
-        print(f"Bitiş zamanı: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        log.info("TÜM SYNC TAMAMLANDI")
+        log.info(f"Süre: {duration}")
+        log.info(f"Bitiş zamanı: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
         print_notification(f"TÜM SYNC TAMAMLANDI\nSüre: {duration}")
+        return results
 
     except Exception as e:
         # Hata durumunda detaylı rapor
@@ -609,40 +4593,590 @@ Gecen Sure: {duration_str}
 Durum: Islem yarida kesildi
 """
 
-        send_teams_message(error_message, "SYNC HATASI", "ff0000")
-        print(f"HATA: {e}")
+        send_teams_message(error_message, "SYNC HATASI", "ff0000", kind="error")
+        log.error(f"HATA: {e}")
+        write_metrics(METRICS.report({}, success=False))
         raise
 
     finally:
         # Database bağlantılarını kapat
+        pg_pool.close_all()
+        maria_pool.close_all()
+
+
+# endregion
+
+
+# region Change Capture
+
+def capture_mappings():
+    """{source table name: TableMapping} for the job keys in CDC_TABLES"""
+    mappings = {mapping.name: mapping for mapping in COPIED_TABLE_MAPPINGS + [USERS_MAPPING]}
+    selected = {}
+    for key in filter(None, (key.strip() for key in CDC_TABLES.split(','))):
+        if key not in mappings:
+            raise ValueError(f"CDC_TABLES: bilinmeyen tablo '{key}'")
+        selected[mappings[key].table] = mappings[key]
+    return selected
+
+
+def capture_function():
+    return f"{split_table_name(CDC_CHANGELOG_TABLE)[0] or 'public'}.sync_capture_change"
+
+
+def install_capture(pg_conn):
+    """Create the changelog table, the trigger function and a row trigger on every captured source table.
+
+    The trigger only records (table, key); the row itself is read at apply
+    time, so several changes to one key collapse into a single write. An
+    UPDATE that changes the key also records the old key.
+    """
+    pg_cursor = pg_conn.cursor()
+    pg_cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CDC_CHANGELOG_TABLE} (
+            change_id bigserial PRIMARY KEY,
+            table_name text NOT NULL,
+            row_key text,
+            changed_at timestamptz NOT NULL DEFAULT now()
+        )""")
+    pg_cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {capture_function()}() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            new_key text;
+            old_key text;
+        BEGIN
+            IF TG_OP <> 'DELETE' THEN
+                new_key := to_jsonb(NEW) ->> TG_ARGV[0];
+                INSERT INTO {CDC_CHANGELOG_TABLE} (table_name, row_key) VALUES (TG_TABLE_NAME, new_key);
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                old_key := to_jsonb(OLD) ->> TG_ARGV[0];
+                IF old_key IS DISTINCT FROM new_key THEN
+                    INSERT INTO {CDC_CHANGELOG_TABLE} (table_name, row_key) VALUES (TG_TABLE_NAME, old_key);
+                END IF;
+            END IF;
+            PERFORM pg_notify('{CDC_CHANNEL}', TG_TABLE_NAME);
+            RETURN NULL;
+        END
+        $$""")
+    for table, mapping in capture_mappings().items():
+        pg_cursor.execute(f"DROP TRIGGER IF EXISTS sync_capture ON {mapping.source}")
+        pg_cursor.execute(f"CREATE TRIGGER sync_capture AFTER INSERT OR UPDATE OR DELETE ON {mapping.source} "
+                          f"FOR EACH ROW EXECUTE PROCEDURE {capture_function()}('{mapping.key_column}')")
+        log.info(f"Capture trigger kuruldu: {mapping.source} ({mapping.key_column})")
+    pg_conn.commit()
+    pg_cursor.close()
+
+
+def remove_capture(pg_conn):
+    """Drop the triggers, the trigger function and the changelog table"""
+    pg_cursor = pg_conn.cursor()
+    for mapping in capture_mappings().values():
+        pg_cursor.execute(f"DROP TRIGGER IF EXISTS sync_capture ON {mapping.source}")
+    pg_cursor.execute(f"DROP FUNCTION IF EXISTS {capture_function()}() CASCADE")
+    pg_cursor.execute(f"DROP TABLE IF EXISTS {CDC_CHANGELOG_TABLE}")
+    pg_conn.commit()
+    pg_cursor.close()
+    log.info("Capture trigger'ları ve changelog tablosu kaldırıldı")
+
+
+def apply_table_changes(bound, pg_cursor, maria_conn, keys):
+    """Upsert the current source rows of `keys` and delete the keys gone from the source"""
+    key_column = bound.key_column
+    pg_cursor.execute(f"SELECT * FROM {bound.source} WHERE {key_column} IN %s", (tuple(keys),))
+    rows = pg_cursor.fetchall()
+    columns = [desc[0] for desc in pg_cursor.description]
+    key_index = columns.index(key_column)
+    gone = keys - {str(row[key_index]) for row in rows}
+
+    maria_cursor = maria_conn.cursor()
+    try:
+        if rows:
+            transform = bound.row_transformer(columns)
+            maria_cursor.executemany(bound.insert_sql(upsert=True), [transform(row) for row in rows])
+        if gone:
+            maria_cursor.execute(f"DELETE FROM {bound.target} WHERE {key_column} IN "
+                                 f"({', '.join(['%s'] * len(gone))})", tuple(gone))
+    finally:
+        maria_cursor.close()
+    return f"{bound.table}: {len(rows)} yazıldı, {len(gone)} silindi"
+
+
+def apply_users_changes(source_types, use_upsert, pg_cursor, maria_conn, keys):
+    """Reconcile the changed user ids with the `sync_users` rules.
+
+    Only the MariaDB rows sharing an id or position_code with the changed
+    users are loaded. Deleted users are not removed, as in the batch sync.
+    """
+    pg_cursor.execute(f"SELECT * FROM {USERS_MAPPING.source} WHERE id IN %s ORDER BY id, position_code",
+                      (tuple(keys),))
+    rows = pg_cursor.fetchall()
+    if not rows:
+        return f"{USERS_MAPPING.table}: değişiklik yok"
+    columns = [desc[0] for desc in pg_cursor.description]
+    to_user = USERS_MAPPING.compile(columns, columns, source_types)
+    users = [dict(zip(columns, to_user(row))) for row in rows]
+
+    ids = list({user['id'] for user in users})
+    positions = list({user['position_code'] for user in users if user['position_code'] is not None})
+    where = f"id IN ({', '.join(['%s'] * len(ids))})"
+    if positions:
+        where += f" OR position_code IN ({', '.join(['%s'] * len(positions))})"
+
+    maria_cursor = maria_conn.cursor(dictionary=True)
+    statements = PreparedStatements(maria_conn)
+    try:
+        maria_cursor.execute(f"SELECT * FROM {USERS_MAPPING.target} WHERE {where}", ids + positions)
+        index = UsersIndex(maria_cursor.fetchall())
+        operations, insert_count, update_count, _, error_messages = plan_users_sync(
+            columns, users, index, report_missing=False)
+        apply_users_plan(maria_cursor, operations, columns, use_upsert, statements)
+    finally:
+        statements.close()
+        maria_cursor.close()
+    return (f"{USERS_MAPPING.table}: {insert_count} eklendi, {update_count} güncellendi, "
+            f"{len(error_messages)} atlandı")
+
+
+def prepare_capture(pg_cursor, maria_conn):
+    """{source table name: apply function(pg_cursor, maria_conn, keys)} with the mappings bound once"""
+    maria_cursor = maria_conn.cursor()
+    users_cursor = maria_conn.cursor(dictionary=True)
+    try:
+        check_schema(pg_cursor, maria_cursor, list(capture_mappings().values()))
+        appliers = {}
+        for table, mapping in capture_mappings().items():
+            if mapping is USERS_MAPPING:
+                appliers[table] = partial(apply_users_changes, source_column_types(pg_cursor, mapping.source),
+                                          users_upsert_supported(users_cursor))
+            else:
+                appliers[table] = partial(apply_table_changes, mapping.bind(pg_cursor, maria_cursor))
+    finally:
+        maria_cursor.close()
+        users_cursor.close()
+    return appliers
+
+
+def apply_captured_changes(pg_cursor, maria_conn, appliers):
+    """Apply one micro-batch of the changelog to MariaDB; returns the number of changelog rows handled.
+
+    Keys are deduplicated per table, MariaDB is committed once and only then
+    are exactly the applied changelog rows deleted, so a crash in between
+    re-applies them (idempotently) instead of losing them.
+    """
+    pg_cursor.execute(f"SELECT change_id, table_name, row_key FROM {CDC_CHANGELOG_TABLE} "
+                      f"ORDER BY change_id LIMIT %s", (CDC_BATCH_SIZE,))
+    changes = pg_cursor.fetchall()
+    if not changes:
+        return 0
+
+    keys = defaultdict(set)
+    for _, table, row_key in changes:
+        if row_key is not None:
+            keys[table].add(row_key)
+
+    started = time.monotonic()
+    results = []
+    try:
+        for table, table_keys in keys.items():
+            if table not in appliers:
+                results.append(f"{table}: yakalanmıyor, atlandı")
+                continue
+            results.append(appliers[table](pg_cursor, maria_conn, table_keys))
+        maria_conn.commit()
+    except Exception:
+        maria_conn.rollback()
+        raise
+
+    pg_cursor.execute(f"DELETE FROM {CDC_CHANGELOG_TABLE} WHERE change_id IN %s",
+                      (tuple(change_id for change_id, _, _ in changes),))
+    log.info(f"Capture: {len(changes)} değişiklik ({sum(map(len, keys.values()))} kayıt) "
+             f"{time.monotonic() - started:.2f} sn'de uygulandı - {'; '.join(results)}")
+    return len(changes)
+
+
+def wait_for_changes(pg_conn, timeout):
+    """Block until a NOTIFY arrives on CDC_CHANNEL or `timeout` passes, then let changes accumulate briefly.
+
+    Notifications already queued on the connection count; they are cleared
+    only here, after the wait they end.
+    """
+    import select
+
+    # Uygulama sorguları sırasında gelen bildirimler psycopg2'de zaten sırada olabilir; atılırlarsa
+    # değişiklikler CDC_POLL_SECONDS boyunca changelog'da bekler
+    pg_conn.poll()
+    if not pg_conn.notifies:
+        if select.select([pg_conn], [], [], timeout) == ([], [], []):
+            return False
+        pg_conn.poll()
+    if CDC_COALESCE_SECONDS > 0:
+        time.sleep(CDC_COALESCE_SECONDS)
+    pg_conn.poll()
+    pg_conn.notifies.clear()
+    return True
+
+
+def run_capture():
+    """Apply captured changes continuously until interrupted.
+
+    Each micro-batch holds CDC_LOCK_FILE and starts only while no batch sync
+    holds SYNC_LOCK_FILE, so changes wait in the changelog while a batch sync
+    runs and the batch sync waits only for the current micro-batch. On errors the connections are reopened with
+    exponential backoff; the first error of a streak is sent to Teams.
+    """
+    LOGGING.start()
+    log.info(f"Değişiklik yakalama başlıyor: {', '.join(capture_mappings())} (kanal {CDC_CHANNEL})")
+    failures = 0
+    while True:
+        pg_conn = maria_conn = None
         try:
-            if pg_conn:
-                pg_cursor.close()
-                pg_conn.close()
-                print("PostgreSQL bağlantısı kapatıldı")
-        except:
-            pass
+            pg_conn = connect_source()
+            pg_conn.set_session(autocommit=True)
+            maria_conn = connect_target()
+            pg_cursor = pg_conn.cursor()
+            pg_cursor.execute(f"LISTEN {CDC_CHANNEL}")
+            appliers = prepare_capture(pg_cursor, maria_conn)
+
+            while True:
+                # Batch sync SYNC_LOCK_FILE'ı tutuyorsa (CDC_LOCK_FILE'ı bekliyor olabilir) sıra ona bırakılır
+                batch_lock, lock = SyncLock(SYNC_LOCK_FILE), SyncLock(CDC_LOCK_FILE)
+                if not batch_lock.acquire():
+                    log.info(f"Capture: batch sync çalışıyor ({batch_lock.holder()}), değişiklikler bekletiliyor")
+                    time.sleep(CDC_POLL_SECONDS)
+                    continue
+                batch_lock.release()
+                if not lock.acquire():
+                    log.info(f"Capture: kilit başkasında ({lock.holder()}), değişiklikler bekletiliyor")
+                    time.sleep(CDC_POLL_SECONDS)
+                    continue
+                try:
+                    with METRICS.scope('capture'):
+                        applied = apply_captured_changes(pg_cursor, maria_conn, appliers)
+                finally:
+                    lock.release()
+                failures = 0
+                if applied < CDC_BATCH_SIZE:
+                    wait_for_changes(pg_conn, CDC_POLL_SECONDS)
+
+        except Exception as e:
+            failures += 1
+            delay = min(CDC_RETRY_SECONDS * 2 ** (failures - 1), 300)
+            log.warning(f"Capture hatası: {e} - {delay:.0f} sn sonra yeniden bağlanılacak")
+            if failures == 1:
+                send_teams_message(f"""CAPTURE HATASI
+
+Zaman: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}
+Hata: {str(e)}
+Durum: Degisiklikler changelog'da bekliyor, yeniden baglaniliyor""", "CAPTURE HATASI", "ff0000", kind="error")
+            time.sleep(delay)
+        finally:
+            for conn in (pg_conn, maria_conn):
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+# endregion
 
+# region Verification
+
+def verify_column_exprs(pg_expr, column, column_type):
+    """(PostgreSQL, MariaDB) SQL rendering one target column as the same text on both servers.
+
+    `pg_expr` is the mapping's select expression, so the source side applies
+    the sync transforms. DATETIME compares to the second and DECIMAL without
+    trailing zeros, as MariaDB stores them. FLOAT / DOUBLE compare rounded to
+    VERIFY_FLOAT_DECIMALS decimals, since the servers print floats differently
+    (exponent form, digits); FLOAT is single precision on both sides.
+    """
+    column_type = column_type.lower()
+    if column_type.startswith(('datetime', 'timestamp')):
+        return f"to_char({pg_expr}, 'YYYY-MM-DD HH24:MI:SS')", f"LEFT(CAST({column} AS CHAR), 19)"
+    if column_type.startswith('decimal'):
+        pg_text, maria_text = f"({pg_expr})::numeric::text", f"CAST({column} AS CHAR)"
+        return (f"CASE WHEN strpos({pg_text}, '.') > 0 THEN rtrim(rtrim({pg_text}, '0'), '.') ELSE {pg_text} END",
+                f"CASE WHEN LOCATE('.', {maria_text}) > 0 "
+                f"THEN TRIM(TRAILING '.' FROM TRIM(TRAILING '0' FROM {maria_text})) ELSE {maria_text} END")
+    if column_type.startswith(('float', 'double', 'real')):
+        single = '::real' if column_type.startswith('float') else ''
+        decimals = VERIFY_FLOAT_DECIMALS
+        return (f"round(({pg_expr}){single}::float8::numeric, {decimals})::text",
+                f"CAST(CAST({column} AS DECIMAL(65, {decimals})) AS CHAR)")
+    return f"({pg_expr})::text", f"CAST({column} AS CHAR)"
+
+
+class TableVerifier:
+    """Find rows that differ between a source table and its target without copying them.
+
+    Every row is rendered as the same text on both servers. The hash of that
+    text is reduced to 60 bits and summed per key range. A mismatching range
+    is split into VERIFY_FANOUT sub-ranges, one GROUP BY query per server per
+    split, down to VERIFY_LEAF_ROWS rows, where (key, md5) pairs are compared.
+    Only these aggregates and hashes leave the servers. Needs an integer key,
+    like `diff` mode.
+    """
+
+    def __init__(self, bound, column_types, pg_cursor, maria_cursor):
+        self.key = bound.key_column
+        pg_columns, maria_columns = [], []
+        for column, pg_expr in zip(bound.target_columns, bound.select_exprs()):
+            pg_text, maria_text = verify_column_exprs(pg_expr, column, column_types.get(column, ''))
+            pg_columns.append(f"coalesce({pg_text}, chr(30))")
+            maria_columns.append(f"COALESCE({maria_text}, CHAR(30))")
+        pg_row = f"concat_ws(chr(31), {', '.join(pg_columns)})"
+        maria_row = f"CONCAT_WS(CHAR(31), {', '.join(maria_columns)})"
+        # (cursor, tablo, satır md5'i, 60 bitlik sayı)
+        self.sides = (
+            (pg_cursor, bound.source, f"md5({pg_row})", f"('x' || left(md5({pg_row}), 15))::bit(60)::bigint"),
+            (maria_cursor, bound.target, f"MD5({maria_row})", f"CAST(CONV(LEFT(MD5({maria_row}), 15), 16, 10) AS UNSIGNED)"),
+        )
+        self.range_queries = 0
+
+    def key_bounds(self):
+        """[lowest key, highest key + 1) over both tables, (None, None) if both are empty"""
+        keys = []
+        for cursor, table, _, _ in self.sides:
+            cursor.execute(f"SELECT min({self.key}), max({self.key}) FROM {table}")
+            keys += [key for key in cursor.fetchone() if key is not None]
+        if not keys:
+            return None, None
+        if not all(isinstance(key, int) for key in keys):
+            raise ValueError(f"verify tamsayı bir anahtar kolonu gerektirir ({self.key})")
+        return min(keys), max(keys) + 1
+
+    def bucket_sums(self, side, edges):
+        """{bucket: (row count, hash sum)} for the ranges between consecutive `edges`"""
+        cursor, table, _, number = side
+        inner = edges[1:-1]
+        bucket = (f"CASE {' '.join(f'WHEN {self.key} < %s THEN {i}' for i in range(len(inner)))} "
+                  f"ELSE {len(inner)} END") if inner else "0"
+        cursor.execute(
+            f"SELECT {bucket}, count(*), sum({number}) FROM {table} "
+            f"WHERE {self.key} >= %s AND {self.key} < %s GROUP BY 1",
+            tuple(inner) + (edges[0], edges[-1]))
+        return {int(b): (int(count), int(total or 0)) for b, count, total in cursor.fetchall()}
+
+    def row_hashes(self, side, lower, upper):
+        cursor, table, digest, _ = side
+        cursor.execute(f"SELECT {self.key}, {digest} FROM {table} WHERE {self.key} >= %s AND {self.key} < %s",
+                       (lower, upper))
+        return {key: _text(value) for key, value in cursor.fetchall()}
+
+    def differences(self, max_diffs=None):
+        """Row counts and the keys missing from, extra in or changed in the target (VERIFY_MAX_DIFFS by default)"""
+        if max_diffs is None:
+            max_diffs = VERIFY_MAX_DIFFS
+        result = {'source_count': 0, 'target_count': 0, 'missing': [], 'extra': [], 'changed': [],
+                  'truncated': False}
+        lower, upper = self.key_bounds()
+        if lower is None:
+            return result
+
+        ranges = [(lower, upper)]
+        top = True
+        while ranges:
+            if len(result['missing']) + len(result['extra']) + len(result['changed']) >= max_diffs:
+                result['truncated'] = True
+                break
+            lower, upper = ranges.pop()
+            parts = min(VERIFY_FANOUT, upper - lower)
+            edges = [lower + (upper - lower) * i // parts for i in range(parts + 1)]
+            source, target = (self.bucket_sums(side, edges) for side in self.sides)
+            self.range_queries += 1
+            if top:
+                result['source_count'] = sum(count for count, _ in source.values())
+                result['target_count'] = sum(count for count, _ in target.values())
+                top = False
+
+            for i in reversed(range(parts)):
+                source_sum, target_sum = source.get(i, (0, 0)), target.get(i, (0, 0))
+                if source_sum == target_sum:
+                    continue
+                if max(source_sum[0], target_sum[0]) > VERIFY_LEAF_ROWS and edges[i + 1] - edges[i] > 1:
+                    ranges.append((edges[i], edges[i + 1]))
+                    continue
+                source_rows, target_rows = (self.row_hashes(side, edges[i], edges[i + 1]) for side in self.sides)
+                result['missing'] += sorted(source_rows.keys() - target_rows.keys())
+                result['extra'] += sorted(target_rows.keys() - source_rows.keys())
+                result['changed'] += sorted(key for key in source_rows.keys() & target_rows.keys()
+                                            if source_rows[key] != target_rows[key])
+
+        for kind in ('missing', 'extra', 'changed'):
+            result[kind] = sorted(result[kind])[:max_diffs]
+        return result
+
+
+def verify_tables(names=None):
+    """Compare copied tables with their targets by checksums and report the differing keys.
+
+    Holds `batch_sync_lock` so no sync or capture writes to the targets
+    meanwhile; the source is read in one REPEATABLE READ snapshot. Returns
+    {mapping name: differences}.
+    """
+    LOGGING.start()
+    mappings = [mapping for mapping in COPIED_TABLE_MAPPINGS if names is None or mapping.name in names]
+    pg_conn = maria_conn = None
+    results = {}
+    with batch_sync_lock():
         try:
-            if maria_conn:
-                maria_cursor.close()
-                maria_conn.close()
-                print("MariaDB bağlantısı kapatıldı")
-        except:
-            pass
+            pg_conn = connect_source()
+            pg_conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            maria_conn = connect_target()
+            pg_cursor, maria_cursor = pg_conn.cursor(), maria_conn.cursor()
+            SCHEMA.refresh(pg_cursor, maria_cursor, mappings)
+
+            for mapping in mappings:
+                start = time.perf_counter()
+                bound = mapping.bind(pg_cursor, maria_cursor)
+                verifier = TableVerifier(bound, dict(SCHEMA.target.get(mapping.target, [])), pg_cursor, maria_cursor)
+                diff = results[mapping.name] = verifier.differences()
+                found = len(diff['missing']) + len(diff['extra']) + len(diff['changed'])
+                log.info(f"{mapping.title}: kaynak {diff['source_count']}, hedef {diff['target_count']} satır, "
+                         f"{found}{'+' if diff['truncated'] else ''} farklı anahtar "
+                         f"({verifier.range_queries} aralık sorgusu, {time.perf_counter() - start:.1f} sn)")
+                for kind, label in (('missing', 'hedefte yok'), ('extra', 'kaynakta yok'), ('changed', 'değişmiş')):
+                    if diff[kind]:
+                        more = ' ...' if len(diff[kind]) > 20 else ''
+                        log.info(f"  {label}: {', '.join(map(str, diff[kind][:20]))}{more}")
+            pg_conn.rollback()
+        finally:
+            for conn in (pg_conn, maria_conn):
+                if conn is not None:
+                    conn.close()
+
+    lines = []
+    for mapping in mappings:
+        diff = results[mapping.name]
+        limit = f" (ilk {VERIFY_MAX_DIFFS} fark)" if diff['truncated'] else ""
+        lines.append(f"- {mapping.title}: {diff['source_count']} kaynak / {diff['target_count']} hedef satir, "
+                     f"{len(diff['missing'])} eksik, {len(diff['extra'])} fazla, {len(diff['changed'])} farkli{limit}")
+    clean = all(not (d['missing'] or d['extra'] or d['changed']) for d in results.values())
+    send_teams_message("Dogrulama Sonucu:\n\n" + "\n".join(lines), "SYNC DOGRULAMA",
+                       "00ff00" if clean else "ff9900", kind="summary")
+    return results
 
 
 # endregion
 
+# region Scheduler and CLI
 
-# Example of scheduler setup
-if __name__ == "__main__":
-    schedule.every().day.at("23:00").do(run_sync)
+def parse_schedule(spec):
+    """`schedule` job for a spec: "HH:MM" runs daily, "<n>s" / "<n>m" / "<n>h" every n seconds/minutes/hours"""
+    import schedule
+
+    spec = spec.strip().lower()
+    if ':' in spec:
+        return schedule.every().day.at(spec)
+    units = {'s': 'seconds', 'm': 'minutes', 'h': 'hours'}
+    if spec[-1:] in units and spec[:-1].isdigit() and int(spec[:-1]) > 0:
+        return getattr(schedule.every(int(spec[:-1])), units[spec[-1]])
+    raise ValueError(f"Geçersiz zamanlama '{spec}': HH:MM, <n>s, <n>m veya <n>h olmalı")
+
+
+def table_schedules():
+    """Job keys grouped by schedule: SYNC_SCHEDULE_<KEY> if set, else SYNC_SCHEDULE; "off" skips the table"""
+    groups = {}
+    for key, _, _ in TABLE_JOBS:
+        spec = os.getenv(f"SYNC_SCHEDULE_{key.upper()}", SYNC_SCHEDULE).strip()
+        if spec.lower() != 'off':
+            groups.setdefault(spec, []).append(key)
+    return groups
+
+
+def run_scheduled(tables, notify):
+    """Scheduler job: a failed or skipped run must not stop the daemon"""
+    try:
+        run_sync(tables=tables, notify=notify)
+    except SyncAlreadyRunning as e:
+        log.warning(f"{', '.join(tables)}: {e}, bu çalıştırma atlandı")
+    except Exception as e:
+        log.error(f"{', '.join(tables)} sync başarısız: {e}")
+
+
+def run_daemon():
+    """Run every table on its schedule until interrupted.
 
-    print("Zamanlayıcı aktif - Her gece 23:00'da sync çalışacak")
-    print("Eğer hemen test etmek istiyorsanız run_sync() fonksiyonunu çağırabilirsiniz")
-    print("Durdurmak için Ctrl+C")
+    Tables sharing a schedule run together as one sync. Jobs run one at a
+    time; a job that becomes due while another runs starts after it. Interval
+    schedules only send error notifications to Teams.
+    """
+    import schedule
 
+    LOGGING.start()
+    groups = table_schedules()
+    if not groups:
+        raise ValueError("Zamanlanmış tablo yok (tüm tablolar 'off')")
+    for spec, tables in groups.items():
+        daily = ':' in spec
+        parse_schedule(spec).do(run_scheduled, tables, notify=daily)
+        log.info(f"Zamanlayıcı: {', '.join(tables)} -> {'her gün ' + spec if daily else 'her ' + spec}")
+
+    log.info("Zamanlayıcı aktif - Durdurmak için Ctrl+C")
     while True:
         schedule.run_pending()
-        time.sleep(60)
\ No newline at end of file
+        idle = schedule.idle_seconds()
+        time.sleep(60 if idle is None else min(max(idle, 1), 60))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PostgreSQL -> MariaDB sync")
+    commands = parser.add_subparsers(dest="command", metavar="{run-now,table,daemon,capture,verify}")
+    run_now = commands.add_parser("run-now", help="tüm tabloları hemen senkronize et")
+    run_now.add_argument("--resume", action="store_true", help="yarıda kalan sync'e checkpoint'ten devam et")
+    table = commands.add_parser("table", help="yalnızca verilen tabloları hemen senkronize et")
+    table.add_argument("names", nargs="+", choices=[key for key, _, _ in TABLE_JOBS], metavar="TABLO",
+                       help=", ".join(key for key, _, _ in TABLE_JOBS))
+    table.add_argument("--resume", action="store_true", help="yarıda kalan sync'e checkpoint'ten devam et")
+    table.add_argument("--profile", action="store_true",
+                       help=f"her tabloyu ayrı profille: rapor, collapsed-stack ve cProfile dosyası ({PROFILE_DIR}/)")
+    commands.add_parser("daemon", help="tabloları zamanlamalarına göre çalıştır (varsayılan)")
+    capture = commands.add_parser("capture", help="trigger + LISTEN/NOTIFY ile değişiklikleri sürekli aktar")
+    capture.add_argument("action", choices=["install", "remove", "run"],
+                         help="install: changelog ve trigger'ları kur, remove: kaldır, run: değişiklikleri uygula")
+    verify = commands.add_parser("verify", help="kopyalanan tabloları satır taşımadan checksum ile karşılaştır")
+    verify.add_argument("names", nargs="*", metavar="TABLO",
+                        help="varsayılan tümü: " + ", ".join(mapping.name for mapping in COPIED_TABLE_MAPPINGS))
+    args = parser.parse_args(argv)
+    if args.command == "verify":
+        unknown = set(args.names) - {mapping.name for mapping in COPIED_TABLE_MAPPINGS}
+        if unknown:
+            parser.error(f"verify: bilinmeyen tablo: {', '.join(sorted(unknown))}")
+
+    LOGGING.start()
+    try:
+        if args.command == "run-now":
+            run_sync(resume=args.resume)
+        elif args.command == "table":
+            if args.profile:
+                PROFILER.tables = set(args.names)
+            run_sync(resume=args.resume, tables=args.names)
+        elif args.command == "verify":
+            results = verify_tables(args.names or None)
+            if any(diff['missing'] or diff['extra'] or diff['changed'] for diff in results.values()):
+                return 1
+        elif args.command == "capture" and args.action == "run":
+            run_capture()
+        elif args.command == "capture":
+            pg_conn = connect_source()
+            try:
+                (install_capture if args.action == "install" else remove_capture)(pg_conn)
+            finally:
+                pg_conn.close()
+        else:
+            run_daemon()
+    except SyncAlreadyRunning as e:
+        log.error(f"HATA: {e}")
+        return 1
+    except KeyboardInterrupt:
+        log.info("Durduruldu")
+    return 0
+
+
+# endregion
+
+
+if __name__ == "__main__":
+    sys.exit(main())
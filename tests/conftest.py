@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import sync  # noqa: E402
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    """Sync state and run checkpoint in a temporary file"""
+    path = tmp_path / "sync_state.json"
+    monkeypatch.setattr(sync, 'SYNC_STATE_FILE', str(path))
+    monkeypatch.setattr(sync.RUN_CHECKPOINT, 'data', None)
+    monkeypatch.setattr(sync, 'send_teams_message', lambda *args, **kwargs: True)
+    return path
+
+
+@pytest.fixture
+def lock_files(tmp_path, monkeypatch):
+    """SYNC_LOCK_FILE and CDC_LOCK_FILE in a temporary directory"""
+    monkeypatch.setattr(sync, 'SYNC_LOCK_FILE', str(tmp_path / "sync.lock"))
+    monkeypatch.setattr(sync, 'CDC_LOCK_FILE', str(tmp_path / "sync.lock.capture"))
+    return sync.SYNC_LOCK_FILE, sync.CDC_LOCK_FILE
+
+
+@pytest.fixture
+def fake_dbs(monkeypatch, state_file):
+    """The benchmark's in-memory PostgreSQL and MariaDB, used by every connection the sync opens"""
+    source = benchmark.FakeSource(0)
+    target = benchmark.FakeTarget(0)
+    monkeypatch.setattr(sync, 'connect_source', source.connect)
+    monkeypatch.setattr(sync, 'connect_target', lambda *args: target.connect())
+    return source, target
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import sync
+
+QUERY = "INSERT INTO db.t (id,ad) VALUES (%s,%s)"
+
+
+class Deadlock(Exception):
+    """PyMySQL / aiomysql style error: (errno, message)"""
+
+
+class FlakyConnection:
+    """aiomysql-like connection whose INSERTs fail once at the given positions"""
+
+    def __init__(self, fail_at=(), error=Deadlock(1213, "Deadlock found when trying to get lock")):
+        self.fail_at = set(fail_at)
+        self.error = error
+        self.log = []
+
+    def cursor(self):
+        return FlakyCursor(self)
+
+    async def commit(self):
+        self.log.append('commit')
+
+    async def rollback(self):
+        self.log.append('rollback')
+
+
+class FlakyCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        sent = sum(1 for entry in self.connection.log if isinstance(entry, tuple))
+        self.connection.log.append(('insert', params[0]))
+        if sent in self.connection.fail_at:
+            self.connection.fail_at.discard(sent)
+            raise self.connection.error
+
+
+@pytest.fixture(autouse=True)
+def batching(monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 2)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_MIN_ROWS', 1)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_TARGET_SECONDS', 0)
+    monkeypatch.setattr(sync, 'MARIA_COMMIT_ROWS', 1000)
+    monkeypatch.setattr(sync, 'DB_RETRY_BACKOFF_SECONDS', 0)
+
+
+def write(conn, rows):
+    async def run():
+        writer = sync.AsyncBatchWriter(conn, QUERY, 1 << 20)
+        await writer.extend(rows)
+        return await writer.close()
+    return asyncio.run(run())
+
+
+def test_transient_error_replays_uncommitted_statements():
+    conn = FlakyConnection(fail_at={1})
+    assert write(conn, [(i, f"ad{i}") for i in range(6)]) == 6
+    # İkinci ifade düştü: geri alınır, ilk ifade de yeniden gönderilir
+    assert conn.log == [('insert', 0), ('insert', 2), 'rollback', ('insert', 0), ('insert', 2), ('insert', 4),
+                        'commit']
+
+
+def test_permanent_error_is_not_retried():
+    conn = FlakyConnection(fail_at={0}, error=ValueError("syntax"))
+    with pytest.raises(ValueError):
+        write(conn, [(1, 'a')])
+    assert conn.log == [('insert', 1)]
+
+
+@pytest.mark.parametrize('setting, reason', [
+    ({'strategy': 'diff'}, "'diff' modu"),
+    ({'partitions': 4}, "4 bölümlü yükleme"),
+    ({'shadow_load': True}, "shadow load"),
+])
+def test_fallback_reason(monkeypatch, setting, reason):
+    mapping = sync.COPIED_TABLE_MAPPINGS[0]
+    for name, value in setting.items():
+        monkeypatch.setattr(mapping, name, value)
+    monkeypatch.setattr(sync, 'TARGET_DBS', {})
+    assert sync.async_unsupported(mapping.name) == reason
+    assert sync.async_table_job(mapping.name, None, None) is None
@@ -0,0 +1,95 @@
+import pytest
+
+import sync
+
+QUERY = "INSERT INTO db.t (id,ad) VALUES (%s,%s)"
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, list(params or ())))
+
+
+class RecordingConnection:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.commits = []
+
+    def commit(self):
+        self.commits.append(len(self.cursor.statements))
+
+
+@pytest.fixture
+def writer_factory(monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_TARGET_SECONDS', 0)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_MIN_ROWS', 1)
+
+    def make(max_packet=1 << 20, on_commit=None):
+        cursor = RecordingCursor()
+        conn = RecordingConnection(cursor)
+        return sync.BatchWriter(cursor, conn, QUERY, on_commit=on_commit, max_packet=max_packet), cursor, conn
+
+    return make
+
+
+def test_statement_is_one_multi_row_insert(writer_factory, monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 3)
+    writer, cursor, _ = writer_factory()
+    writer.extend([(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')])
+    assert writer.close() == 4
+    assert cursor.statements == [
+        ("INSERT INTO db.t (id,ad) VALUES (%s,%s),(%s,%s),(%s,%s)", [1, 'a', 2, 'b', 3, 'c']),
+        ("INSERT INTO db.t (id,ad) VALUES (%s,%s)", [4, 'd']),
+    ]
+
+
+def test_batches_stay_below_packet_limit(writer_factory, monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 10_000)
+    max_packet = 4096
+    writer, cursor, _ = writer_factory(max_packet=max_packet)
+    rows = [(i, 'x' * 100) for i in range(200)]
+    writer.extend(rows)
+    writer.close()
+
+    assert len(cursor.statements) > 1
+    assert [value for _, params in cursor.statements for value in params] == [v for row in rows for v in row]
+    limit = max_packet * sync.MARIA_PACKET_FRACTION
+    for sql, params in cursor.statements:
+        # Sürücü her %s yerine değeri yazar: sayılar olduğu gibi, metinler tırnak içinde
+        rendered = len(sql) - 2 * len(params) + sum(
+            len(f"'{value}'" if isinstance(value, str) else str(value)) for value in params)
+        assert rendered <= limit
+
+
+def test_row_larger_than_the_limit_is_sent_alone(writer_factory, monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 10_000)
+    writer, cursor, _ = writer_factory(max_packet=1024)
+    writer.extend([(1, 'a'), (2, 'x' * 2000), (3, 'b')])
+    writer.close()
+    assert [params[::2] for _, params in cursor.statements] == [[1], [2], [3]]
+
+
+def test_on_commit_reports_committed_watermark_and_rows(writer_factory, monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 10)
+    monkeypatch.setattr(sync, 'MARIA_COMMIT_ROWS', 25)
+    commits = []
+    writer, cursor, conn = writer_factory(on_commit=lambda watermark, rows: commits.append((watermark, rows)))
+    for chunk in range(1, 6):
+        writer.extend([(chunk * 100 + i, 'a') for i in range(10)], watermark=chunk)
+    assert writer.close() == 50
+
+    # Commit 30 satırdan sonra: 3. parça o an henüz kaydedilmemişti, ilk iki parçanın watermark'ı bildirilir
+    assert conn.commits == [3, 5]
+    assert commits == [(2, 20), (5, 50)]
+
+
+def test_close_without_rows_commits_pending_watermark(writer_factory):
+    commits = []
+    writer, cursor, conn = writer_factory(on_commit=lambda watermark, rows: commits.append((watermark, rows)))
+    writer.extend([], watermark='w')
+    assert writer.close() == 0
+    assert cursor.statements == []
+    assert commits == [('w', 0)]
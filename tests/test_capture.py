@@ -0,0 +1,170 @@
+import threading
+
+import pytest
+
+import sync
+
+
+class ChangelogCursor:
+    """PostgreSQL cursor over an in-memory changelog and source table"""
+
+    def __init__(self, changes, rows=(), columns=('id', 'ad')):
+        self.changes = list(changes)
+        self.rows = list(rows)
+        self.description = [(column,) for column in columns]
+        self.deleted = []
+        self.result = []
+
+    def execute(self, query, params=None):
+        if query.startswith("SELECT change_id"):
+            self.result = self.changes[:params[0]]
+        elif query.startswith("DELETE FROM"):
+            self.deleted += params[0]
+        else:
+            keys = params[0]
+            self.result = [row for row in self.rows if str(row[0]) in keys]
+
+    def fetchall(self):
+        return self.result
+
+
+class RecordingTarget:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self, **kwargs):
+        return self
+
+    def execute(self, query, params=None):
+        self.log.append((query, params))
+
+    def executemany(self, query, seq):
+        self.log.append((query, list(seq)))
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.log.append('commit')
+
+    def rollback(self):
+        self.log.append('rollback')
+
+
+def recording_applier(applied):
+    def apply(pg_cursor, maria_conn, keys):
+        applied.append(set(keys))
+        return "ok"
+    return apply
+
+
+def test_changes_collapse_to_one_write_per_key():
+    changes = [(1, 'routes', '7'), (2, 'routes', '7'), (3, 'routes', '8'), (4, 'routes', None), (5, 'routes', '7')]
+    pg_cursor, target, applied = ChangelogCursor(changes), RecordingTarget(), []
+    assert sync.apply_captured_changes(pg_cursor, target, {'routes': recording_applier(applied)}) == 5
+    assert applied == [{'7', '8'}]
+    assert target.log == ['commit']
+    assert pg_cursor.deleted == [1, 2, 3, 4, 5]
+
+
+def test_batch_size_limits_a_micro_batch(monkeypatch):
+    monkeypatch.setattr(sync, 'CDC_BATCH_SIZE', 2)
+    pg_cursor, applied = ChangelogCursor([(1, 'routes', '1'), (2, 'routes', '2'), (3, 'routes', '3')]), []
+    assert sync.apply_captured_changes(pg_cursor, RecordingTarget(), {'routes': recording_applier(applied)}) == 2
+    assert applied == [{'1', '2'}] and pg_cursor.deleted == [1, 2]
+
+
+def test_uncaptured_tables_are_skipped_and_cleared():
+    pg_cursor, applied = ChangelogCursor([(1, 'depots', '1'), (2, 'routes', '2')]), []
+    sync.apply_captured_changes(pg_cursor, RecordingTarget(), {'routes': recording_applier(applied)})
+    assert applied == [{'2'}] and pg_cursor.deleted == [1, 2]
+
+
+def test_failed_apply_keeps_the_changelog():
+    def failing(pg_cursor, maria_conn, keys):
+        raise RuntimeError("MariaDB gitti")
+
+    pg_cursor, target = ChangelogCursor([(1, 'routes', '1')]), RecordingTarget()
+    with pytest.raises(RuntimeError):
+        sync.apply_captured_changes(pg_cursor, target, {'routes': failing})
+    assert target.log == ['rollback']
+    assert pg_cursor.deleted == []
+
+
+def test_empty_changelog():
+    target = RecordingTarget()
+    assert sync.apply_captured_changes(ChangelogCursor([]), target, {}) == 0
+    assert target.log == []
+
+
+def test_table_changes_upsert_present_rows_and_delete_gone_keys():
+    mapping = sync.TableMapping('t', 'public.t', 'db.t')
+    bound = sync.BoundTableMapping(mapping, {'id': 'integer', 'ad': 'text'}, ['id', 'ad'])
+    pg_cursor, target = ChangelogCursor([], rows=[(1, 'a'), (2, 'b')]), RecordingTarget()
+    assert sync.apply_table_changes(bound, pg_cursor, target, {'1', '2', '3'}) == "t: 2 yazıldı, 1 silindi"
+    (upsert, rows), (delete, keys) = target.log
+    assert upsert.startswith("INSERT INTO db.t (id,ad) VALUES") and "ON DUPLICATE KEY UPDATE" in upsert
+    assert sorted(rows) == [(1, 'a'), (2, 'b')]
+    assert delete == "DELETE FROM db.t WHERE id IN (%s)" and keys == ('3',)
+
+
+class NotifyConnection:
+    def __init__(self, queued=(), arriving=()):
+        self.notifies = list(queued)
+        self.arriving = list(arriving)
+
+    def poll(self):
+        self.notifies += self.arriving
+        self.arriving = []
+
+    def fileno(self):
+        raise AssertionError("select() çağrılmamalıydı")
+
+
+def test_queued_notification_ends_the_wait_without_select(monkeypatch):
+    monkeypatch.setattr(sync, 'CDC_COALESCE_SECONDS', 0)
+    conn = NotifyConnection(queued=['routes'])
+    assert sync.wait_for_changes(conn, 30) is True
+    assert conn.notifies == []
+
+
+def test_notification_received_during_apply_is_not_lost(monkeypatch):
+    monkeypatch.setattr(sync, 'CDC_COALESCE_SECONDS', 0)
+    # psycopg2 bildirimi sokette bekletiyor; ilk poll onu sıraya alır
+    assert sync.wait_for_changes(NotifyConnection(arriving=['routes']), 30) is True
+
+
+def test_wait_times_out_without_notifications(monkeypatch):
+    import select
+    monkeypatch.setattr(select, 'select', lambda r, w, x, timeout: ([], [], []))
+    assert sync.wait_for_changes(NotifyConnection(), 0.01) is False
+
+
+def test_batch_sync_waits_for_a_running_micro_batch(lock_files, monkeypatch):
+    monkeypatch.setattr(sync, 'CDC_LOCK_WAIT_SECONDS', 5)
+    capture = sync.SyncLock(sync.CDC_LOCK_FILE)
+    assert capture.acquire()
+    threading.Timer(0.3, capture.release).start()
+    with sync.batch_sync_lock():
+        # Batch sync sürerken capture yeni mikro-batch başlatamaz
+        assert not sync.SyncLock(sync.SYNC_LOCK_FILE).acquire()
+        assert not sync.SyncLock(sync.CDC_LOCK_FILE).acquire()
+    after = sync.SyncLock(sync.CDC_LOCK_FILE)
+    assert after.acquire()
+    after.release()
+
+
+def test_batch_sync_gives_up_on_a_stuck_micro_batch(lock_files, monkeypatch):
+    monkeypatch.setattr(sync, 'CDC_LOCK_WAIT_SECONDS', 0.2)
+    capture = sync.SyncLock(sync.CDC_LOCK_FILE)
+    assert capture.acquire()
+    try:
+        with pytest.raises(sync.SyncAlreadyRunning):
+            with sync.batch_sync_lock():
+                pass
+        # Vazgeçen batch sync SYNC_LOCK_FILE'ı bırakır
+        batch = sync.SyncLock(sync.SYNC_LOCK_FILE)
+        assert batch.acquire()
+        batch.release()
+    finally:
+        capture.release()
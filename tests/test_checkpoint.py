@@ -0,0 +1,100 @@
+import json
+import random
+
+import pytest
+
+import benchmark
+import sync
+
+
+class InsertFailure(RuntimeError):
+    pass
+
+
+@pytest.fixture
+def routes(fake_dbs, monkeypatch):
+    source, target = fake_dbs
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 50)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_MIN_ROWS', 1)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_TARGET_SECONDS', 0)
+    monkeypatch.setattr(sync, 'MARIA_COMMIT_ROWS', 100)
+    columns, types, rows, target_columns = benchmark.generate_routes(1000, random.Random(2))
+    source.tables['routes'] = {'columns': columns, 'types': types, 'rows': rows}
+    target.tables['routes'] = benchmark.FakeTargetTable(target_columns)
+    return source, target, rows
+
+
+def fail_inserts_after(monkeypatch, count):
+    """Make the target raise on the INSERT statement after the first `count`"""
+    execute = benchmark.FakeTargetCursor._execute
+    inserts = [0]
+
+    def failing(self, query, params):
+        if query.startswith("INSERT INTO"):
+            inserts[0] += 1
+            if inserts[0] > count:
+                raise InsertFailure("bağlantı koptu")
+        return execute(self, query, params)
+
+    monkeypatch.setattr(benchmark.FakeTargetCursor, '_execute', failing)
+
+
+def reload(source, target):
+    pg_conn, maria_conn = source.connect(), target.connect()
+    bound = sync.ROUTES_MAPPING.bind(pg_conn.cursor(), maria_conn.cursor())
+    return sync.full_reload(pg_conn.cursor(), maria_conn.cursor(), maria_conn, bound)
+
+
+def test_resume_continues_after_last_committed_key(routes, state_file, monkeypatch):
+    source, target, rows = routes
+    sync.RUN_CHECKPOINT.start(['routes'], ['routes'])
+    with monkeypatch.context() as patch:
+        fail_inserts_after(patch, 7)  # 350 satır yazıldı, 300'ü commit edildi
+        with pytest.raises(InsertFailure):
+            reload(source, target)
+    assert len(target.tables['routes'].rows) == 350
+
+    # 300. satırdaki commit o parçanın watermark'ından önce geldi; checkpoint 250. satırda
+    progress = json.loads(state_file.read_text())['_checkpoint']['tables']['routes']
+    assert progress['rows'] == 250
+    assert progress['last_key'] == sorted(row[0] for row in rows)[249]
+
+    assert sync.RUN_CHECKPOINT.start(['routes'], ['routes'], resume=True)
+    queries = []
+    execute = benchmark.FakeSourceCursor.execute
+    monkeypatch.setattr(benchmark.FakeSourceCursor, 'execute',
+                        lambda self, query, params=None: queries.append((query, params)) or execute(self, query, params))
+    read_count, insert_count, _ = reload(source, target)
+
+    assert read_count == insert_count == len(rows)
+    assert sorted(target.tables['routes'].rows) == sorted(row[0] for row in rows)
+    # Kaynak sadece checkpoint'ten sonrasını okudu
+    reads = [(query, params) for query, params in queries if query.startswith("SELECT * FROM")]
+    assert reads == [("SELECT * FROM neocortex_schema_v1.routes WHERE id > %s ORDER BY id", (progress['last_key'],))]
+
+
+def test_fresh_run_discards_old_progress(routes, state_file, monkeypatch):
+    source, target, rows = routes
+    sync.RUN_CHECKPOINT.start(['routes'], ['routes'])
+    with monkeypatch.context() as patch:
+        fail_inserts_after(patch, 3)
+        with pytest.raises(InsertFailure):
+            reload(source, target)
+
+    assert not sync.RUN_CHECKPOINT.start(['routes'], ['routes'], resume=False)
+    assert sync.resumable_progress(sync.ROUTES_MAPPING.bind(source.connect().cursor(),
+                                                            target.connect().cursor())) is None
+    read_count, _, _ = reload(source, target)
+    assert read_count == len(rows)
+    assert len(target.tables['routes'].rows) == len(rows)
+
+
+def test_finished_jobs_are_skipped_on_resume(state_file):
+    sync.RUN_CHECKPOINT.start(['customers', 'routes'], ['customers_master', 'routes'])
+    sync.RUN_CHECKPOINT.finish_job('customers', {'insert_count': 5})
+    assert sync.RUN_CHECKPOINT.start(['customers', 'routes'], ['customers_master', 'routes'], resume=True)
+    assert sync.RUN_CHECKPOINT.finished_job('customers') == {'insert_count': 5}
+    assert sync.RUN_CHECKPOINT.finished_job('routes') is None
+
+    sync.RUN_CHECKPOINT.clear(['customers', 'routes'], ['customers_master', 'routes'])
+    assert '_checkpoint' not in json.loads(state_file.read_text())
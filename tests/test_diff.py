@@ -0,0 +1,87 @@
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import benchmark
+import sync
+
+MAPPING = sync.TableMapping('routes', 'neocortex_schema_v1.routes', 'admin_efes1.routes', array_converter=None,
+                            strategy='diff')
+
+
+@pytest.fixture
+def routes(fake_dbs, monkeypatch):
+    source, target = fake_dbs
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 50)
+    monkeypatch.setattr(sync, 'PG_ITERSIZE', 64)
+    monkeypatch.setattr(sync, 'TARGET_DBS', {})
+    columns, types, rows, target_columns = benchmark.generate_routes(500, random.Random(4))
+    source.tables['routes'] = {'columns': columns, 'types': types, 'rows': rows}
+    target.tables['routes'] = benchmark.FakeTargetTable(target_columns)
+    target.tables['routes'].insert(rows)
+    return source, target, rows
+
+
+def diff(source, target, monkeypatch):
+    """copy_table in diff mode; returns its stats and the (statement, key) pairs it wrote"""
+    writes = []
+    execute = benchmark.FakeTargetCursor._execute
+
+    def recording(self, query, params):
+        if query.startswith("INSERT INTO"):
+            writes.append(('upsert' if "ON DUPLICATE KEY UPDATE" in query else 'insert', params[0]))
+        elif query.startswith("DELETE FROM"):
+            writes.extend(('delete', key) for key in params)
+        return execute(self, query, params)
+
+    monkeypatch.setattr(benchmark.FakeTargetCursor, '_execute', recording)
+    pg_conn, maria_conn = source.connect(), target.connect()
+    return sync.copy_table(pg_conn.cursor(), maria_conn.cursor(), maria_conn, MAPPING), writes
+
+
+def test_only_changed_rows_are_written(routes, monkeypatch):
+    source, target, rows = routes
+    rows[4] = rows[4][:2] + ("Yeni rota",) + rows[4][3:]
+    del rows[6]
+    rows.append((501, "R000501", "Rota 501", "Cum", True, datetime(2024, 2, 1)))
+
+    stats, writes = diff(source, target, monkeypatch)
+
+    assert stats == {'read_count': 500, 'insert_count': 1, 'update_count': 1, 'delete_count': 1,
+                     'no_change_count': 498, 'mode': 'diff'}
+    assert sorted(writes) == [('delete', 7), ('insert', 501), ('upsert', 5)]
+    assert target.tables['routes'].rows == {row[0]: row for row in rows}
+
+
+def test_unchanged_table_writes_nothing(routes, monkeypatch):
+    source, target, rows = routes
+    stats, writes = diff(source, target, monkeypatch)
+    assert stats['no_change_count'] == len(rows)
+    assert writes == []
+
+
+def test_empty_source_deletes_every_target_row(routes, monkeypatch):
+    source, target, rows = routes
+    rows.clear()
+    stats, _ = diff(source, target, monkeypatch)
+    assert stats['delete_count'] == 500
+    assert target.tables['routes'].rows == {}
+
+
+def test_digest_ignores_representation_differences():
+    # PostgreSQL boolean / numeric / timestamptz, MariaDB tinyint / decimal / datetime
+    pg_row = (1, True, Decimal('12.50'), datetime(2024, 1, 1, 9, 30, tzinfo=timezone(timedelta(hours=3))), None)
+    maria_row = (1, 1, Decimal('12.5'), datetime(2024, 1, 1, 9, 30), None)
+    assert sync.row_digest(pg_row) == sync.row_digest(maria_row)
+
+
+@pytest.mark.parametrize('changed', [
+    (1, False, Decimal('12.5'), datetime(2024, 1, 1, 9, 30), None),
+    (1, True, Decimal('12.51'), datetime(2024, 1, 1, 9, 30), None),
+    (1, True, Decimal('12.5'), datetime(2024, 1, 1, 9, 31), None),
+    (1, True, Decimal('12.5'), datetime(2024, 1, 1, 9, 30), 'None'),
+])
+def test_digest_detects_value_changes(changed):
+    assert sync.row_digest((1, True, Decimal('12.5'), datetime(2024, 1, 1, 9, 30), None)) != sync.row_digest(changed)
@@ -0,0 +1,85 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import benchmark
+import sync
+
+MAPPING = sync.TableMapping('routes', 'neocortex_schema_v1.routes', 'admin_efes1.routes', array_converter=None,
+                            strategy='incremental', watermark_column='updated_at')
+
+
+@pytest.fixture
+def routes(fake_dbs, monkeypatch):
+    source, target = fake_dbs
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 50)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_MIN_ROWS', 1)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_TARGET_SECONDS', 0)
+    monkeypatch.setattr(sync, 'MARIA_COMMIT_ROWS', 100)
+    monkeypatch.setattr(sync, 'TARGET_DBS', {})
+    columns, types, rows, target_columns = benchmark.generate_routes(500, random.Random(3))
+    source.tables['routes'] = {'columns': columns, 'types': types, 'rows': rows}
+    target.tables['routes'] = benchmark.FakeTargetTable(target_columns)
+    return source, target, rows
+
+
+def copy(source, target):
+    pg_conn, maria_conn = source.connect(), target.connect()
+    return sync.copy_table(pg_conn.cursor(), maria_conn.cursor(), maria_conn, MAPPING)
+
+
+def routes_state(state_file):
+    return json.loads(state_file.read_text())['routes']
+
+
+def test_first_run_is_a_full_reload_that_stores_the_watermark(routes, state_file):
+    source, target, rows = routes
+    stats = copy(source, target)
+
+    assert stats['mode'] == 'full'
+    assert stats['read_count'] == stats['insert_count'] == len(rows)
+    assert len(target.tables['routes'].rows) == len(rows)
+    state = routes_state(state_file)
+    assert datetime.fromisoformat(state['watermark']) == max(row[-1] for row in rows)
+    assert state['watermark_column'] == 'updated_at'
+    assert state['last_full_reload'] is not None
+
+
+def test_next_run_upserts_only_rows_at_or_after_the_watermark(routes, state_file):
+    source, target, rows = routes
+    copy(source, target)
+    watermark = max(row[-1] for row in rows)
+
+    changed_at = watermark + timedelta(minutes=1)
+    rows[9] = rows[9][:2] + ("Yeni rota",) + rows[9][3:5] + (changed_at,)
+    rows.append((501, "R000501", "Rota 501", "Cum", True, changed_at))
+    stats = copy(source, target)
+
+    # Önceki çalışmanın sınırındaki satır `>=` ile yeniden okunur
+    assert stats == {'read_count': 3, 'insert_count': 3, 'mode': 'incremental'}
+    assert target.tables['routes'].rows[10][2] == "Yeni rota"
+    assert target.tables['routes'].rows[501] == rows[-1]
+    assert len(target.tables['routes'].rows) == 501
+    assert datetime.fromisoformat(routes_state(state_file)['watermark']) == changed_at
+
+
+@pytest.mark.parametrize('reason', ['forced', 'interval', 'column'])
+def test_full_reload_when_due(routes, state_file, monkeypatch, reason):
+    source, target, rows = routes
+    copy(source, target)
+    if reason == 'forced':
+        monkeypatch.setattr(sync, 'SYNC_FORCE_FULL', True)
+    elif reason == 'interval':
+        last_full = datetime.now() - timedelta(hours=sync.FULL_RELOAD_INTERVAL_HOURS + 1)
+        sync.update_sync_state('routes', last_full_reload=last_full.isoformat())
+    else:
+        sync.update_sync_state('routes', watermark_column='created_at')
+
+    stats = copy(source, target)
+    assert stats['mode'] == 'full'
+    assert stats['read_count'] == len(rows)
+    state = routes_state(state_file)
+    assert state['watermark_column'] == 'updated_at'
+    assert datetime.now() - datetime.fromisoformat(state['last_full_reload']) < timedelta(minutes=1)
@@ -0,0 +1,126 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+import sync
+
+
+class BlockingStream(io.StringIO):
+    """Console stream whose first write waits for `release`, holding the listener thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+@pytest.fixture
+def logging_setup(monkeypatch):
+    """A fresh SyncLogging; the `sync` logger's handlers and level are restored afterwards"""
+    handlers, level, propagate = list(sync.log.handlers), sync.log.level, sync.log.propagate
+    for handler in handlers:
+        sync.log.removeHandler(handler)
+    monkeypatch.setattr(sync, 'LOG_FILE', None)
+    monkeypatch.setattr(sync, 'LOG_LEVEL', 'INFO')
+    setup = sync.SyncLogging()
+    yield setup
+    setup.stop()
+    for handler in list(sync.log.handlers):
+        sync.log.removeHandler(handler)
+    for handler in handlers:
+        sync.log.addHandler(handler)
+    sync.log.setLevel(level)
+    sync.log.propagate = propagate
+
+
+def test_records_reach_the_console_and_the_file_through_the_queue(logging_setup, monkeypatch, tmp_path):
+    monkeypatch.setattr(sync, 'LOG_FORMAT', 'text')
+    monkeypatch.setattr(sync, 'LOG_FILE', str(tmp_path / "sync.log"))
+    stream = io.StringIO()
+    logging_setup.start(stream)
+    logging_setup.start(io.StringIO())  # ikinci çağrı bir şey değiştirmez
+
+    sync.log.info("Routes tamamlandı")
+    sync.log.debug("görünmez")
+    logging_setup.stop()
+
+    assert stream.getvalue() == "Routes tamamlandı\n"
+    assert (tmp_path / "sync.log").read_text(encoding='utf-8').endswith(" INFO Routes tamamlandı\n")
+    assert sync.log.propagate is False
+
+
+def test_json_lines_carry_table_event_and_fields(logging_setup, monkeypatch):
+    monkeypatch.setattr(sync, 'LOG_FORMAT', 'json')
+    stream = io.StringIO()
+    logging_setup.start(stream)
+
+    with sync.METRICS.scope('routes'):
+        sync.log.warning("  Kayıt atlandı ", extra={'event': 'skipped', 'fields': {'id': 7}})
+    sync.log.info("Bitti")
+    logging_setup.stop()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert {key: first[key] for key in ('level', 'table', 'event', 'message', 'id')} == {
+        'level': 'warning', 'table': 'routes', 'event': 'skipped', 'message': "Kayıt atlandı", 'id': 7}
+    assert 'table' not in second and second['message'] == "Bitti"
+
+
+def test_full_queue_drops_records_instead_of_waiting(logging_setup, monkeypatch):
+    monkeypatch.setattr(sync, 'LOG_FORMAT', 'text')
+    monkeypatch.setattr(sync, 'LOG_QUEUE_SIZE', 1)
+    stream = BlockingStream()
+    logging_setup.start(stream)
+
+    sync.log.info("1")
+    assert stream.entered.wait(5)  # listener ilk satırı yazarken bekliyor
+    for message in ("2", "3", "4"):
+        sync.log.info(message)
+    assert logging_setup.handler.dropped == 2
+
+    stream.release.set()
+    logging_setup.stop()
+    assert stream.getvalue() == "1\n2\nUYARI: log kuyruğu dolduğu için 2 satır atlandı\n"
+
+
+def test_after_stop_records_go_straight_to_the_handlers(logging_setup, monkeypatch):
+    monkeypatch.setattr(sync, 'LOG_FORMAT', 'text')
+    stream = io.StringIO()
+    logging_setup.start(stream)
+    logging_setup.stop()
+    sync.log.info("çıkışta")
+    assert stream.getvalue() == "çıkışta\n"
+
+    # Yeniden başlatınca doğrudan bağlanan handler'lar kaldırılır, satır iki kez yazılmaz
+    restarted = io.StringIO()
+    logging_setup.start(restarted)
+    sync.log.info("tekrar")
+    logging_setup.stop()
+    assert stream.getvalue() == "çıkışta\n"
+    assert restarted.getvalue() == "tekrar\n"
+
+
+def test_row_events_are_counted_and_sampled(logging_setup, monkeypatch):
+    monkeypatch.setattr(sync, 'LOG_FORMAT', 'json')
+    monkeypatch.setattr(sync, 'LOG_LEVEL', 'DEBUG')
+    monkeypatch.setattr(sync, 'LOG_ROW_SAMPLE', 3)
+    stream = io.StringIO()
+    logging_setup.start(stream)
+    sync.METRICS.reset()
+
+    with sync.METRICS.scope('users'):
+        for user_id in range(7):
+            sync.row_event('inserted', f"Eklendi: ID={user_id}", id=user_id)
+    logging_setup.stop()
+
+    assert sync.METRICS.counters['users']['event_inserted'] == 7
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(line['id'], line['event_count']) for line in lines] == [(0, 1), (3, 4), (6, 7)]
+    assert {line['event'] for line in lines} == {'inserted'}
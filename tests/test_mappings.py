@@ -0,0 +1,119 @@
+import datetime
+import os
+
+import pytest
+
+import sync
+
+SOURCE_TYPES = {
+    'id': 'integer',
+    'aktif': 'boolean',
+    'durum': 'boolean',
+    'bayraklar': 'ARRAY',
+    'etiketler': 'ARRAY',
+    'ayar': 'jsonb',
+    'liste': 'json',
+    'guncelleme': 'timestamp with time zone',
+    'telefon': 'text',
+}
+TARGET_COLUMNS = ['id', 'aktif', 'durum', 'bayraklar', 'etiketler', 'ayar', 'liste', 'guncelleme', 'telefon_1',
+                  'telefon']
+MAPPINGS = [
+    sync.TableMapping('t', 'public.mapping_test', 'db.t', renames={'telefon_1': 'telefon'},
+                      null_columns=['telefon'], converters={'durum': 'bool_text'}),
+    sync.TableMapping('t', 'public.mapping_test', 'db.t', array_converter='array_literal',
+                      converters={'aktif': 'bool_int', 'liste': 'array_literal'}),
+    sync.TableMapping('t', 'public.mapping_test', 'db.t', array_converter=None),
+]
+
+
+@pytest.mark.parametrize('mapping', MAPPINGS)
+def test_json_columns_use_json_converter(mapping):
+    for col in ('ayar', 'liste'):
+        assert mapping._converter_name(col, SOURCE_TYPES) == 'json'
+        assert mapping.select_expr(col, SOURCE_TYPES) == f'"{col}"::text'
+
+
+def test_array_converter_on_scalar_column_is_ignored():
+    mapping = sync.TableMapping('t', 'public.mapping_test', 'db.t', converters={'telefon': 'array_literal'})
+    assert mapping._converter_name('telefon', SOURCE_TYPES) is None
+    assert mapping.select_expr('telefon', SOURCE_TYPES) == '"telefon"'
+
+
+def test_compile_writes_bool_arrays_like_str():
+    transform = MAPPINGS[1].compile(['bayraklar', 'ayar'], ['bayraklar', 'ayar'], SOURCE_TYPES)
+    assert transform(([True, False, None], '{"a": [1, 2]}')) == ['{True,False,None}', '{"a": [1, 2]}']
+
+
+def test_null_and_renamed_columns():
+    mapping = MAPPINGS[0]
+    transform = mapping.compile(['id', 'telefon'], ['id', 'telefon_1', 'telefon'], SOURCE_TYPES)
+    assert transform((1, '555')) == [1, '555', None]
+    assert [mapping.select_expr(col, SOURCE_TYPES) for col in ('telefon_1', 'telefon')] == ['"telefon"', 'NULL']
+
+
+def _normalize(value):
+    # MariaDB'ye yazılınca bool 0/1, timestamptz UTC timestamp olur
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@pytest.fixture(scope='module')
+def pg_conn():
+    dsn = os.getenv('SYNC_TEST_PG_DSN')
+    if not dsn:
+        pytest.skip('SYNC_TEST_PG_DSN tanımlı değil')
+    conn = sync.psycopg2.connect(dsn)
+    sync.configure_source_connection(conn)
+    cursor = conn.cursor()
+    cursor.execute("SET TIME ZONE 'UTC'")
+    cursor.execute(
+        "CREATE TEMP TABLE mapping_test (id integer, aktif boolean, durum boolean, bayraklar boolean[], "
+        "etiketler text[], ayar jsonb, liste json, guncelleme timestamptz, telefon text)")
+    cursor.execute(
+        "INSERT INTO mapping_test VALUES "
+        "(1, true, false, '{t,f,NULL}', '{a,b}', '{\"b\": 1, \"a\": [1, 2]}', '[1, \"x\"]', "
+        "'2024-05-01 10:00:00+03', '555'), "
+        "(2, false, true, '{}', '{}', '[]', '{\"a\" :  1}', NULL, NULL), "
+        "(3, NULL, NULL, NULL, '{NULL,c}', NULL, NULL, '2024-01-01 00:00:00+00', '')")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('mapping', MAPPINGS)
+def test_row_path_matches_sql_path(pg_conn, mapping):
+    cursor = pg_conn.cursor()
+    source_columns = list(SOURCE_TYPES)
+    cursor.execute(f"SELECT {', '.join(source_columns)} FROM mapping_test ORDER BY id")
+    transform = mapping.compile(source_columns, TARGET_COLUMNS, SOURCE_TYPES)
+    row_path = [[_normalize(value) for value in transform(record)] for record in cursor.fetchall()]
+
+    exprs = [mapping.select_expr(col, SOURCE_TYPES) for col in TARGET_COLUMNS]
+    cursor.execute(f"SELECT {', '.join(exprs)} FROM mapping_test ORDER BY id")
+    sql_path = [[_normalize(value) for value in record] for record in cursor.fetchall()]
+
+    assert row_path == sql_path
+
+
+def test_plain_column_selection_uses_itemgetter():
+    mapping = sync.TableMapping('t', 'public.mapping_test', 'db.t')
+    transform = mapping.compile(['ad', 'id', 'telefon'], ['id', 'telefon'], SOURCE_TYPES)
+    assert type(transform).__name__ == 'itemgetter'
+    assert transform(('x', 7, '555')) == (7, '555')
+
+
+def test_unknown_converter_is_rejected():
+    with pytest.raises(ValueError, match='bilinmeyen converter'):
+        sync.TableMapping.from_config({'name': 't', 'source': 's.t', 'target': 'db.t', 'converters': {'a': 'yok'}})
+
+
+def test_bound_mapping_select_exprs_and_insert_sql():
+    bound = sync.BoundTableMapping(MAPPINGS[0], SOURCE_TYPES, ['id', 'durum', 'telefon_1'])
+    assert bound.select_exprs() == ['"id"', "CASE WHEN \"durum\" THEN 'true' ELSE 'false' END", '"telefon"']
+    assert bound.insert_sql(upsert=True) == (
+        "INSERT INTO db.t (id,durum,telefon_1) VALUES (%s,%s,%s) "
+        "ON DUPLICATE KEY UPDATE durum=VALUES(durum), telefon_1=VALUES(telefon_1)")
+    assert bound.with_target('db.t__yeni').insert_sql().startswith("INSERT INTO db.t__yeni ")
@@ -0,0 +1,61 @@
+import sync
+
+
+class RawCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.rows = [(self.connection.name, query)]
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class RawConnection:
+    opened = 0
+
+    def __init__(self):
+        RawConnection.opened += 1
+        self.name = f"bağlantı{RawConnection.opened}"
+
+    def cursor(self, *args, **kwargs):
+        return RawCursor(self)
+
+    def close(self):
+        pass
+
+
+def test_fetch_after_reconnect_reads_the_new_cursor():
+    conn = sync.InstrumentedConnection(RawConnection(), 'source', factory=RawConnection)
+    cursor = conn.cursor('sunucu')
+    cursor.execute("SELECT 1")
+    conn.reconnect()
+    # Eski bağlantının sonucu okunmaz; fetch yeni bağlantıdaki cursor'a gider
+    assert cursor.fetchall() == []
+    cursor.execute("SELECT 2")
+    assert cursor.fetchall() == [(conn._conn.name, "SELECT 2")]
+    cursor.execute("SELECT 3")
+    assert [row[1] for row in cursor] == ["SELECT 3"]
+
+
+def test_round_trips_are_counted_per_table():
+    sync.METRICS.reset()
+    conn = sync.InstrumentedConnection(RawConnection(), 'source')
+    with sync.METRICS.scope('routes'):
+        server_side = conn.cursor('sunucu')
+        server_side.execute("SELECT 1")
+        server_side.fetchone()
+        client_side = conn.cursor()
+        client_side.execute("SELECT 1")
+        client_side.fetchall()
+    # Sunucu taraflı cursor'da her fetch bir round trip, istemci tarafında satırlar execute ile gelir
+    assert sync.METRICS.counters['routes']['source_round_trips'] == 3
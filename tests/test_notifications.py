@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+import requests
+
+import sync
+
+URL = "https://example.invalid/webhook"
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+
+class FakeSession:
+    """requests.Session stand-in answering posts from `replies` (status codes or exceptions), then 200"""
+
+    def __init__(self, replies=(), block=None):
+        self.replies = list(replies)
+        self.block = block
+        self.posted = []
+        self.closed = False
+        self.entered = threading.Event()
+
+    def post(self, url, json=None, timeout=None):
+        self.posted.append(json['title'])
+        self.entered.set()
+        if self.block:
+            self.block.wait(5)
+        reply = self.replies.pop(0) if self.replies else 200
+        if isinstance(reply, Exception):
+            raise reply
+        return FakeResponse(*reply) if isinstance(reply, tuple) else FakeResponse(reply)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(sync.time, 'sleep', delays.append)
+    return delays
+
+
+def dispatcher(max_size=10, retries=3):
+    return sync.NotificationDispatcher(URL, max_size, 1, retries, 1)
+
+
+def card(title, color="00ff00"):
+    return {'title': title, 'summary': title, 'themeColor': color, 'text': f"{title} metni"}
+
+
+def run_worker(monkeypatch, session):
+    monkeypatch.setattr(requests, 'Session', lambda: session)
+
+
+def test_worker_posts_queued_messages_and_close_flushes(monkeypatch):
+    session = FakeSession()
+    run_worker(monkeypatch, session)
+    notifier = dispatcher()
+    assert notifier.send(card("Başladı"))
+    assert notifier.send(card("Hata"), "error")
+    notifier.close(timeout=5)
+
+    assert session.posted == ["Başladı", "Hata"]
+    assert session.closed
+    assert notifier.sent == 2 and notifier.failed == 0
+    assert not notifier.worker.is_alive()
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    release = threading.Event()
+    session = FakeSession(block=release)
+    run_worker(monkeypatch, session)
+    notifier = dispatcher(max_size=1)
+
+    assert notifier.send(card("1"))
+    assert session.entered.wait(5)  # worker ilk mesajı göndermeye çalışıyor
+    assert notifier.send(card("2"))
+    assert not notifier.send(card("3"))
+    assert notifier.dropped == 1
+
+    release.set()
+    notifier.close(timeout=5)
+    assert session.posted == ["1", "2"]
+
+
+def test_only_errors_and_missing_url_skip_messages():
+    notifier = dispatcher()
+    notifier.only_errors = True
+    assert not notifier.send(card("Tablo"), "table")
+    assert notifier.worker is None
+    assert not sync.NotificationDispatcher("", 10, 1, 3, 1).send(card("Hata"), "error")
+
+
+def test_table_messages_fold_into_the_summary():
+    payloads = sync.NotificationDispatcher._coalesce([
+        ("info", card("Başladı")),
+        ("table", card("Customers")),
+        ("table", card("Routes", "ff0000")),
+        ("summary", card("Özet")),
+    ])
+    assert [payload['title'] for payload in payloads] == ["Başladı", "Özet"]
+    assert payloads[1]['text'] == "Özet metni\n\nTablo Detaylari:\n\nCustomers metni\n\n---\n\nRoutes metni"
+
+
+def test_table_messages_without_a_summary_become_one_card():
+    payloads = sync.NotificationDispatcher._coalesce([("table", card("Customers")),
+                                                      ("table", card("Routes", "ff0000"))])
+    assert len(payloads) == 1
+    assert payloads[0]['title'] == "Tablolar Tamamlandi"
+    assert payloads[0]['themeColor'] == "ff0000"
+
+
+def test_server_errors_and_throttling_are_retried_with_backoff(sleeps):
+    notifier = dispatcher()
+    session = FakeSession([503, (429, {'Retry-After': '7'}), requests.ConnectionError("bağlantı koptu")])
+    assert notifier._post(session, card("Özet"))
+    assert sleeps == [1, 7, 4]
+    assert len(session.posted) == 4
+    assert notifier.sent == 1
+
+
+def test_client_errors_are_not_retried(sleeps):
+    notifier = dispatcher()
+    session = FakeSession([400])
+    assert not notifier._post(session, card("Özet"))
+    assert sleeps == [] and notifier.failed == 1
+
+
+def test_gives_up_after_the_configured_retries(sleeps):
+    notifier = dispatcher(retries=2)
+    session = FakeSession([500, 502, 504, 200])
+    assert not notifier._post(session, card("Özet"))
+    assert sleeps == [1, 2]
+    assert len(session.posted) == 3 and notifier.failed == 1
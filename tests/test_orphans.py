@@ -0,0 +1,143 @@
+import re
+
+import pytest
+
+import sync
+
+COLUMNS = ['id', 'position_code', 'ad']
+
+
+class OrphanTarget:
+    """admin_efes1.users plus the connection's temporary key table, for the orphan statements only"""
+
+    def __init__(self, users):
+        self.users = [dict(zip(COLUMNS, user)) for user in users]
+        self.keys = None
+        self.archive = None
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return OrphanCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class OrphanCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = -1
+        self.result = []
+
+    def _missing(self, user):
+        # k.position_code <=> u.position_code: NULL NULL ile eşleşir
+        return (user['id'], user['position_code']) not in self.db.keys
+
+    def execute(self, query, params=None):
+        db = self.db
+        db.statements.append(query)
+        params = list(params or ())
+        if query.startswith("DROP TEMPORARY TABLE"):
+            db.keys = None
+        elif query.startswith("CREATE TEMPORARY TABLE"):
+            db.keys = set()
+        elif query.startswith(f"INSERT INTO {sync.USERS_KEYS_TABLE}"):
+            db.keys.update(zip(params[::2], params[1::2]))
+        elif " LEFT JOIN " in query:
+            self.result = [(user['id'], user['position_code']) for user in sorted(db.users, key=lambda u: u['id'])
+                           if self._missing(user)]
+        elif query.startswith(f"CREATE TABLE IF NOT EXISTS {sync.USERS_ORPHAN_ARCHIVE_TABLE}"):
+            db.archive = [] if db.archive is None else db.archive
+        elif query.startswith(("DELETE FROM admin_efes1.users", f"INSERT INTO {sync.USERS_ORPHAN_ARCHIVE_TABLE}")):
+            assert re.search(r"WHERE id IN \([%s, ]+\) AND NOT EXISTS", query)
+            rows = [user for user in db.users if user['id'] in params and self._missing(user)]
+            if query.startswith("DELETE"):
+                db.users = [user for user in db.users if user not in rows]
+            else:
+                db.archive += rows
+            self.rowcount = len(rows)
+        else:
+            raise NotImplementedError(query)
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def target(monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 2)
+    return OrphanTarget([
+        (1, 'A', 'bir'),
+        (2, None, 'iki'),
+        (3, 'C', 'üç'),
+        (3, 'ESKI', 'üç eski'),  # aynı id, PostgreSQL'de başka pozisyonda
+        (4, 'D', 'dört'),
+        (5, None, 'beş'),
+    ])
+
+
+SOURCE_KEYS = [(1, 'A'), (2, None), (3, 'C')]
+
+
+def handle(monkeypatch, target, policy, keys=SOURCE_KEYS):
+    monkeypatch.setattr(sync, 'USERS_ORPHAN_POLICY', policy)
+    errors = []
+    removed = sync.handle_users_orphans(target, keys, COLUMNS, errors)
+    return removed, errors
+
+
+def remaining(target):
+    return [(user['id'], user['position_code']) for user in target.users]
+
+
+def test_report_lists_orphans_without_removing_them(monkeypatch, target):
+    removed, errors = handle(monkeypatch, target, 'report')
+
+    assert removed == 0
+    assert [error['fields'] for error in errors] == [
+        {'id': 3, 'position_code': 'ESKI'}, {'id': 4, 'position_code': 'D'}, {'id': 5, 'position_code': None}]
+    assert {error['kind'] for error in errors} == {'orphan'}
+    assert len(target.users) == 6
+    assert target.keys is None and target.commits == 1
+
+
+def test_delete_removes_only_keys_missing_from_the_source(monkeypatch, target):
+    removed, errors = handle(monkeypatch, target, 'delete')
+
+    assert removed == 3 and errors == []
+    assert remaining(target) == [(1, 'A'), (2, None), (3, 'C')]
+    # Anahtarlar ve silmeler MARIA_BATCH_SIZE'lık parçalarla gider
+    assert sum(sql.startswith(f"INSERT INTO {sync.USERS_KEYS_TABLE}") for sql in target.statements) == 2
+    assert sum(sql.startswith("DELETE FROM") for sql in target.statements) == 2
+
+
+def test_archive_copies_rows_before_deleting(monkeypatch, target):
+    removed, _ = handle(monkeypatch, target, 'archive')
+
+    assert removed == 3
+    assert [(user['id'], user['position_code']) for user in target.archive] == [(3, 'ESKI'), (4, 'D'), (5, None)]
+    assert remaining(target) == [(1, 'A'), (2, None), (3, 'C')]
+
+
+def test_nothing_is_removed_when_the_source_returned_no_users(monkeypatch, target):
+    removed, errors = handle(monkeypatch, target, 'delete', keys=[])
+
+    assert removed == 0
+    assert len(errors) == len(target.users) == 6
+    assert not any(sql.startswith("DELETE") for sql in target.statements)
+
+
+@pytest.mark.parametrize('check, policy, expected', [
+    ('client', 'report', False),
+    ('server', 'report', True),
+    ('client', 'delete', True),
+    ('client', 'archive', True),
+])
+def test_orphans_on_server(monkeypatch, check, policy, expected):
+    monkeypatch.setattr(sync, 'USERS_ORPHAN_CHECK', check)
+    monkeypatch.setattr(sync, 'USERS_ORPHAN_POLICY', policy)
+    assert sync.users_orphans_on_server() is expected
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import benchmark
+import sync
+
+
+class ScalarCursor:
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchone(self):
+        return self.row
+
+
+def covered(ranges, keys):
+    """Key -> index of the range holding it; every key must be in exactly one range"""
+    owners = {}
+    for key in keys:
+        matches = [i for i, (lower, upper) in enumerate(ranges)
+                   if (lower is None or key >= lower) and (upper is None or key < upper)]
+        assert len(matches) == 1, (key, matches)
+        owners[key] = matches[0]
+    return owners
+
+
+def test_minmax_splits_evenly(monkeypatch):
+    monkeypatch.setattr(sync, 'PARTITION_SPLIT', 'minmax')
+    ranges = sync.compute_id_ranges(ScalarCursor((1, 100)), 's.t', 4)
+    assert ranges == [(None, 26), (26, 51), (51, 76), (76, None)]
+    owners = covered(ranges, range(1, 101))
+    assert [list(owners.values()).count(i) for i in range(4)] == [25, 25, 25, 25]
+
+
+def test_minmax_empty_table(monkeypatch):
+    monkeypatch.setattr(sync, 'PARTITION_SPLIT', 'minmax')
+    assert sync.compute_id_ranges(ScalarCursor((None, None)), 's.t', 4) == [(None, None)]
+
+
+def test_minmax_more_partitions_than_keys(monkeypatch):
+    monkeypatch.setattr(sync, 'PARTITION_SPLIT', 'minmax')
+    ranges = sync.compute_id_ranges(ScalarCursor((5, 6)), 's.t', 8)
+    assert len(ranges) == len(set(ranges)) <= 3
+    owners = covered(ranges, [5, 6])
+    assert owners[5] != owners[6]
+
+
+def test_quantile_drops_repeated_boundaries(monkeypatch):
+    monkeypatch.setattr(sync, 'PARTITION_SPLIT', 'quantile')
+    monkeypatch.setattr(sync, 'PARTITION_SAMPLE_PERCENT', 100)
+    cursor = ScalarCursor(([10, 10, 40],))
+    ranges = sync.compute_id_ranges(cursor, 's.t', 4, key_column='kod')
+    assert ranges == [(None, 10), (10, 40), (40, None)]
+    query, params = cursor.queries[0]
+    assert 'ORDER BY kod' in query and 'TABLESAMPLE' not in query
+    assert params == ([0.25, 0.5, 0.75],)
+
+
+@pytest.mark.parametrize('split', ['minmax', 'quantile'])
+def test_partitioned_full_reload_copies_every_row_once(fake_dbs, monkeypatch, split):
+    source, target = fake_dbs
+    monkeypatch.setattr(sync, 'PARTITION_SPLIT', split)
+    monkeypatch.setattr(sync, 'PARTITION_SAMPLE_PERCENT', 100)
+    columns, types, rows, target_columns = benchmark.generate_routes(1000, random.Random(1))
+    source.tables['routes'] = {'columns': columns, 'types': types, 'rows': rows}
+    target.tables['routes'] = benchmark.FakeTargetTable(target_columns)
+
+    pg_conn, maria_conn = source.connect(), target.connect()
+    bound = sync.ROUTES_MAPPING.bind(pg_conn.cursor(), maria_conn.cursor())
+    read_count, insert_count, _, parts = sync.partitioned_full_reload(
+        pg_conn.cursor(), maria_conn.cursor(), maria_conn, bound, 4)
+
+    assert read_count == insert_count == len(rows)
+    assert len(parts) > 1
+    assert sorted(target.tables['routes'].rows) == sorted(row[0] for row in rows)
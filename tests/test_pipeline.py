@@ -0,0 +1,63 @@
+import pytest
+
+import sync
+
+QUERY = "INSERT INTO db.t (id,ad) VALUES (%s,%s)"
+
+
+class ReadFailure(RuntimeError):
+    pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+        self.calls = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return (1 << 20,)  # SELECT @@max_allowed_packet
+
+    def commit(self):
+        self.calls.append('commit')
+
+    def rollback(self):
+        self.calls.append('rollback')
+
+
+@pytest.fixture(autouse=True)
+def pipeline(monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_BATCH_SIZE', 10)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_MIN_ROWS', 1)
+    monkeypatch.setattr(sync, 'MARIA_BATCH_TARGET_SECONDS', 0)
+    monkeypatch.setattr(sync, 'MARIA_COMMIT_ROWS', 1000)
+
+
+def records(count, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise ReadFailure("kaynak bağlantısı koptu")
+        yield (i, f"ad{i}")
+
+
+def run(conn, source):
+    return sync.pipelined_insert_stream(conn, conn, QUERY, tuple, source, sync.WatermarkTracker(['id', 'ad'], 'id'))
+
+
+@pytest.mark.parametrize('transform_stage', [True, False])
+def test_rows_are_written_and_committed(monkeypatch, transform_stage):
+    monkeypatch.setattr(sync, 'PIPELINE_TRANSFORM_STAGE', transform_stage)
+    conn = RecordingConnection()
+    assert run(conn, records(35)) == 35
+    assert conn.calls == ['commit']
+
+
+@pytest.mark.parametrize('transform_stage', [True, False])
+def test_reader_error_rolls_back_instead_of_committing(monkeypatch, transform_stage):
+    monkeypatch.setattr(sync, 'PIPELINE_TRANSFORM_STAGE', transform_stage)
+    conn = RecordingConnection()
+    with pytest.raises(ReadFailure):
+        run(conn, records(35, fail_at=25))
+    assert conn.calls == ['rollback']
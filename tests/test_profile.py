@@ -0,0 +1,105 @@
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+import benchmark
+import sync
+
+MAPPING = sync.TableMapping('routes', 'neocortex_schema_v1.routes', 'admin_efes1.routes', array_converter=None,
+                            strategy='diff')
+
+
+def code_in(path):
+    return (lambda: None).__code__.replace(co_filename=path)
+
+
+@pytest.mark.parametrize('code, category', [
+    (sync._digest_value.__code__, 'transform'),
+    (sync.BatchWriter._send.__code__, 'driver'),
+    (sync.InsertBatcher.statement.__code__, 'sql'),
+    (sync.InstrumentedCursor.execute.__code__, 'driver'),
+    (code_in("/venv/lib/python3.11/site-packages/psycopg2/extras.py"), 'driver'),
+    (code_in("/venv/lib/python3.11/site-packages/mysql/connector/conversion.py"), 'sql'),
+    (sync.copy_table.__code__, None),
+])
+def test_frame_category(code, category):
+    assert sync.frame_category(code) == category
+
+
+def test_compiled_transform_counts_as_transform():
+    transform = sync.TableMapping('t', 's.t', 'd.t', converters={'durum': 'bool_text'}).compile(
+        ['id', 'durum'], ['id', 'durum'], {'id': 'integer', 'durum': 'boolean'})
+    assert sync.frame_category(transform.__code__) == 'transform'
+
+
+def test_samples_fall_back_to_the_stage_or_count_as_waiting(monkeypatch):
+    monkeypatch.setattr(sync, 'PROFILE_TOOLS', '')
+    profile = sync.TableProfile('routes')
+    thread = threading.get_ident()
+
+    with sync.METRICS.stage('fetch'):
+        profile._record(thread, sys._getframe())
+    profile._record(thread, sys._getframe())
+
+    jobs = queue.Queue()
+    worker = threading.Thread(target=jobs.get, name="routes-stage")
+    worker.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not sys._current_frames()[worker.ident].f_code.co_filename.endswith('threading.py'):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        profile._record(worker.ident, sys._current_frames()[worker.ident])
+    finally:
+        jobs.put(None)
+        worker.join()
+
+    assert profile.categories == {'driver': 1, 'other': 1, 'wait': 1}
+    assert {name for name, _ in profile.stacks} == {threading.current_thread().name, "routes-stage"}
+
+
+def test_profiled_job_writes_report_stacks_and_cprofile(fake_dbs, monkeypatch, tmp_path):
+    source, target = fake_dbs
+    monkeypatch.setattr(sync, 'PROFILE_DIR', str(tmp_path / "profiles"))
+    monkeypatch.setattr(sync, 'PROFILE_INTERVAL_MS', 1)
+    monkeypatch.setattr(sync, 'TARGET_DBS', {})
+    monkeypatch.setattr(sync.PROFILER, 'tables', {'routes'})
+    monkeypatch.setattr(sync.PROFILER, 'reports', {})
+    columns, types, rows, target_columns = benchmark.generate_routes(3000, random.Random(6))
+    source.tables['routes'] = {'columns': columns, 'types': types, 'rows': rows}
+    target.tables['routes'] = benchmark.FakeTargetTable(target_columns)
+
+    pg_conn, maria_conn = source.connect(), target.connect()
+    with sync.PROFILER.profile('routes'):
+        sync.copy_table(pg_conn.cursor(), maria_conn.cursor(), maria_conn, MAPPING)
+    with sync.PROFILER.profile('users'):
+        pass
+
+    assert list(sync.PROFILER.reports) == ['routes']
+    base = sync.PROFILER.reports['routes']
+    report = open(base + ".txt", encoding='utf-8').read()
+    assert report.startswith("Profil: routes\n")
+    for section in ("Zaman dağılımı", "cProfile, kümülatif süre", "Bellek (tracemalloc): tepe"):
+        assert section in report
+    stacks = open(base + ".collapsed", encoding='utf-8').read().splitlines()
+    assert stacks and all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
+    assert os.path.getsize(base + ".prof") > 0
+    assert len(list((tmp_path / "profiles").iterdir())) == 3
+
+
+def test_unwritable_profile_dir_only_warns(monkeypatch, tmp_path):
+    blocker = tmp_path / "profiles"
+    blocker.write_text("")
+    monkeypatch.setattr(sync, 'PROFILE_DIR', str(blocker))
+    monkeypatch.setattr(sync, 'PROFILE_TOOLS', '')
+    monkeypatch.setattr(sync.PROFILER, 'tables', {'routes'})
+    monkeypatch.setattr(sync.PROFILER, 'reports', {})
+
+    with sync.PROFILER.profile('routes'):
+        pass
+    assert sync.PROFILER.reports == {}
@@ -0,0 +1,35 @@
+import pytest
+from mysql.connector.errors import ConnectionTimeoutError, OperationalError, ReadTimeoutError
+
+import sync
+
+
+class FailingCursor:
+    def __init__(self, error):
+        self.error = error
+
+    def execute(self, statement, params=None):
+        raise self.error
+
+
+class Connection:
+    generation = 0
+
+
+@pytest.mark.parametrize('statement, error, transient', [
+    ("ALTER TABLE t ADD INDEX (id)", ReadTimeoutError(errno=3024), False),
+    ("LOAD DATA LOCAL INFILE 'f' INTO TABLE t", TimeoutError(), False),
+    ("DELETE t FROM t LEFT JOIN s ON s.id = t.id WHERE s.id IS NULL", ReadTimeoutError(errno=3024), False),
+    ("  select count(*) from t", ReadTimeoutError(errno=3024), True),
+    ("INSERT INTO t VALUES (1)", OperationalError(errno=1213), True),
+    ("DELETE FROM t", OperationalError(errno=2013), True),
+])
+def test_read_timeout_retried_only_for_reads(statement, error, transient):
+    cursor = sync.InstrumentedCursor(FailingCursor(error), Connection(), 'target', False)
+    with pytest.raises(type(error)) as raised:
+        cursor.execute(statement)
+    assert sync.is_transient_error(raised.value) is transient
+
+
+def test_connect_timeout_is_transient():
+    assert sync.is_transient_error(ConnectionTimeoutError(errno=3024))
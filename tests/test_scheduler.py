@@ -0,0 +1,76 @@
+import os
+import threading
+
+import pytest
+
+import sync
+
+
+def test_second_lock_is_refused_until_released(lock_files):
+    first, second = sync.SyncLock(sync.SYNC_LOCK_FILE), sync.SyncLock(sync.SYNC_LOCK_FILE)
+    assert first.acquire()
+    assert not second.acquire()
+    assert f"pid {os.getpid()}" in second.holder()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_acquire_waits_for_the_holder(lock_files):
+    holder = sync.SyncLock(sync.SYNC_LOCK_FILE)
+    assert holder.acquire()
+    threading.Timer(0.3, holder.release).start()
+    waiter = sync.SyncLock(sync.SYNC_LOCK_FILE)
+    assert waiter.acquire(wait=5)
+    waiter.release()
+
+
+def test_run_sync_is_refused_while_another_sync_runs(lock_files, state_file):
+    holder = sync.SyncLock(sync.SYNC_LOCK_FILE)
+    assert holder.acquire()
+    try:
+        with pytest.raises(sync.SyncAlreadyRunning):
+            sync.run_sync(tables=['routes'])
+    finally:
+        holder.release()
+
+
+def test_scheduled_run_skips_instead_of_failing(monkeypatch):
+    calls = []
+
+    def locked(**kwargs):
+        calls.append(kwargs)
+        raise sync.SyncAlreadyRunning("pid 1")
+
+    monkeypatch.setattr(sync, 'run_sync', locked)
+    sync.run_scheduled(['users'], notify=False)
+    monkeypatch.setattr(sync, 'run_sync', lambda **kwargs: 1 / 0)
+    sync.run_scheduled(['users'], notify=False)
+    assert calls == [{'tables': ['users'], 'notify': False}]
+
+
+def test_table_schedules_group_tables(monkeypatch):
+    monkeypatch.setattr(sync, 'SYNC_SCHEDULE', '23:00')
+    monkeypatch.setenv('SYNC_SCHEDULE_USERS', '5m')
+    monkeypatch.setenv('SYNC_SCHEDULE_ROUTES', 'off')
+    groups = sync.table_schedules()
+    assert groups['5m'] == ['users']
+    assert 'routes' not in sum(groups.values(), [])
+    assert 'customers' in groups['23:00']
+
+
+@pytest.mark.parametrize('spec, unit, interval', [('30s', 'seconds', 30), ('5m', 'minutes', 5), ('2h', 'hours', 2)])
+def test_interval_schedules(spec, unit, interval):
+    job = sync.parse_schedule(spec)
+    assert (job.unit, job.interval) == (unit, interval)
+
+
+def test_daily_schedule():
+    job = sync.parse_schedule('23:00')
+    assert job.unit == 'days' and str(job.at_time) == '23:00:00'
+
+
+@pytest.mark.parametrize('spec', ['0m', 'often', '5d'])
+def test_invalid_schedule(spec):
+    with pytest.raises(ValueError):
+        sync.parse_schedule(spec)
@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+import sync
+
+MAPPING = sync.TableMapping('musteri', 'src.musteri', 'dst.musteri', renames={'telefon_1': 'telefon'},
+                            null_columns=['faks'])
+
+
+class SchemaCursor:
+    """Answers the one information_schema query SchemaCache.refresh sends to a server"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+class RecordingCursor:
+    def __init__(self, prepared):
+        self.prepared = prepared
+        self.executed = []
+        self.closed = False
+
+    def execute(self, sql, params):
+        self.executed.append(params)
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.cursors = []
+
+    def cursor(self, prepared=False):
+        self.cursors.append(RecordingCursor(prepared))
+        return self.cursors[-1]
+
+
+@pytest.fixture
+def schema(tmp_path, monkeypatch):
+    """A fresh SCHEMA, the cache file in tmp_path and the Teams messages check_schema sends"""
+    monkeypatch.setattr(sync, 'SCHEMA', sync.SchemaCache())
+    monkeypatch.setattr(sync, 'SCHEMA_CACHE_FILE', str(tmp_path / "schema_cache.json"))
+    messages = []
+    monkeypatch.setattr(sync, 'send_teams_message', lambda message, *args, **kwargs: messages.append(message))
+    return tmp_path / "schema_cache.json", messages
+
+
+def source_rows(extra=()):
+    return [('src.musteri', 'id', 'integer'), ('src.musteri', 'ad', 'text'), ('src.musteri', 'telefon', 'text')] + [
+        ('src.musteri', column, data_type) for column, data_type in extra]
+
+
+def target_rows(ad_type='varchar(255)'):
+    # Bazı mysql.connector sürümleri bytes döndürür
+    return [(b'dst.musteri', b'id', b'int(11)'), ('dst.musteri', 'ad', ad_type),
+            ('dst.musteri', 'telefon_1', 'varchar(32)'), ('dst.musteri', 'faks', 'varchar(32)')]
+
+
+def check(source=None, target=None):
+    sync.check_schema(SchemaCursor(source or source_rows()), SchemaCursor(target or target_rows()), [MAPPING])
+
+
+def test_refresh_reads_each_server_once_and_answers_lookups(schema):
+    pg_cursor, maria_cursor = SchemaCursor(source_rows()), SchemaCursor(target_rows())
+    sync.SCHEMA.refresh(pg_cursor, maria_cursor, [MAPPING, sync.TableMapping('x', 'src.musteri', 'dst.musteri')])
+
+    assert pg_cursor.queries[0][1] == (['src.musteri'],)
+    assert maria_cursor.queries[0][1] == ['dst.musteri']
+    assert sync.source_column_types(pg_cursor, 'src.musteri') == {'id': 'integer', 'ad': 'text', 'telefon': 'text'}
+    assert sync.get_target_columns(maria_cursor, 'dst.musteri') == ['id', 'ad', 'telefon_1', 'faks']
+    assert len(pg_cursor.queries) == len(maria_cursor.queries) == 1
+
+
+def test_first_run_records_a_baseline_without_alerts(schema):
+    cache_file, messages = schema
+    check(source_rows([('eposta', 'text')]))
+
+    cache = json.loads(cache_file.read_text())['musteri']
+    assert cache['fingerprint'] == sync.SCHEMA.fingerprint(MAPPING)
+    assert cache['drift'] == ["kaynak kolon eposta hedefte yok, kopyalanmıyor"]
+    assert messages == []
+
+
+def test_changes_and_new_drift_are_reported(schema):
+    cache_file, messages = schema
+    check()
+    check(source_rows([('eposta', 'text')]), target_rows('varchar(500)'))
+
+    assert len(messages) == 1
+    assert "- musteri: kaynak kolon eposta eklendi" in messages[0]
+    assert "- musteri: hedef kolon ad: varchar(255) -> varchar(500)" in messages[0]
+    assert "- musteri: kaynak kolon eposta hedefte yok, kopyalanmıyor" in messages[0]
+    assert json.loads(cache_file.read_text())['musteri']['source']['eposta'] == 'text'
+
+    # Aynı şema tekrar bildirilmez
+    check(source_rows([('eposta', 'text')]), target_rows('varchar(500)'))
+    assert len(messages) == 1
+
+
+def test_fail_policy_stops_until_the_drift_is_accepted(schema, monkeypatch):
+    cache_file, messages = schema
+    check()
+    baseline = cache_file.read_text()
+    monkeypatch.setattr(sync, 'SCHEMA_DRIFT_POLICY', 'fail')
+
+    with pytest.raises(RuntimeError, match="eposta hedefte yok"):
+        check(source_rows([('eposta', 'text')]))
+    assert cache_file.read_text() == baseline
+    with pytest.raises(RuntimeError):
+        check(source_rows([('eposta', 'text')]))
+
+    monkeypatch.setattr(sync, 'SCHEMA_DRIFT_POLICY', 'warn')
+    check(source_rows([('eposta', 'text')]))
+    monkeypatch.setattr(sync, 'SCHEMA_DRIFT_POLICY', 'fail')
+    check(source_rows([('eposta', 'text')]))
+
+
+def test_fail_policy_allows_changes_without_drift(schema, monkeypatch):
+    check()
+    monkeypatch.setattr(sync, 'SCHEMA_DRIFT_POLICY', 'fail')
+    check(source_rows()[:2] + [('src.musteri', 'telefon', 'character varying')])
+    assert "kaynak kolon telefon: text -> character varying" in schema[1][0]
+
+
+def test_drift_follows_renames_and_null_columns():
+    types = {'id': 'integer', 'ad': 'text', 'telefon': 'text', 'eposta': 'text'}
+    assert sync.schema_drift(MAPPING, types, ['id', 'ad', 'telefon_1', 'faks', 'notlar']) == [
+        "hedef kolon notlar kaynakta yok, NULL yazılıyor",
+        "kaynak kolon eposta hedefte yok, kopyalanmıyor",
+    ]
+    assert sync.schema_drift(MAPPING, {}, ['id']) == ["kaynak tablo src.musteri bulunamadı"]
+    assert sync.schema_drift(MAPPING, types, []) == ["hedef tablo dst.musteri bulunamadı"]
+
+
+def test_prepared_statements_keep_one_cursor_per_shape(monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_PREPARED_STATEMENTS', True)
+    conn = RecordingConnection()
+    statements = sync.PreparedStatements(conn, max_size=2)
+
+    statements.execute("SELECT 1", (1,))
+    statements.execute("SELECT 2", (2,))
+    statements.execute("SELECT 1", (3,))
+    assert len(conn.cursors) == 2
+    assert conn.cursors[0].executed == [(1,), (3,)]
+    assert all(cursor.prepared for cursor in conn.cursors)
+
+    # En uzun süredir kullanılmayan cursor kapatılır
+    statements.execute("SELECT 3", (4,))
+    assert [cursor.closed for cursor in conn.cursors] == [False, True, False]
+
+    statements.close()
+    assert all(cursor.closed for cursor in conn.cursors)
+
+
+def test_prepared_statements_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(sync, 'MARIA_PREPARED_STATEMENTS', False)
+    conn = RecordingConnection()
+    sync.PreparedStatements(conn).execute("SELECT 1", (1,))
+    assert not conn.cursors[0].prepared
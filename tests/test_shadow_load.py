@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+import benchmark
+import sync
+
+MAPPING = sync.TableMapping('routes', 'neocortex_schema_v1.routes', 'admin_efes1.routes', array_converter=None,
+                            shadow_load=True)
+
+INDEX_COLUMNS = ['Table', 'Non_unique', 'Key_name', 'Seq_in_index', 'Column_name', 'Collation', 'Cardinality',
+                 'Sub_part', 'Packed', 'Null', 'Index_type']
+
+
+class LoadFailure(RuntimeError):
+    pass
+
+
+class IndexCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = [(col,) for col in INDEX_COLUMNS]
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def routes(fake_dbs, monkeypatch):
+    source, target = fake_dbs
+    monkeypatch.setattr(sync, 'TARGET_DBS', {})
+    columns, types, rows, target_columns = benchmark.generate_routes(300, random.Random(5))
+    source.tables['routes'] = {'columns': columns, 'types': types, 'rows': rows}
+    target.tables['routes'] = benchmark.FakeTargetTable(target_columns)
+    target.tables['routes'].insert([(9999, "ESKI", "Eski rota", "Cum", True, None)])
+    return source, target, rows
+
+
+def record_statements(monkeypatch, extra_indexes=(), blockers=0):
+    """Record the statements the target sees; SHOW INDEX also reports `extra_indexes`"""
+    statements = []
+    execute = benchmark.FakeTargetCursor._execute
+
+    def recording(self, query, params):
+        statements.append(query)
+        execute(self, query, params)
+        if query.startswith("SHOW INDEX FROM"):
+            self._result.extend(extra_indexes)
+        elif "information_schema" in query:
+            self._result = [(blockers,)]
+
+    monkeypatch.setattr(benchmark.FakeTargetCursor, '_execute', recording)
+    return statements
+
+
+def copy(source, target):
+    pg_conn, maria_conn = source.connect(), target.connect()
+    return sync.copy_table(pg_conn.cursor(), maria_conn.cursor(), maria_conn, MAPPING)
+
+
+def test_full_reload_is_swapped_in_by_rename(routes, monkeypatch):
+    source, target, rows = routes
+    live = target.tables['routes']
+    index = ('admin_efes1.routes__staging', 1, 'ix_kod', 1, 'rota_kodu', 'A', None, None, None, '', 'BTREE')
+    statements = record_statements(monkeypatch, [index])
+
+    stats = copy(source, target)
+
+    assert stats['staged'] is True
+    assert target.tables['routes'] is not live
+    assert sorted(target.tables['routes'].rows) == [row[0] for row in rows]
+    assert set(target.tables) == {'routes'}
+    assert "TRUNCATE TABLE admin_efes1.routes" not in statements
+    # İkincil index yükleme boyunca yok, RENAME'den önce tek ALTER ile geri gelir
+    drop = statements.index("ALTER TABLE admin_efes1.routes__staging DROP INDEX `ix_kod`")
+    add = statements.index("ALTER TABLE admin_efes1.routes__staging ADD INDEX `ix_kod` (`rota_kodu`)")
+    first_insert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT INTO"))
+    rename = next(i for i, sql in enumerate(statements) if sql.startswith("RENAME TABLE"))
+    assert drop < first_insert < add < rename
+
+
+def test_failed_load_leaves_the_live_table_alone(routes, monkeypatch):
+    source, target, rows = routes
+    live = target.tables['routes']
+    statements = record_statements(monkeypatch)
+
+    def fail(bound):
+        raise LoadFailure("kaynak bağlantısı koptu")
+
+    maria_conn = target.connect()
+    bound = MAPPING.bind(source.connect().cursor(), maria_conn.cursor())
+    with pytest.raises(LoadFailure):
+        sync.run_full_load(maria_conn.cursor(), maria_conn, bound, fail)
+
+    assert target.tables == {'routes': live}
+    assert list(live.rows) == [9999]
+    assert statements[-2:] == ["SET SESSION unique_checks=1, foreign_key_checks=1",
+                               "DROP TABLE IF EXISTS admin_efes1.routes__staging"]
+    assert not any(sql.startswith("RENAME TABLE") for sql in statements)
+
+
+def test_foreign_keys_or_triggers_fall_back_to_loading_in_place(routes, monkeypatch):
+    source, target, rows = routes
+    live = target.tables['routes']
+    statements = record_statements(monkeypatch, blockers=2)
+
+    stats = copy(source, target)
+
+    assert stats['staged'] is False
+    assert target.tables['routes'] is live
+    assert sorted(live.rows) == [row[0] for row in rows]
+    assert not any("__staging" in sql for sql in statements)
+
+
+def test_secondary_indexes_rebuild_clauses():
+    rows = [
+        ('t', 0, 'PRIMARY', 1, 'id', 'A', None, None, None, '', 'BTREE'),
+        ('t', 1, 'ix_ad', 2, 'soyad', 'A', None, 10, None, 'YES', 'BTREE'),
+        ('t', 1, 'ix_ad', 1, 'ad', 'A', None, None, None, 'YES', 'BTREE'),
+        ('t', 0, 'uq_kod', 1, 'kod', 'A', None, None, None, '', 'BTREE'),
+        ('t', 1, 'ft_not', 1, 'notlar', None, None, None, None, 'YES', 'FULLTEXT'),
+    ]
+    assert sync.secondary_indexes(IndexCursor(rows), 't') == {
+        'ix_ad': "ADD INDEX `ix_ad` (`ad`, `soyad`(10))",
+        'uq_kod': "ADD UNIQUE INDEX `uq_kod` (`kod`)",
+        'ft_not': "ADD FULLTEXT INDEX `ft_not` (`notlar`)",
+    }
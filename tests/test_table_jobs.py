@@ -0,0 +1,63 @@
+import pytest
+
+import sync
+
+
+class FakeConnection:
+    def __init__(self, fail_rollback=False):
+        self.fail_rollback = fail_rollback
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor()
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise ConnectionError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def close(self):
+        pass
+
+
+def pools(fail_rollback=False):
+    return (sync.ConnectionPool(lambda: FakeConnection(fail_rollback), 1, "PostgreSQL"),
+            sync.ConnectionPool(FakeConnection, 1, "MariaDB"))
+
+
+def slot_free(pool):
+    if not pool.slots.acquire(blocking=False):
+        return False
+    pool.slots.release()
+    return True
+
+
+def test_connections_go_back_to_the_pools():
+    pg_pool, maria_pool = pools()
+    assert sync._run_table_job("T", lambda *args: 'ok', pg_pool, maria_pool) == 'ok'
+    assert slot_free(pg_pool) and slot_free(maria_pool)
+    assert pg_pool.idle.qsize() == maria_pool.idle.qsize() == 1
+
+
+def test_failed_rollback_still_releases_both_slots():
+    pg_pool, maria_pool = pools(fail_rollback=True)
+    assert sync._run_table_job("T", lambda *args: 'ok', pg_pool, maria_pool) == 'ok'
+    assert slot_free(pg_pool) and slot_free(maria_pool)
+    # Kopan bağlantı havuza geri konmaz
+    assert pg_pool.idle.qsize() == 0 and pg_pool.all == []
+
+
+def test_failed_job_discards_the_connections():
+    pg_pool, maria_pool = pools()
+
+    def failing(*args):
+        raise RuntimeError("tablo yok")
+
+    with pytest.raises(RuntimeError):
+        sync._run_table_job("T", failing, pg_pool, maria_pool)
+    assert slot_free(pg_pool) and slot_free(maria_pool)
+    assert pg_pool.all == maria_pool.all == []
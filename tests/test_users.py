@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+import benchmark
+import sync
+
+
+def run_users(monkeypatch, mode, seed):
+    """Sync generated users into a seeded in-memory MariaDB; returns (stats, issues, target users table)"""
+    rng = random.Random(seed)
+    columns, types, rows, _ = benchmark.generate_users(2000, rng)
+    source = benchmark.FakeSource(0)
+    source.tables['users'] = {'columns': columns, 'types': types, 'rows': rows}
+    target = benchmark.FakeTarget(0)
+    target.tables['users'] = benchmark.FakeTargetTable(columns)
+    for user in benchmark.existing_users(rows, columns, rng, 0.8):
+        target.users.insert(user)
+
+    issues = []
+    monkeypatch.setattr(sync, 'USERS_SYNC_MODE', mode)
+    monkeypatch.setattr(sync, 'connect_source', source.connect)
+    monkeypatch.setattr(sync, 'connect_target', lambda *args: target.connect())
+    monkeypatch.setattr(sync, 'users_issue', lambda messages, kind, message, **fields: (
+        messages.append({'kind': kind, 'message': message, 'fields': fields}), issues.append((kind, fields))))
+    pg_conn, maria_conn = source.connect(), target.connect()
+    stats = sync.sync_users(pg_conn.cursor(), maria_conn.cursor(), maria_conn)
+    return stats, sorted(issues, key=repr), target.users
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_plan_matches_row_path(monkeypatch, state_file, seed):
+    monkeypatch.setattr(sync, 'USERS_ORPHAN_POLICY', 'report')
+    row_stats, row_issues, row_users = run_users(monkeypatch, 'row', seed)
+    bulk_stats, bulk_issues, bulk_users = run_users(monkeypatch, 'bulk', seed)
+
+    counts = ('read_count', 'insert_count', 'update_count', 'delete_count', 'no_change_count', 'error_count')
+    assert {key: bulk_stats[key] for key in counts} == {key: row_stats[key] for key in counts}
+    assert row_stats['insert_count'] and row_stats['update_count'] and row_stats['error_count']
+    assert bulk_issues == row_issues
+    assert bulk_users.digest() == row_users.digest()
+
+
+def test_plan_reports_skips_and_conflicts():
+    columns = ['id', 'position_code', 'ad']
+    index = sync.UsersIndex([
+        {'id': 1, 'position_code': 'A', 'ad': 'eski'},
+        {'id': 2, 'position_code': 'B', 'ad': 'b'},
+        {'id': 3, 'position_code': 'ESKI', 'ad': 'c'},
+    ])
+    users = [
+        {'id': 1, 'position_code': 'a ', 'ad': 'yeni'},  # harf / boşluk farkı aynı anahtar
+        {'id': 2, 'position_code': None, 'ad': 'b'},  # NULL pozisyon, id zaten var
+        {'id': 3, 'position_code': 'C', 'ad': 'c'},  # pozisyon değişmiş
+        {'id': 4, 'position_code': 'B', 'ad': 'd'},  # başka kullanıcının pozisyonu
+        {'id': 5, 'position_code': 'E', 'ad': 'e'},
+    ]
+    operations, insert_count, update_count, no_change_count, issues = sync.plan_users_sync(
+        columns, users, index, report_missing=False)
+    assert [(kind, user['id'], old) for kind, user, old, _ in operations] == [
+        ('update', 1, 'a '), ('move', 3, 'ESKI'), ('insert', 5, None)]
+    assert (insert_count, update_count, no_change_count) == (1, 2, 0)
+    assert [issue['kind'] for issue in issues] == ['null_position', 'position_conflict']
+    assert [row['position_code'] for row in index.find_by_id(3)] == ['C']
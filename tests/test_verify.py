@@ -0,0 +1,104 @@
+import hashlib
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import sync
+
+
+def row_hash(value):
+    return hashlib.md5(str(value).encode()).hexdigest()
+
+
+class HashCursor:
+    """Answers TableVerifier's three query shapes from {key: row text}"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = None
+
+    def execute(self, query, params=()):
+        keys = sorted(self.rows)
+        if query.startswith("SELECT min("):
+            self.result = [(keys[0], keys[-1]) if keys else (None, None)]
+        elif query.endswith("GROUP BY 1"):
+            *inner, lower, upper = params
+            buckets = {}
+            for key in keys:
+                if lower <= key < upper:
+                    bucket = next((i for i, edge in enumerate(inner) if key < edge), len(inner))
+                    count, total = buckets.get(bucket, (0, 0))
+                    buckets[bucket] = (count + 1, total + int(row_hash(self.rows[key])[:15], 16))
+            self.result = [(bucket, count, total) for bucket, (count, total) in buckets.items()]
+        else:
+            lower, upper = params
+            self.result = [(key, row_hash(self.rows[key])) for key in keys if lower <= key < upper]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def verifier(source_rows, target_rows):
+    bound = SimpleNamespace(key_column='id', target_columns=['id', 'ad'], select_exprs=lambda: ['"id"', '"ad"'],
+                            source='public.t', target='db.t')
+    return sync.TableVerifier(bound, {'id': 'int', 'ad': 'varchar'}, HashCursor(source_rows), HashCursor(target_rows))
+
+
+@pytest.fixture(autouse=True)
+def small_ranges(monkeypatch):
+    monkeypatch.setattr(sync, 'VERIFY_FANOUT', 4)
+    monkeypatch.setattr(sync, 'VERIFY_LEAF_ROWS', 8)
+
+
+def test_bisection_finds_missing_extra_and_changed_keys():
+    source = {key: f"ad{key}" for key in range(1000)}
+    target = dict(source)
+    del target[5], target[731]
+    target[1004] = "fazla"
+    target[500] = "değişti"
+    check = verifier(source, target)
+    diff = check.differences()
+    assert (diff['missing'], diff['extra'], diff['changed']) == ([5, 731], [1004], [500])
+    assert (diff['source_count'], diff['target_count'], diff['truncated']) == (1000, 999, False)
+    # Eşit aralıklar bölünmez: 1000 satırın hepsi değil, yalnızca farklı aralıklar inilir
+    assert 1 < check.range_queries < 40
+
+
+def test_identical_tables_take_one_query():
+    rows = {key: f"ad{key}" for key in range(1000)}
+    check = verifier(rows, dict(rows))
+    diff = check.differences()
+    assert diff['missing'] == diff['extra'] == diff['changed'] == []
+    assert check.range_queries == 1
+
+
+def test_max_diffs_is_read_when_called(monkeypatch):
+    source = {key: f"ad{key}" for key in range(200)}
+    target = {key: f"eski{key}" for key in range(200)}
+    monkeypatch.setattr(sync, 'VERIFY_MAX_DIFFS', 10)
+    diff = verifier(source, target).differences()
+    assert diff['truncated'] and len(diff['changed']) == 10
+
+
+def test_empty_tables():
+    assert verifier({}, {}).differences()['source_count'] == 0
+
+
+@pytest.mark.parametrize('column_type, pg_text, maria_text', [
+    ('double', 'round(("x")::float8::numeric, 6)::text', 'CAST(CAST(x AS DECIMAL(65, 6)) AS CHAR)'),
+    ('float', 'round(("x")::real::float8::numeric, 6)::text', 'CAST(CAST(x AS DECIMAL(65, 6)) AS CHAR)'),
+    ('datetime', 'to_char("x", \'YYYY-MM-DD HH24:MI:SS\')', 'LEFT(CAST(x AS CHAR), 19)'),
+    ('varchar(20)', '("x")::text', 'CAST(x AS CHAR)'),
+])
+def test_column_exprs(column_type, pg_text, maria_text):
+    assert sync.verify_column_exprs('"x"', 'x', column_type) == (pg_text, maria_text)
+
+
+def test_decimal_exprs_strip_trailing_zeros():
+    pg_text, maria_text = sync.verify_column_exprs('"x"', 'x', 'decimal(10,2)')
+    assert re.search(r"rtrim\(rtrim\(.*'0'\), '\.'\)", pg_text)
+    assert "TRIM(TRAILING '0' FROM" in maria_text